@@ -1,25 +1,52 @@
-from flask import Blueprint, request, jsonify, send_from_directory
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask import Blueprint, request, jsonify, send_from_directory, current_app
+from flask_jwt_extended import jwt_required, get_jwt, get_jwt_identity
 from werkzeug.utils import secure_filename
 import os
 import uuid
+from concurrent.futures import TimeoutError as FutureTimeoutError
 from datetime import datetime, date, time
 import logging
+from time import perf_counter
 
 from app import db
 from models import *
-from auth import request_otp, verify_otp, login_with_email, login_with_abha, get_current_user, update_user_profile
-from hmis_integration import search_doctors, share_profile_with_hmis, get_doctor_availability
+from auth import request_otp, verify_otp, login_with_email, login_with_abha, get_current_user, get_current_user_id, update_user_profile, get_user_cache_stats
+from hmis_integration import search_doctors_async, share_profile_with_hmis, get_search_cache_stats, get_availability_cache_stats, get_circuit_breaker_stats
 from ai_services import transcribe_audio, analyze_symptoms, summarize_records
-from notification_service import create_notification, get_user_notifications
+from notification_service import queue_notification, get_user_notifications
 from utils import allowed_file, save_uploaded_file, generate_qr_code
+from blob_store import store_blob
+from doctor_directory import doctor_directory, get_doctor_summaries
+from doctor_search import search_doctors_ranked
+from pagination import InvalidCursor, get_page_limit, paginate_query
+from password_hashing import PasswordHashingOverloaded
+from rate_limiter import auth_rate_limit
+from token_revocation import revoke_token, get_token_revocation_stats
+from doctor_schedule import schedule_range, get_doctor_schedule
+from booking import insert_appointment, expand_recurrence, book_series
+from hmis_booking import is_hmis_doctor, queue_hmis_booking
+from availability import MAX_RANGE_DAYS, MAX_BATCH_DOCTORS, get_availability, get_availability_grid, get_booked_slots, slot_key
+from slot_holds import SLOT_HOLD_TTL, hold_slot, get_hold, release_hold, hold_matches, get_slot_holders, hold_expires_at
 
 logger = logging.getLogger(__name__)
 
 api_bp = Blueprint('api', __name__)
 
+@api_bp.errorhandler(InvalidCursor)
+def handle_invalid_cursor(error):
+    """Reject tampered or stale pagination cursors"""
+    return jsonify({"success": False, "message": "Invalid pagination cursor"}), 400
+
+@api_bp.errorhandler(PasswordHashingOverloaded)
+def handle_password_hashing_overloaded(error):
+    """Shed logins cheaply while the password hashing queue is full"""
+    response = jsonify({"success": False, "message": "Too many login attempts in progress, please retry shortly"})
+    response.headers['Retry-After'] = str(error.retry_after)
+    return response, 503
+
 # Authentication endpoints
 @api_bp.route('/auth/request-otp', methods=['POST'])
+@auth_rate_limit('mobile_number')
 def api_request_otp():
     """Request OTP for mobile number"""
     data = request.get_json()
@@ -32,6 +59,7 @@ def api_request_otp():
     return jsonify(result), 200 if result['success'] else 400
 
 @api_bp.route('/auth/verify-otp', methods=['POST'])
+@auth_rate_limit('mobile_number')
 def api_verify_otp():
     """Verify OTP and login"""
     data = request.get_json()
@@ -45,6 +73,7 @@ def api_verify_otp():
     return jsonify(result), 200 if result['success'] else 400
 
 @api_bp.route('/auth/login-email', methods=['POST'])
+@auth_rate_limit('email')
 def api_login_email():
     """Login with email and password"""
     data = request.get_json()
@@ -58,6 +87,7 @@ def api_login_email():
     return jsonify(result), 200 if result['success'] else 400
 
 @api_bp.route('/auth/login-abha', methods=['POST'])
+@auth_rate_limit('abha_id')
 def api_login_abha():
     """Login with ABHA ID"""
     data = request.get_json()
@@ -69,6 +99,14 @@ def api_login_abha():
     result = login_with_abha(abha_id)
     return jsonify(result), 200 if result['success'] else 400
 
+@api_bp.route('/auth/logout', methods=['POST'])
+@jwt_required()
+def api_logout():
+    """Revoke the access token used for this request"""
+    revoke_token(get_jwt()['jti'], get_current_user_id())
+    db.session.commit()
+    return jsonify({"success": True, "message": "Logged out successfully"})
+
 # Profile management
 @api_bp.route('/profile', methods=['GET'])
 @jwt_required()
@@ -135,100 +173,169 @@ def share_profile():
     if not hospital_id:
         return jsonify({"success": False, "message": "Hospital ID is required"}), 400
     
-    user = get_current_user()
-    if not user:
-        return jsonify({"success": False, "message": "User not found"}), 404
+    user_id = get_current_user_id()
     
-    result = share_profile_with_hmis(user.id, hospital_id)
+    result = share_profile_with_hmis(user_id, hospital_id)
     return jsonify(result), 200 if result['success'] else 400
 
 # Doctor and appointment management
 @api_bp.route('/doctors', methods=['GET'])
 @jwt_required()
 def get_doctors():
-    """Get list of doctors with optional filtering"""
+    """Get list of doctors with optional filtering or ranked fuzzy search"""
     specialty = request.args.get('specialty')
     name_search = request.args.get('name')
+    search_query = request.args.get('q')
+    cursor = request.args.get('cursor')
+    
+    deadline = perf_counter() + current_app.config['DOCTOR_SEARCH_DEADLINE']
+    
+    # Start the HMIS search first so it overlaps with the local lookup.
+    # HMIS results are not pageable, so they are only attached to the first page.
+    hmis_future = None
+    if not cursor:
+        hmis_future = search_doctors_async(specialty, search_query or name_search)
+    
+    local_started = perf_counter()
+    next_cursor = None
+    if search_query:
+        # Typo-tolerant search ranked by similarity, rating and experience
+        doctors_list = search_doctors_ranked(search_query, get_page_limit(default=20))
+    else:
+        # Local doctors are served from the in-memory directory snapshot
+        doctors_list, next_cursor = doctor_directory.search_page(
+            specialty, name_search, cursor, get_page_limit()
+        )
+    local_ms = round((perf_counter() - local_started) * 1000, 2)
+    
+    # Wait for HMIS only as long as the request deadline allows
+    partial = False
+    hmis_doctors = []
+    hmis_ms = None
+    if hmis_future:
+        try:
+            hmis_doctors, hmis_ms = hmis_future.result(timeout=max(deadline - perf_counter(), 0))
+        except FutureTimeoutError:
+            # Frees the pool slot if the search has not started yet
+            hmis_future.cancel()
+            logger.warning("HMIS doctor search missed the request deadline, returning local results only")
+            partial = True
     
-    query = Doctor.query.filter_by(is_active=True)
+    # Add HMIS doctors
+    doctors_list.extend(hmis_doctors)
     
-    if specialty:
-        query = query.filter(Doctor.specialty.ilike(f'%{specialty}%'))
+    return jsonify({
+        "success": True,
+        "doctors": doctors_list,
+        "next_cursor": next_cursor,
+        "partial": partial,
+        "timings": {
+            "local_ms": local_ms,
+            "hmis_ms": hmis_ms
+        }
+    })
+
+@api_bp.route('/doctors/availability', methods=['POST'])
+@jwt_required()
+def get_doctors_availability_batch():
+    """Get an availability grid for many doctors over a date window"""
+    data = request.get_json() or {}
+    doctor_ids = data.get('doctor_ids')
+    from_str = data.get('from')
+    to_str = data.get('to', from_str)
     
-    if name_search:
-        query = query.filter(Doctor.name.ilike(f'%{name_search}%'))
+    if not doctor_ids or not isinstance(doctor_ids, list) or not from_str:
+        return jsonify({"success": False, "message": "doctor_ids list and from date are required"}), 400
     
-    doctors = query.all()
+    if len(doctor_ids) > MAX_BATCH_DOCTORS:
+        return jsonify({"success": False, "message": f"At most {MAX_BATCH_DOCTORS} doctors per request"}), 400
     
-    # Also search HMIS for additional doctors
-    hmis_doctors = search_doctors(specialty, name_search)
+    try:
+        start_date = datetime.strptime(from_str, '%Y-%m-%d').date()
+        end_date = datetime.strptime(to_str, '%Y-%m-%d').date()
+    except (TypeError, ValueError):
+        return jsonify({"success": False, "message": "Invalid date format. Use YYYY-MM-DD"}), 400
     
-    doctors_list = []
-    for doctor in doctors:
-        doctors_list.append({
-            "id": doctor.id,
-            "name": doctor.name,
-            "specialty": doctor.specialty,
-            "qualification": doctor.qualification,
-            "experience_years": doctor.experience_years,
-            "hospital_name": doctor.hospital_name,
-            "consultation_fee": float(doctor.consultation_fee) if doctor.consultation_fee else None,
-            "rating": float(doctor.rating) if doctor.rating else None,
-            "profile_image": doctor.profile_image,
-            "source": "local"
-        })
+    if end_date < start_date:
+        return jsonify({"success": False, "message": "'to' must not be before 'from'"}), 400
     
-    # Add HMIS doctors
-    doctors_list.extend(hmis_doctors)
+    if (end_date - start_date).days >= MAX_RANGE_DAYS:
+        return jsonify({"success": False, "message": f"Date range cannot exceed {MAX_RANGE_DAYS} days"}), 400
     
-    return jsonify({
-        "success": True,
-        "doctors": doctors_list
-    })
+    return jsonify(get_availability_grid(
+        [str(doctor_id) for doctor_id in doctor_ids],
+        start_date,
+        end_date,
+        viewer_id=get_jwt_identity()
+    ))
 
 @api_bp.route('/doctors/<doctor_id>/availability', methods=['GET'])
 @jwt_required()
 def get_doctor_availability_api(doctor_id):
-    """Get doctor availability"""
+    """Get doctor availability for one date or a from/to date range"""
     date_str = request.args.get('date')
+    from_str = request.args.get('from', date_str)
+    to_str = request.args.get('to', from_str)
     
-    if not date_str:
-        return jsonify({"success": False, "message": "Date is required"}), 400
+    if not from_str:
+        return jsonify({"success": False, "message": "Date or from/to range is required"}), 400
     
     try:
-        appointment_date = datetime.strptime(date_str, '%Y-%m-%d').date()
+        start_date = datetime.strptime(from_str, '%Y-%m-%d').date()
+        end_date = datetime.strptime(to_str, '%Y-%m-%d').date()
     except ValueError:
         return jsonify({"success": False, "message": "Invalid date format. Use YYYY-MM-DD"}), 400
     
-    # Check local doctor first
-    doctor = Doctor.query.get(doctor_id)
-    if doctor:
-        availability = doctor.availability or {}
-        day_name = appointment_date.strftime('%A').lower()
-        available_slots = availability.get(day_name, [])
-    else:
-        # Check HMIS
-        availability_result = get_doctor_availability(doctor_id, appointment_date)
-        if availability_result['success']:
-            available_slots = availability_result['slots']
-        else:
-            return jsonify(availability_result), 400
-    
-    # Filter out booked slots
-    booked_appointments = Appointment.query.filter_by(
-        doctor_id=doctor_id,
-        appointment_date=appointment_date
-    ).all()
+    if end_date < start_date:
+        return jsonify({"success": False, "message": "'to' must not be before 'from'"}), 400
     
-    booked_times = [apt.appointment_time.strftime('%H:%M') for apt in booked_appointments]
-    available_slots = [slot for slot in available_slots if slot not in booked_times]
+    if (end_date - start_date).days >= MAX_RANGE_DAYS:
+        return jsonify({"success": False, "message": f"Date range cannot exceed {MAX_RANGE_DAYS} days"}), 400
+    
+    result = get_availability(doctor_id, start_date, end_date, viewer_id=get_jwt_identity())
+    if not result['success']:
+        return jsonify(result), 400
+    
+    if date_str:
+        return jsonify({
+            "success": True,
+            "date": date_str,
+            "available_slots": result['days'][0]['available_slots'],
+            "partial": result['partial']
+        })
     
     return jsonify({
         "success": True,
-        "date": date_str,
-        "available_slots": available_slots
+        "from": start_date.isoformat(),
+        "to": end_date.isoformat(),
+        "days": result['days'],
+        "partial": result['partial']
     })
 
+@api_bp.route('/doctors/<doctor_id>/schedule', methods=['GET'])
+@jwt_required()
+def get_doctor_schedule_api(doctor_id):
+    """Get a doctor's day or week schedule with status counts, without appointment details"""
+    date_str = request.args.get('date') or date.today().isoformat()
+    view = request.args.get('view', 'day')
+    
+    try:
+        day = datetime.strptime(date_str, '%Y-%m-%d').date()
+    except ValueError:
+        return jsonify({"success": False, "message": "Invalid date format. Use YYYY-MM-DD"}), 400
+    
+    try:
+        start_date, end_date = schedule_range(day, view)
+    except ValueError as e:
+        return jsonify({"success": False, "message": str(e)}), 400
+    
+    # Callers see when the doctor is busy, not whose appointments they are. Tokens
+    # only identify patients; the detailed view is not wired up to any endpoint
+    # until doctor and staff accounts exist
+    schedule = get_doctor_schedule(doctor_id, start_date, end_date, detailed=False)
+    schedule["view"] = view
+    return jsonify(schedule)
+
 @api_bp.route('/appointments', methods=['POST'])
 @jwt_required()
 def book_appointment():
@@ -239,6 +346,7 @@ def book_appointment():
     appointment_time_str = data.get('appointment_time')
     symptoms = data.get('symptoms', '')
     consultation_type = data.get('consultation_type', 'in-person')
+    hold_id = data.get('hold_id')
     
     if not all([doctor_id, appointment_date_str, appointment_time_str]):
         return jsonify({"success": False, "message": "Doctor ID, date, and time are required"}), 400
@@ -249,73 +357,235 @@ def book_appointment():
     except ValueError:
         return jsonify({"success": False, "message": "Invalid date or time format"}), 400
     
-    user = get_current_user()
-    if not user:
-        return jsonify({"success": False, "message": "User not found"}), 404
+    user_id = get_current_user_id()
     
-    # Check if slot is available
-    existing_appointment = Appointment.query.filter_by(
-        doctor_id=doctor_id,
-        appointment_date=appointment_date,
-        appointment_time=appointment_time
-    ).first()
-    
-    if existing_appointment:
-        return jsonify({"success": False, "message": "Time slot is already booked"}), 400
-    
-    # Create appointment
-    appointment = Appointment(
-        user_id=user.id,
+    if hold_id:
+        hold = get_hold(hold_id)
+        if not hold or hold['user_id'] != user_id or not hold_matches(hold, doctor_id, appointment_date, appointment_time):
+            return jsonify({"success": False, "message": "Slot hold has expired or does not match this booking"}), 409
+    else:
+        slot = (doctor_id, appointment_date, slot_key(appointment_time))
+        holder = get_slot_holders([slot]).get(slot)
+        if holder and holder != user_id:
+            return jsonify({"success": False, "message": "Time slot is temporarily held by another patient"}), 409
+    
+    # HMIS doctors are booked locally as pending and confirmed with HMIS in the background
+    hmis_doctor = is_hmis_doctor(doctor_id)
+    status = 'pending' if hmis_doctor else 'scheduled'
+    
+    # Claim the slot atomically; the unique slot index rejects a concurrent double booking
+    appointment_id = insert_appointment(
+        user_id=user_id,
         doctor_id=doctor_id,
         appointment_date=appointment_date,
         appointment_time=appointment_time,
         symptoms=symptoms,
-        consultation_type=consultation_type
+        consultation_type=consultation_type,
+        status=status
     )
     
-    db.session.add(appointment)
-    db.session.commit()
+    if not appointment_id:
+        db.session.rollback()
+        return jsonify({"success": False, "message": "Time slot is already booked"}), 409
+    
+    if hmis_doctor:
+        queue_hmis_booking(appointment_id)
     
-    # Create notification
-    create_notification(
-        user.id,
-        "Appointment Booked",
-        f"Your appointment has been booked for {appointment_date_str} at {appointment_time_str}",
+    # Notification is committed with the appointment and delivered by the outbox
+    queue_notification(
+        user_id,
+        "Appointment Requested" if hmis_doctor else "Appointment Booked",
+        f"Your appointment has been {'requested' if hmis_doctor else 'booked'} for {appointment_date_str} at {appointment_time_str}",
         "appointment"
     )
     
+    db.session.commit()
+    
+    if hold_id:
+        release_hold(hold_id)
+    
+    if hmis_doctor:
+        return jsonify({
+            "success": True,
+            "message": "Appointment requested; awaiting hospital confirmation",
+            "appointment_id": appointment_id,
+            "status": status
+        }), 202
+    
     return jsonify({
         "success": True,
         "message": "Appointment booked successfully",
-        "appointment_id": appointment.id
+        "appointment_id": appointment_id,
+        "status": status
+    })
+
+@api_bp.route('/appointments/holds', methods=['POST'])
+@jwt_required()
+def create_slot_hold():
+    """Reserve a slot for a short time before booking it"""
+    data = request.get_json() or {}
+    doctor_id = data.get('doctor_id')
+    appointment_date_str = data.get('appointment_date')
+    appointment_time_str = data.get('appointment_time')
+    ttl = data.get('ttl', SLOT_HOLD_TTL)
+    
+    if not all([doctor_id, appointment_date_str, appointment_time_str]):
+        return jsonify({"success": False, "message": "Doctor ID, date, and time are required"}), 400
+    
+    try:
+        appointment_date = datetime.strptime(appointment_date_str, '%Y-%m-%d').date()
+        appointment_time = datetime.strptime(appointment_time_str, '%H:%M').time()
+        ttl = int(ttl)
+    except (TypeError, ValueError):
+        return jsonify({"success": False, "message": "Invalid date, time or ttl"}), 400
+    
+    if (appointment_date, slot_key(appointment_time)) in get_booked_slots(doctor_id, appointment_date, appointment_date):
+        return jsonify({"success": False, "message": "Time slot is already booked"}), 409
+    
+    hold = hold_slot(doctor_id, appointment_date, appointment_time, get_jwt_identity(), ttl)
+    if not hold:
+        return jsonify({"success": False, "message": "Time slot is temporarily held by another patient"}), 409
+    
+    return jsonify({
+        "success": True,
+        "message": "Slot held",
+        "hold_id": hold['hold_id'],
+        "expires_at": hold_expires_at(hold)
+    })
+
+@api_bp.route('/appointments/holds/<hold_id>', methods=['DELETE'])
+@jwt_required()
+def delete_slot_hold(hold_id):
+    """Release a slot hold without booking"""
+    hold = get_hold(hold_id)
+    if not hold or hold['user_id'] != get_jwt_identity():
+        return jsonify({"success": False, "message": "Hold not found"}), 404
+    
+    release_hold(hold_id)
+    return jsonify({"success": True, "message": "Slot hold released"})
+
+@api_bp.route('/appointments/series', methods=['POST'])
+@jwt_required()
+def book_appointment_series():
+    """Book a recurring series of appointments in one transaction"""
+    data = request.get_json() or {}
+    doctor_id = data.get('doctor_id')
+    start_date_str = data.get('start_date')
+    appointment_time_str = data.get('appointment_time')
+    recurrence = data.get('recurrence') or {}
+    symptoms = data.get('symptoms', '')
+    consultation_type = data.get('consultation_type', 'in-person')
+    
+    if not all([doctor_id, start_date_str, appointment_time_str, recurrence]):
+        return jsonify({"success": False, "message": "Doctor ID, start date, time and recurrence are required"}), 400
+    
+    if not isinstance(recurrence, dict):
+        return jsonify({"success": False, "message": "Recurrence must be an object"}), 400
+    
+    try:
+        start_date = datetime.strptime(start_date_str, '%Y-%m-%d').date()
+        appointment_time = datetime.strptime(appointment_time_str, '%H:%M').time()
+        until_str = recurrence.get('until')
+        until = datetime.strptime(until_str, '%Y-%m-%d').date() if until_str else None
+    except (TypeError, ValueError):
+        return jsonify({"success": False, "message": "Invalid date or time format"}), 400
+    
+    try:
+        dates = expand_recurrence(
+            start_date,
+            frequency=recurrence.get('frequency', 'weekly'),
+            interval=recurrence.get('interval', 1),
+            count=recurrence.get('count'),
+            until=until
+        )
+    except ValueError as e:
+        return jsonify({"success": False, "message": str(e)}), 400
+    
+    user_id = get_current_user_id()
+    
+    hmis_doctor = is_hmis_doctor(doctor_id)
+    booked, conflicts = book_series(
+        user_id,
+        doctor_id,
+        dates,
+        appointment_time,
+        symptoms=symptoms,
+        consultation_type=consultation_type,
+        status='pending' if hmis_doctor else 'scheduled'
+    )
+    
+    conflict_list = [
+        {"appointment_date": day.isoformat(), "message": "Time slot is already booked"}
+        for day in conflicts
+    ]
+    
+    if not booked:
+        db.session.rollback()
+        return jsonify({
+            "success": False,
+            "message": "No appointments in the series could be booked",
+            "conflicts": conflict_list
+        }), 409
+    
+    if hmis_doctor:
+        for _, appointment_id in booked:
+            queue_hmis_booking(appointment_id)
+    
+    # One summary notification for the whole series
+    queue_notification(
+        user_id,
+        "Appointment Series Booked",
+        f"{len(booked)} appointments booked at {appointment_time_str} from "
+        f"{booked[0][0].isoformat()} to {booked[-1][0].isoformat()}",
+        "appointment",
+        extra_data={"appointment_ids": [appointment_id for _, appointment_id in booked]}
+    )
+    
+    db.session.commit()
+    
+    return jsonify({
+        "success": True,
+        "message": f"Booked {len(booked)} of {len(dates)} appointments",
+        "appointments": [
+            {"appointment_id": appointment_id, "appointment_date": day.isoformat()}
+            for day, appointment_id in booked
+        ],
+        "conflicts": conflict_list
     })
 
 @api_bp.route('/appointments', methods=['GET'])
 @jwt_required()
 def get_appointments():
     """Get user appointments"""
-    user = get_current_user()
-    if not user:
-        return jsonify({"success": False, "message": "User not found"}), 404
+    user_id = get_current_user_id()
     
     status = request.args.get('status')
     
-    query = Appointment.query.filter_by(user_id=user.id)
+    query = Appointment.query.filter_by(user_id=user_id)
     if status:
         query = query.filter_by(status=status)
     
-    appointments = query.order_by(Appointment.appointment_date.desc()).all()
+    appointments, next_cursor = paginate_query(
+        query,
+        [Appointment.appointment_date, Appointment.id],
+        cursor=request.args.get('cursor'),
+        limit=get_page_limit(),
+        descending=True
+    )
+    
+    doctors = get_doctor_summaries(appointment.doctor_id for appointment in appointments)
     
     appointments_list = []
     for appointment in appointments:
-        doctor = Doctor.query.get(appointment.doctor_id)
+        doctor = doctors[appointment.doctor_id]
         appointments_list.append({
             "id": appointment.id,
-            "doctor_name": doctor.name if doctor else "Unknown Doctor",
-            "doctor_specialty": doctor.specialty if doctor else None,
+            "doctor_name": doctor["name"] if doctor else "Unknown Doctor",
+            "doctor_specialty": doctor["specialty"] if doctor else None,
             "appointment_date": appointment.appointment_date.isoformat(),
             "appointment_time": appointment.appointment_time.strftime('%H:%M'),
             "status": appointment.status,
+            "confirmation_number": appointment.confirmation_number,
             "symptoms": appointment.symptoms,
             "consultation_type": appointment.consultation_type,
             "amount": float(appointment.amount) if appointment.amount else None
@@ -323,7 +593,29 @@ def get_appointments():
     
     return jsonify({
         "success": True,
-        "appointments": appointments_list
+        "appointments": appointments_list,
+        "next_cursor": next_cursor
+    })
+
+@api_bp.route('/appointments/<appointment_id>/cancel', methods=['POST'])
+@jwt_required()
+def cancel_appointment(appointment_id):
+    """Cancel an appointment and free its slot"""
+    user_id = get_current_user_id()
+    
+    appointment = Appointment.query.filter_by(id=appointment_id, user_id=user_id).first()
+    if not appointment:
+        return jsonify({"success": False, "message": "Appointment not found"}), 404
+    
+    if appointment.status in ('cancelled', 'completed'):
+        return jsonify({"success": False, "message": f"Appointment is already {appointment.status}"}), 400
+    
+    appointment.status = 'cancelled'
+    db.session.commit()
+    
+    return jsonify({
+        "success": True,
+        "message": "Appointment cancelled successfully"
     })
 
 # Symptom checker
@@ -337,7 +629,12 @@ def get_symptoms():
     if category:
         query = query.filter_by(category=category)
     
-    symptoms = query.all()
+    symptoms, next_cursor = paginate_query(
+        query,
+        [Symptom.created_at, Symptom.id],
+        cursor=request.args.get('cursor'),
+        limit=get_page_limit()
+    )
     
     symptoms_list = []
     for symptom in symptoms:
@@ -352,7 +649,8 @@ def get_symptoms():
     
     return jsonify({
         "success": True,
-        "symptoms": symptoms_list
+        "symptoms": symptoms_list,
+        "next_cursor": next_cursor
     })
 
 @api_bp.route('/symptom-assessment', methods=['POST'])
@@ -363,15 +661,13 @@ def create_symptom_assessment():
     symptoms = data.get('symptoms', [])
     questionnaire_responses = data.get('questionnaire_responses', {})
     
-    user = get_current_user()
-    if not user:
-        return jsonify({"success": False, "message": "User not found"}), 404
+    user_id = get_current_user_id()
     
     # Analyze symptoms using AI
     ai_analysis = analyze_symptoms(symptoms, questionnaire_responses)
     
     assessment = SymptomAssessment(
-        user_id=user.id,
+        user_id=user_id,
         symptoms=symptoms,
         questionnaire_responses=questionnaire_responses,
         ai_analysis=ai_analysis,
@@ -401,9 +697,7 @@ def upload_symptom_audio():
     if file.filename == '':
         return jsonify({"success": False, "message": "No audio file selected"}), 400
     
-    user = get_current_user()
-    if not user:
-        return jsonify({"success": False, "message": "User not found"}), 404
+    user_id = get_current_user_id()
     
     # Save audio file
     filename = secure_filename(f"{uuid.uuid4()}_{file.filename}")
@@ -421,7 +715,7 @@ def upload_symptom_audio():
     ai_analysis = analyze_symptoms([], {}, transcription)
     
     assessment = SymptomAssessment(
-        user_id=user.id,
+        user_id=user_id,
         symptoms=ai_analysis.get('identified_symptoms', []),
         audio_recording_path=file_path,
         transcription=transcription,
@@ -459,51 +753,52 @@ def upload_document():
     if not allowed_file(file.filename):
         return jsonify({"success": False, "message": "File type not allowed"}), 400
     
-    user = get_current_user()
-    if not user:
-        return jsonify({"success": False, "message": "User not found"}), 404
+    user_id = get_current_user_id()
     
-    # Save file
-    filename = secure_filename(f"{uuid.uuid4()}_{file.filename}")
-    file_path = save_uploaded_file(file, filename)
+    # Stored once per distinct content; a repeat upload only adds a reference
+    stored = store_blob(file.stream)
     
     # Create document record
     document = Document(
-        user_id=user.id,
+        user_id=user_id,
         document_type=document_type,
         title=title,
-        file_path=file_path,
+        file_path=stored.path,
         file_type=file.filename.rsplit('.', 1)[1].lower(),
-        file_size=len(file.read()),
+        file_size=stored.size,
         uploaded_by='patient'
     )
     
-    file.seek(0)  # Reset file pointer after reading for size
-    
     db.session.add(document)
     db.session.commit()
     
     return jsonify({
         "success": True,
         "message": "Document uploaded successfully",
-        "document_id": document.id
+        "document_id": document.id,
+        "file_size": stored.size,
+        "sha256": stored.sha256
     })
 
 @api_bp.route('/documents', methods=['GET'])
 @jwt_required()
 def get_documents():
     """Get user documents"""
-    user = get_current_user()
-    if not user:
-        return jsonify({"success": False, "message": "User not found"}), 404
+    user_id = get_current_user_id()
     
     document_type = request.args.get('type')
     
-    query = Document.query.filter_by(user_id=user.id)
+    query = Document.query.filter_by(user_id=user_id)
     if document_type:
         query = query.filter_by(document_type=document_type)
     
-    documents = query.order_by(Document.created_at.desc()).all()
+    documents, next_cursor = paginate_query(
+        query,
+        [Document.created_at, Document.id],
+        cursor=request.args.get('cursor'),
+        limit=get_page_limit(),
+        descending=True
+    )
     
     documents_list = []
     for doc in documents:
@@ -520,25 +815,30 @@ def get_documents():
     
     return jsonify({
         "success": True,
-        "documents": documents_list
+        "documents": documents_list,
+        "next_cursor": next_cursor
     })
 
 @api_bp.route('/documents/<document_id>/download', methods=['GET'])
 @jwt_required()
 def download_document(document_id):
     """Download a document"""
-    user = get_current_user()
-    if not user:
-        return jsonify({"success": False, "message": "User not found"}), 404
+    user_id = get_current_user_id()
     
-    document = Document.query.filter_by(id=document_id, user_id=user.id).first()
+    document = Document.query.filter_by(id=document_id, user_id=user_id).first()
     if not document:
         return jsonify({"success": False, "message": "Document not found"}), 404
     
+    # Blobs are named by content hash; the download is named after the document
+    download_name = secure_filename(document.title) or document.id
+    if not download_name.lower().endswith(f".{document.file_type}"):
+        download_name = f"{download_name}.{document.file_type}"
+    
     return send_from_directory(
         os.path.dirname(document.file_path),
         os.path.basename(document.file_path),
-        as_attachment=True
+        as_attachment=True,
+        download_name=download_name
     )
 
 # Record summarization
@@ -550,19 +850,17 @@ def summarize_user_records():
     summary_type = data.get('summary_type', 'all_records')  # all_records or selected_records
     document_ids = data.get('document_ids', [])
     
-    user = get_current_user()
-    if not user:
-        return jsonify({"success": False, "message": "User not found"}), 404
+    user_id = get_current_user_id()
     
     if summary_type == 'selected_records' and not document_ids:
         return jsonify({"success": False, "message": "Document IDs required for selected records"}), 400
     
     # Get documents to summarize
     if summary_type == 'all_records':
-        documents = Document.query.filter_by(user_id=user.id).all()
+        documents = Document.query.filter_by(user_id=user_id).all()
     else:
         documents = Document.query.filter(
-            Document.user_id == user.id,
+            Document.user_id == user_id,
             Document.id.in_(document_ids)
         ).all()
     
@@ -577,7 +875,7 @@ def summarize_user_records():
     
     # Save summary
     record_summary = RecordSummary(
-        user_id=user.id,
+        user_id=user_id,
         summary_type=summary_type,
         document_ids=document_ids if summary_type == 'selected_records' else None,
         summary_text=summary_result['summary'],
@@ -606,19 +904,16 @@ def upload_prescription():
     if file.filename == '':
         return jsonify({"success": False, "message": "No file selected"}), 400
     
-    user = get_current_user()
-    if not user:
-        return jsonify({"success": False, "message": "User not found"}), 404
+    user_id = get_current_user_id()
     
     # Save prescription image
-    filename = secure_filename(f"prescription_{uuid.uuid4()}_{file.filename}")
-    file_path = save_uploaded_file(file, filename)
+    stored = store_blob(file.stream)
     
     # Create prescription record
     prescription = Prescription(
-        user_id=user.id,
+        user_id=user_id,
         medicines=[],  # Will be populated after OCR processing
-        prescription_image_path=file_path
+        prescription_image_path=stored.path
     )
     
     db.session.add(prescription)
@@ -645,9 +940,7 @@ def add_medicine_tracker():
     if not all([medicine_name, dosage, frequency, timing, start_date_str]):
         return jsonify({"success": False, "message": "Required fields missing"}), 400
     
-    user = get_current_user()
-    if not user:
-        return jsonify({"success": False, "message": "User not found"}), 404
+    user_id = get_current_user_id()
     
     try:
         start_date = datetime.strptime(start_date_str, '%Y-%m-%d').date()
@@ -656,7 +949,7 @@ def add_medicine_tracker():
         return jsonify({"success": False, "message": "Invalid date format"}), 400
     
     medicine_tracker = MedicineTracker(
-        user_id=user.id,
+        user_id=user_id,
         medicine_name=medicine_name,
         dosage=dosage,
         frequency=frequency,
@@ -666,18 +959,20 @@ def add_medicine_tracker():
     )
     
     db.session.add(medicine_tracker)
-    db.session.commit()
+    db.session.flush()
     
-    # Create notifications for medicine reminders
+    # Queue notifications for medicine reminders in the same transaction
     for time_slot in timing:
-        create_notification(
-            user.id,
+        queue_notification(
+            user_id,
             "Medicine Reminder",
             f"Time to take {medicine_name} - {dosage}",
             "medicine_reminder",
-            metadata={"medicine_tracker_id": medicine_tracker.id, "time_slot": time_slot}
+            extra_data={"medicine_tracker_id": medicine_tracker.id, "time_slot": time_slot}
         )
     
+    db.session.commit()
+    
     return jsonify({
         "success": True,
         "message": "Medicine added to tracker",
@@ -688,12 +983,10 @@ def add_medicine_tracker():
 @jwt_required()
 def get_medicine_tracker():
     """Get medicine tracker list"""
-    user = get_current_user()
-    if not user:
-        return jsonify({"success": False, "message": "User not found"}), 404
+    user_id = get_current_user_id()
     
     trackers = MedicineTracker.query.filter_by(
-        user_id=user.id,
+        user_id=user_id,
         is_active=True
     ).all()
     
@@ -726,7 +1019,12 @@ def get_lab_tests():
     if category:
         query = query.filter_by(category=category)
     
-    tests = query.all()
+    tests, next_cursor = paginate_query(
+        query,
+        [LabTest.created_at, LabTest.id],
+        cursor=request.args.get('cursor'),
+        limit=get_page_limit()
+    )
     
     tests_list = []
     for test in tests:
@@ -742,7 +1040,8 @@ def get_lab_tests():
     
     return jsonify({
         "success": True,
-        "lab_tests": tests_list
+        "lab_tests": tests_list,
+        "next_cursor": next_cursor
     })
 
 @api_bp.route('/lab-bookings', methods=['POST'])
@@ -756,16 +1055,14 @@ def book_lab_tests():
     if not test_ids:
         return jsonify({"success": False, "message": "At least one test must be selected"}), 400
     
-    user = get_current_user()
-    if not user:
-        return jsonify({"success": False, "message": "User not found"}), 404
+    user_id = get_current_user_id()
     
     # Calculate total amount
     tests = LabTest.query.filter(LabTest.id.in_(test_ids)).all()
     total_amount = sum(float(test.price) for test in tests if test.price)
     
     lab_booking = LabBooking(
-        user_id=user.id,
+        user_id=user_id,
         doctor_id=doctor_id,
         tests=test_ids,
         total_amount=total_amount
@@ -786,11 +1083,9 @@ def book_lab_tests():
 @jwt_required()
 def get_notifications():
     """Get user notifications"""
-    user = get_current_user()
-    if not user:
-        return jsonify({"success": False, "message": "User not found"}), 404
+    user_id = get_current_user_id()
     
-    notifications = get_user_notifications(user.id)
+    notifications = get_user_notifications(user_id)
     return jsonify({
         "success": True,
         "notifications": notifications
@@ -801,7 +1096,12 @@ def get_notifications():
 @jwt_required()
 def get_care_packages():
     """Get available care packages"""
-    packages = CarePackage.query.filter_by(is_active=True).all()
+    packages, next_cursor = paginate_query(
+        CarePackage.query.filter_by(is_active=True),
+        [CarePackage.created_at, CarePackage.id],
+        cursor=request.args.get('cursor'),
+        limit=get_page_limit()
+    )
     
     packages_list = []
     for package in packages:
@@ -817,16 +1117,15 @@ def get_care_packages():
     
     return jsonify({
         "success": True,
-        "care_packages": packages_list
+        "care_packages": packages_list,
+        "next_cursor": next_cursor
     })
 
 @api_bp.route('/care-packages/<package_id>/apply', methods=['POST'])
 @jwt_required()
 def apply_care_package(package_id):
     """Apply for a care package"""
-    user = get_current_user()
-    if not user:
-        return jsonify({"success": False, "message": "User not found"}), 404
+    user_id = get_current_user_id()
     
     package = CarePackage.query.get(package_id)
     if not package:
@@ -834,7 +1133,7 @@ def apply_care_package(package_id):
     
     # Check if user already has this package
     existing = UserCarePackage.query.filter_by(
-        user_id=user.id,
+        user_id=user_id,
         care_package_id=package_id,
         status='active'
     ).first()
@@ -843,7 +1142,7 @@ def apply_care_package(package_id):
         return jsonify({"success": False, "message": "You already have this care package"}), 400
     
     user_package = UserCarePackage(
-        user_id=user.id,
+        user_id=user_id,
         care_package_id=package_id,
         start_date=datetime.utcnow().date()
     )
@@ -868,7 +1167,12 @@ def get_ambulance_services():
     if service_type:
         query = query.filter_by(service_type=service_type)
     
-    services = query.all()
+    services, next_cursor = paginate_query(
+        query,
+        [AmbulanceService.created_at, AmbulanceService.id],
+        cursor=request.args.get('cursor'),
+        limit=get_page_limit()
+    )
     
     services_list = []
     for service in services:
@@ -885,7 +1189,8 @@ def get_ambulance_services():
     
     return jsonify({
         "success": True,
-        "ambulance_services": services_list
+        "ambulance_services": services_list,
+        "next_cursor": next_cursor
     })
 
 @api_bp.route('/ambulance-bookings', methods=['POST'])
@@ -902,12 +1207,10 @@ def book_ambulance():
     if not all([service_id, pickup_location, destination]):
         return jsonify({"success": False, "message": "Required fields missing"}), 400
     
-    user = get_current_user()
-    if not user:
-        return jsonify({"success": False, "message": "User not found"}), 404
+    user_id = get_current_user_id()
     
     booking = AmbulanceBooking(
-        user_id=user.id,
+        user_id=user_id,
         ambulance_service_id=service_id,
         pickup_location=pickup_location,
         destination=destination,
@@ -935,12 +1238,10 @@ def send_peer_support_message():
     if not message:
         return jsonify({"success": False, "message": "Message is required"}), 400
     
-    user = get_current_user()
-    if not user:
-        return jsonify({"success": False, "message": "User not found"}), 404
+    user_id = get_current_user_id()
     
     chat_message = ChatMessage(
-        sender_id=user.id,
+        sender_id=user_id,
         room_id='peer_support',
         message=message,
         is_anonymous=True
@@ -979,3 +1280,16 @@ def get_peer_support_messages():
         "success": True,
         "messages": list(reversed(messages_list))  # Reverse to show oldest first
     })
+
+# Operational metrics
+@api_bp.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Expose per-worker cache and circuit breaker state for monitoring"""
+    return jsonify({
+        "success": True,
+        "hmis_search_cache": get_search_cache_stats(),
+        "hmis_availability_cache": get_availability_cache_stats(),
+        "hmis_circuit": get_circuit_breaker_stats(),
+        "user_cache": get_user_cache_stats(),
+        "token_revocation": get_token_revocation_stats()
+    })
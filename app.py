@@ -19,7 +19,7 @@ def create_app():
     # Create the app
     app = Flask(__name__)
     app.secret_key = os.environ.get("SESSION_SECRET", "healthcare-phr-secret-key")
-    app.wsgi_app = ProxyFix(app.wsgi_app, x_proto=1, x_host=1)
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=1, x_proto=1, x_host=1)
     
     # Configure CORS
     CORS(app, resources={r"/api/*": {"origins": "*"}})
@@ -37,6 +37,18 @@ def create_app():
     }
     app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
     
+    # Upper bound for the combined local + HMIS doctor search, in seconds
+    app.config['DOCTOR_SEARCH_DEADLINE'] = float(os.environ.get("DOCTOR_SEARCH_DEADLINE", "2.5"))
+    
+    # Short-lived slot holds: memory:// per process, redis://... shared across workers
+    app.config['SLOT_HOLD_STORAGE_URL'] = os.environ.get("SLOT_HOLD_STORAGE_URL", "memory://")
+    
+    # Auth rate limit buckets: memory:// per process, redis://... shared across workers
+    app.config['RATELIMIT_STORAGE_URL'] = os.environ.get("RATELIMIT_STORAGE_URL", "memory://")
+    
+    # OTP storage: database (shared) or memory (single process)
+    app.config['OTP_STORE'] = os.environ.get("OTP_STORE", "database")
+    
     # Configure file uploads
     app.config['MAX_CONTENT_LENGTH'] = 50 * 1024 * 1024  # 50MB max file size
     app.config['UPLOAD_FOLDER'] = os.environ.get("UPLOAD_FOLDER", "uploads")
@@ -54,6 +66,31 @@ def create_app():
     app.register_blueprint(api_bp, url_prefix='/api')
     app.register_blueprint(swagger_bp)
     
+    # Deliver outbox events (notifications, ...) in the background
+    from outbox import init_outbox
+    init_outbox(app)
+    
+    from slot_holds import init_slot_holds
+    init_slot_holds(app)
+    
+    from otp_store import init_otp_store
+    init_otp_store(app)
+    
+    from rate_limiter import init_rate_limiter
+    init_rate_limiter(app)
+    
+    # Reject revoked JWTs; tokens never expire, so logout has to be enforced here
+    from token_revocation import init_token_revocation
+    init_token_revocation(app, jwt)
+    
+    # flask migrate-uploads: move flat uploads into the sharded layout
+    from upload_layout import migrate_uploads_command
+    app.cli.add_command(migrate_uploads_command)
+    
+    # flask sweep-blobs: delete unreferenced blobs once their grace period is over
+    from blob_store import sweep_blobs_command
+    app.cli.add_command(sweep_blobs_command)
+    
     with app.app_context():
         # Import models to ensure they're registered
         import models
@@ -1,15 +1,31 @@
 import os
 import random
 import string
-from datetime import datetime, timedelta
-from flask import request, jsonify
+from datetime import datetime
+from flask import request, jsonify, g
 from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity
+from sqlalchemy import event
+from sqlalchemy.orm import Session, make_transient_to_detached, object_session
+from sqlalchemy.orm.attributes import set_committed_value
 from app import db
-from models import User, OTP
+from models import User
+from otp_store import issue_otp, consume_otp, maybe_sweep_expired_otps
+from password_hashing import PasswordHashingOverloaded
+from ttl_cache import TTLCache
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Per-worker cache of authenticated users; entries are dropped when the user row is written
+USER_CACHE_SIZE = int(os.environ.get("USER_CACHE_SIZE", "10000"))
+USER_CACHE_TTL = int(os.environ.get("USER_CACHE_TTL", "30"))
+
+# Never kept in the cache; loaded from the database if a caller reads it
+_UNCACHED_USER_COLUMNS = {'password_hash'}
+
+_user_cache = TTLCache(maxsize=USER_CACHE_SIZE, ttl=USER_CACHE_TTL, name="user")
+_SESSION_USERS = 'users_changed'
+
 def generate_otp():
     """Generate a 6-digit OTP"""
     return ''.join(random.choices(string.digits, k=6))
@@ -29,17 +45,13 @@ def request_otp(mobile_number):
     try:
         # Generate OTP
         otp_code = generate_otp()
-        expires_at = datetime.utcnow() + timedelta(minutes=10)  # OTP expires in 10 minutes
-        
-        # Save OTP to database
-        otp_record = OTP(
-            mobile_number=mobile_number,
-            otp_code=otp_code,
-            expires_at=expires_at
-        )
-        db.session.add(otp_record)
+        
+        # Save OTP; it expires after OTP_TTL seconds
+        issue_otp(mobile_number, otp_code)
         db.session.commit()
         
+        _sweep_expired_otps()
+        
         # Send OTP via SMS
         if send_otp_sms(mobile_number, otp_code):
             return {"success": True, "message": "OTP sent successfully"}
@@ -51,24 +63,23 @@ def request_otp(mobile_number):
         db.session.rollback()
         return {"success": False, "message": "Failed to generate OTP"}
 
+def _sweep_expired_otps():
+    """Keep otp_codes small; a failed sweep never fails the OTP request"""
+    try:
+        if maybe_sweep_expired_otps():
+            db.session.commit()
+    except Exception as e:
+        logger.error(f"Error sweeping expired OTPs: {str(e)}")
+        db.session.rollback()
+
 def verify_otp(mobile_number, otp_code):
     """Verify OTP and return user token"""
     try:
-        # Find valid OTP
-        otp_record = OTP.query.filter_by(
-            mobile_number=mobile_number,
-            otp_code=otp_code,
-            is_used=False
-        ).filter(
-            OTP.expires_at > datetime.utcnow()
-        ).first()
-        
-        if not otp_record:
+        # Check and mark the OTP used in one step
+        if not consume_otp(mobile_number, otp_code):
+            db.session.rollback()
             return {"success": False, "message": "Invalid or expired OTP"}
         
-        # Mark OTP as used
-        otp_record.is_used = True
-        
         # Find or create user
         user = User.query.filter_by(mobile_number=mobile_number).first()
         if not user:
@@ -128,6 +139,8 @@ def login_with_email(email, password):
             }
         }
         
+    except PasswordHashingOverloaded:
+        raise
     except Exception as e:
         logger.error(f"Error during email login: {str(e)}")
         return {"success": False, "message": "Login failed"}
@@ -171,12 +184,46 @@ def login_with_abha(abha_id):
         db.session.rollback()
         return {"success": False, "message": "ABHA login failed"}
 
+def _user_values(user):
+    return {
+        attr.key: getattr(user, attr.key)
+        for attr in User.__mapper__.column_attrs
+        if attr.key not in _UNCACHED_USER_COLUMNS
+    }
+
+def _attach_cached_user(values):
+    """Rebuild a persistent User in the current session from cached values, without a query"""
+    user = User()
+    for key, value in values.items():
+        set_committed_value(user, key, value)
+    make_transient_to_detached(user)
+    return db.session.merge(user, load=False)
+
+def load_user(user_id):
+    """Load a user through the per-worker cache; unknown ids are not cached"""
+    values = _user_cache.get(user_id)
+    if values is not None:
+        return _attach_cached_user(values)
+    
+    user = User.query.get(user_id)
+    if user:
+        _user_cache.set(user_id, _user_values(user))
+    return user
+
+def get_user_cache_stats():
+    return _user_cache.stats()
+
+def get_current_user_id():
+    """Id of the authenticated user straight from the JWT, for routes that need nothing else"""
+    return get_jwt_identity()
+
 def get_current_user():
-    """Get current authenticated user"""
+    """Get current authenticated user, resolved once per request"""
+    if 'current_user' in g:
+        return g.current_user
     try:
-        user_id = get_jwt_identity()
-        user = User.query.get(user_id)
-        return user
+        g.current_user = load_user(get_jwt_identity())
+        return g.current_user
     except Exception as e:
         logger.error(f"Error getting current user: {str(e)}")
         return None
@@ -224,3 +271,28 @@ def update_user_profile(user_data):
         logger.error(f"Error updating user profile: {str(e)}")
         db.session.rollback()
         return {"success": False, "message": "Failed to update profile"}
+
+
+def _on_user_write(mapper, connection, target):
+    """Drop the cached user on flush and again once the write commits"""
+    _user_cache.invalidate(target.id)
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault(_SESSION_USERS, set()).add(target.id)
+
+
+def _on_session_commit(session):
+    # A reader may have refilled the cache between flush and commit
+    for user_id in session.info.pop(_SESSION_USERS, ()):
+        _user_cache.invalidate(user_id)
+
+
+def _on_session_rollback(session, previous_transaction):
+    if not previous_transaction.nested:
+        session.info.pop(_SESSION_USERS, None)
+
+
+event.listen(User, 'after_update', _on_user_write)
+event.listen(User, 'after_delete', _on_user_write)
+event.listen(Session, 'after_commit', _on_session_commit)
+event.listen(Session, 'after_soft_rollback', _on_session_rollback)
@@ -0,0 +1,257 @@
+import os
+import time as clock
+import logging
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from datetime import datetime, date, time, timedelta
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, object_session
+from app import db
+from models import Doctor, Appointment
+from hmis_integration import get_doctor_availability, submit_hmis_call, invalidate_doctor_availability
+from slot_holds import get_slot_holders
+
+logger = logging.getLogger(__name__)
+
+# Longest range one availability request may cover
+MAX_RANGE_DAYS = 31
+# Most doctors one batch availability request may cover
+MAX_BATCH_DOCTORS = 50
+# Most HMIS (doctor, day) lookups one request may queue on the shared HMIS pool;
+# beyond this HMIS doctors get a shorter day window
+MAX_HMIS_CALLS_PER_REQUEST = int(os.environ.get("MAX_HMIS_CALLS_PER_REQUEST", "62"))
+# Seconds one request waits for HMIS availability before answering with what it has
+HMIS_AVAILABILITY_DEADLINE = float(os.environ.get("HMIS_AVAILABILITY_DEADLINE", "3"))
+
+
+def iter_dates(start_date, end_date):
+    """Yield every date from start_date to end_date inclusive"""
+    day = start_date
+    while day <= end_date:
+        yield day
+        day += timedelta(days=1)
+
+
+def slot_key(value):
+    """Format a time as the 'HH:MM' string used in doctor availability"""
+    return value.strftime('%H:%M')
+
+
+def get_booked_slots_by_doctor(doctor_ids, start_date, end_date):
+    """
+    Return {doctor_id: set of (date, 'HH:MM')} for the slots taken in a date range
+    One query over appointments for all doctors; only the slot columns are fetched
+    and cancelled appointments free their slot
+    """
+    booked = {doctor_id: set() for doctor_id in doctor_ids}
+    if not booked:
+        return booked
+
+    rows = db.session.query(
+        Appointment.doctor_id,
+        Appointment.appointment_date,
+        Appointment.appointment_time
+    ).filter(
+        Appointment.doctor_id.in_(list(booked)),
+        Appointment.appointment_date >= datetime.combine(start_date, time.min),
+        Appointment.appointment_date < datetime.combine(end_date + timedelta(days=1), time.min),
+        Appointment.status != 'cancelled'
+    ).all()
+
+    for doctor_id, appointment_date, appointment_time in rows:
+        if isinstance(appointment_date, datetime):
+            appointment_date = appointment_date.date()
+        booked[doctor_id].add((appointment_date, slot_key(appointment_time)))
+    return booked
+
+
+def get_booked_slots(doctor_id, start_date, end_date):
+    """Return the set of (date, 'HH:MM') slots taken for one doctor in a date range"""
+    return get_booked_slots_by_doctor([doctor_id], start_date, end_date)[doctor_id]
+
+
+def _local_slots(weekly, days):
+    """Slots of a local doctor's weekly schedule for each day"""
+    weekly = weekly or {}
+    return {day: list(weekly.get(day.strftime('%A').lower(), [])) for day in days}
+
+
+def _hmis_slots(doctor_ids, days):
+    """
+    HMIS slots for every (doctor, day), fetched concurrently within a call budget and deadline
+    Returns (slots_by_doctor, errors, partial); errors maps a doctor to its first
+    failed HMIS response, partial is True when some days were not fetched and are
+    reported without slots
+    """
+    partial = False
+    errors = {
+        doctor_id: {"success": False, "message": "Too many HMIS doctors in one request"}
+        for doctor_id in doctor_ids[MAX_HMIS_CALLS_PER_REQUEST:]
+    }
+    doctor_ids = doctor_ids[:MAX_HMIS_CALLS_PER_REQUEST]
+    fetch_days = days[:max(1, MAX_HMIS_CALLS_PER_REQUEST // max(len(doctor_ids), 1))]
+    if len(fetch_days) < len(days):
+        partial = True
+
+    futures = [
+        (doctor_id, day, submit_hmis_call(get_doctor_availability, doctor_id, day))
+        for doctor_id in doctor_ids
+        for day in fetch_days
+    ]
+
+    deadline = clock.monotonic() + HMIS_AVAILABILITY_DEADLINE
+    slots_by_doctor = {doctor_id: {day: [] for day in days} for doctor_id in doctor_ids}
+    for doctor_id, day, future in futures:
+        try:
+            result, _ = future.result(timeout=max(deadline - clock.monotonic(), 0))
+        except FutureTimeoutError:
+            # Drop it from the queue if no worker has picked it up yet
+            future.cancel()
+            partial = True
+            continue
+        if not result['success']:
+            errors.setdefault(doctor_id, result)
+            continue
+        slots_by_doctor[doctor_id][day] = result['slots']
+
+    if partial:
+        logger.warning("HMIS availability incomplete: call budget or deadline reached")
+    for doctor_id in errors:
+        slots_by_doctor.pop(doctor_id, None)
+    return slots_by_doctor, errors, partial
+
+
+def get_availability_by_doctor(doctor_ids, start_date, end_date, viewer_id=None):
+    """
+    Free slots per doctor and day for local and HMIS doctors
+    Returns (days, free_by_doctor, errors, partial); free_by_doctor[doctor_id] is a list
+    of slot lists aligned with days, errors holds failed HMIS responses and
+    partial is True when some HMIS days could not be fetched
+    Slots held by anyone other than viewer_id are left out
+    """
+    days = list(iter_dates(start_date, end_date))
+    doctor_ids = list(dict.fromkeys(doctor_ids))
+
+    weekly_by_doctor = dict(
+        db.session.query(Doctor.id, Doctor.availability).filter(Doctor.id.in_(doctor_ids)).all()
+    ) if doctor_ids else {}
+    slots_by_doctor = {
+        doctor_id: _local_slots(weekly, days) for doctor_id, weekly in weekly_by_doctor.items()
+    }
+
+    hmis_ids = [doctor_id for doctor_id in doctor_ids if doctor_id not in weekly_by_doctor]
+    hmis_slots, errors, partial = _hmis_slots(hmis_ids, days)
+    slots_by_doctor.update(hmis_slots)
+
+    booked = get_booked_slots_by_doctor(list(slots_by_doctor), start_date, end_date)
+
+    free_by_doctor = {}
+    for doctor_id in doctor_ids:
+        if doctor_id not in slots_by_doctor:
+            continue
+        taken = booked[doctor_id]
+        free_by_doctor[doctor_id] = [
+            [slot for slot in slots_by_doctor[doctor_id][day] if (day, slot) not in taken]
+            for day in days
+        ]
+
+    holders = get_slot_holders(
+        (doctor_id, day, slot)
+        for doctor_id, day_slots in free_by_doctor.items()
+        for day, slots in zip(days, day_slots)
+        for slot in slots
+    )
+    if holders:
+        for doctor_id, day_slots in free_by_doctor.items():
+            free_by_doctor[doctor_id] = [
+                [slot for slot in slots if holders.get((doctor_id, day, slot), viewer_id) == viewer_id]
+                for day, slots in zip(days, day_slots)
+            ]
+    return days, free_by_doctor, errors, partial
+
+
+def get_availability(doctor_id, start_date, end_date, viewer_id=None):
+    """
+    Free slots per day for a local or HMIS doctor
+    Returns {"success": True, "partial", "days": [{"date", "available_slots"}]} or an error dict
+    """
+    days, free_by_doctor, errors, partial = get_availability_by_doctor([doctor_id], start_date, end_date, viewer_id)
+    if doctor_id in errors:
+        return errors[doctor_id]
+
+    return {
+        "success": True,
+        "partial": partial,
+        "days": [
+            {"date": day.isoformat(), "available_slots": slots}
+            for day, slots in zip(days, free_by_doctor[doctor_id])
+        ]
+    }
+
+
+def get_availability_grid(doctor_ids, start_date, end_date, viewer_id=None):
+    """
+    Compact availability grid for many doctors
+    slots[doctor_id][i] lists the free slots on dates[i]; next_available is the
+    earliest free (date, time) in the window or None
+    """
+    days, free_by_doctor, errors, partial = get_availability_by_doctor(doctor_ids, start_date, end_date, viewer_id)
+
+    next_available = {}
+    for doctor_id, day_slots in free_by_doctor.items():
+        next_available[doctor_id] = next(
+            ({"date": day.isoformat(), "time": slots[0]} for day, slots in zip(days, day_slots) if slots),
+            None
+        )
+
+    return {
+        "success": True,
+        "dates": [day.isoformat() for day in days],
+        "slots": free_by_doctor,
+        "next_available": next_available,
+        "partial": partial,
+        "errors": {doctor_id: result.get('message') for doctor_id, result in errors.items()}
+    }
+
+
+_SESSION_KEYS = 'availability_touched_slots'
+
+
+def _touched_days(target):
+    """(doctor_id, date) pairs an appointment write affects, including pre-update values"""
+    state = inspect(target)
+    doctor_ids = set(state.attrs.doctor_id.history.deleted) | {target.doctor_id}
+    dates = set(state.attrs.appointment_date.history.deleted) | {target.appointment_date}
+    return {(doctor_id, day) for doctor_id in doctor_ids for day in dates if doctor_id and day}
+
+
+def mark_slots_changed(session, touched):
+    """
+    Invalidate cached HMIS availability for (doctor_id, date) pairs now and again
+    once the session commits; for writes that bypass the ORM unit of work
+    """
+    for doctor_id, day in touched:
+        invalidate_doctor_availability(doctor_id, day)
+    if session is not None:
+        session.info.setdefault(_SESSION_KEYS, set()).update(touched)
+
+
+def _on_appointment_write(mapper, connection, target):
+    """Invalidate cached HMIS availability on flush and again once the booking commits"""
+    mark_slots_changed(object_session(target), _touched_days(target))
+
+
+def _on_session_commit(session):
+    # A reader may have refilled the cache between flush and commit
+    for doctor_id, day in session.info.pop(_SESSION_KEYS, ()):
+        invalidate_doctor_availability(doctor_id, day)
+
+
+def _on_session_rollback(session, previous_transaction):
+    session.info.pop(_SESSION_KEYS, None)
+
+
+event.listen(Appointment, 'after_insert', _on_appointment_write)
+event.listen(Appointment, 'after_update', _on_appointment_write)
+event.listen(Appointment, 'after_delete', _on_appointment_write)
+event.listen(Session, 'after_commit', _on_session_commit)
+event.listen(Session, 'after_soft_rollback', _on_session_rollback)
@@ -0,0 +1,101 @@
+"""
+Concurrent booking benchmark
+
+Fires many simultaneous POST /api/appointments requests at one doctor slot and
+checks that exactly one wins while every other request gets a 409.
+
+Usage:
+    DATABASE_URL=postgresql://localhost/phr_bench python benchmarks/booking_concurrency.py --requests 500 --concurrency 100
+
+Without DATABASE_URL a temporary SQLite file database is used.
+"""
+import os
+import sys
+import time
+import logging
+import argparse
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent booking benchmark")
+    parser.add_argument('--requests', type=int, default=300, help="Total booking attempts")
+    parser.add_argument('--concurrency', type=int, default=50, help="Parallel clients")
+    parser.add_argument('--users', type=int, default=20, help="Distinct patients competing for the slot")
+    args = parser.parse_args()
+
+    if not os.environ.get('DATABASE_URL'):
+        db_path = os.path.join(tempfile.mkdtemp(), 'booking_bench.db')
+        os.environ['DATABASE_URL'] = f"sqlite:///{db_path}"
+
+    from app import create_app, db
+    from models import User, Doctor, Appointment
+    from flask_jwt_extended import create_access_token
+
+    logging.disable(logging.INFO)
+
+    app = create_app()
+    app.config['TESTING'] = True
+
+    with app.app_context():
+        doctor = Doctor(name='Dr. Bench', specialty='Cardiology')
+        users = [User(name=f'Bench {i}', mobile_number=f'90000{i:05d}') for i in range(args.users)]
+        db.session.add(doctor)
+        db.session.add_all(users)
+        db.session.commit()
+        doctor_id = doctor.id
+        tokens = [create_access_token(identity=user.id) for user in users]
+
+    payload = {'doctor_id': doctor_id, 'appointment_date': '2030-01-07', 'appointment_time': '09:00'}
+    start_gate = threading.Barrier(args.concurrency)
+    local = threading.local()
+
+    def book(i):
+        if not hasattr(local, 'client'):
+            local.client = app.test_client()
+            # Line every worker up so the first wave really is simultaneous
+            start_gate.wait()
+        headers = {'Authorization': f'Bearer {tokens[i % len(tokens)]}'}
+        started = time.perf_counter()
+        response = local.client.post('/api/appointments', json=payload, headers=headers)
+        return response.status_code, time.perf_counter() - started
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        results = list(executor.map(book, range(args.requests)))
+    elapsed = time.perf_counter() - started
+
+    statuses = {}
+    for status, _ in results:
+        statuses[status] = statuses.get(status, 0) + 1
+    latencies = [latency * 1000 for _, latency in results]
+
+    with app.app_context():
+        booked = Appointment.query.filter_by(doctor_id=doctor_id).count()
+        dialect = db.engine.dialect.name
+
+    print(f"database      : {dialect}")
+    print(f"requests      : {args.requests} ({args.concurrency} concurrent)")
+    print(f"statuses      : {dict(sorted(statuses.items()))}")
+    print(f"rows booked   : {booked}")
+    print(f"throughput    : {args.requests / elapsed:.1f} req/s")
+    print(f"latency p50   : {percentile(latencies, 0.50):.1f} ms")
+    print(f"latency p95   : {percentile(latencies, 0.95):.1f} ms")
+    print(f"latency max   : {max(latencies):.1f} ms")
+
+    ok = statuses.get(200) == 1 and statuses.get(409) == args.requests - 1 and booked == 1
+    print("result        : " + ("PASS - exactly one winner" if ok else "FAIL"))
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,130 @@
+"""
+Login storm benchmark
+
+Floods POST /api/auth/login-email with password logins while a probe client
+keeps calling a non-auth endpoint, and reports login throughput alongside the
+probe's latency, showing how much a storm of password hashing slows down
+unrelated requests.
+
+Usage:
+    python benchmarks/login_storm.py --duration 10 --concurrency 32
+    PASSWORD_HASH_WORKERS=0 python benchmarks/login_storm.py   # hash inline, for comparison
+
+Without DATABASE_URL a temporary SQLite file database is used.
+"""
+import os
+import sys
+import time
+import logging
+import argparse
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Login storm benchmark")
+    parser.add_argument('--duration', type=float, default=10, help="Seconds to run the storm")
+    parser.add_argument('--concurrency', type=int, default=32, help="Parallel login clients")
+    parser.add_argument('--users', type=int, default=20, help="Distinct accounts logging in")
+    parser.add_argument('--probe-interval', type=float, default=0.01, help="Pause between probe requests, in seconds")
+    args = parser.parse_args()
+
+    if not os.environ.get('DATABASE_URL'):
+        db_path = os.path.join(tempfile.mkdtemp(), 'login_bench.db')
+        os.environ['DATABASE_URL'] = f"sqlite:///{db_path}"
+
+    from app import create_app, db
+    from models import User, Doctor
+    from flask_jwt_extended import create_access_token
+    from password_hashing import PASSWORD_HASH_WORKERS, PASSWORD_HASH_MAX_PENDING
+
+    logging.disable(logging.WARNING)
+
+    app = create_app()
+    app.config['TESTING'] = True
+
+    with app.app_context():
+        doctor = Doctor(name='Dr. Bench', specialty='Cardiology', availability={'monday': ['09:00', '10:00']})
+        users = []
+        for i in range(args.users):
+            user = User(name=f'Bench {i}', mobile_number=f'91000{i:05d}', email=f'bench{i}@example.com')
+            user.set_password('correct horse battery staple')
+            users.append(user)
+        db.session.add(doctor)
+        db.session.add_all(users)
+        db.session.commit()
+        probe_path = f'/api/doctors/{doctor.id}/availability?date=2030-01-07'
+        probe_headers = {'Authorization': f'Bearer {create_access_token(identity=users[0].id)}'}
+
+    stop = threading.Event()
+    local = threading.local()
+
+    def storm(i):
+        if not hasattr(local, 'client'):
+            local.client = app.test_client()
+        statuses = {}
+        n = i
+        while not stop.is_set():
+            payload = {'email': f'bench{n % args.users}@example.com', 'password': 'correct horse battery staple'}
+            response = local.client.post('/api/auth/login-email', json=payload)
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+            if response.status_code == 503:
+                # Clients honour Retry-After like the mobile app does
+                stop.wait(float(response.headers.get('Retry-After', 1)))
+            n += args.concurrency
+        return statuses
+
+    def probe(latencies):
+        client = app.test_client()
+        while not stop.is_set():
+            started = time.perf_counter()
+            client.get(probe_path, headers=probe_headers)
+            latencies.append((time.perf_counter() - started) * 1000)
+            time.sleep(args.probe_interval)
+
+    # Probe latency with no load first
+    idle_latencies = []
+    probe_thread = threading.Thread(target=probe, args=(idle_latencies,))
+    probe_thread.start()
+    time.sleep(min(2, args.duration))
+    stop.set()
+    probe_thread.join()
+    stop.clear()
+
+    storm_latencies = []
+    probe_thread = threading.Thread(target=probe, args=(storm_latencies,))
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        futures = [executor.submit(storm, i) for i in range(args.concurrency)]
+        probe_thread.start()
+        time.sleep(args.duration)
+        stop.set()
+        results = [future.result() for future in futures]
+    elapsed = time.perf_counter() - started
+    probe_thread.join()
+
+    statuses = {}
+    for result in results:
+        for status, count in result.items():
+            statuses[status] = statuses.get(status, 0) + count
+
+    print(f"hash workers  : {PASSWORD_HASH_WORKERS} (max pending {PASSWORD_HASH_MAX_PENDING})")
+    print(f"login clients : {args.concurrency} for {elapsed:.1f}s")
+    print(f"login status  : {dict(sorted(statuses.items()))}")
+    print(f"logins ok     : {statuses.get(200, 0) / elapsed:.1f}/s")
+    print(f"logins shed   : {statuses.get(503, 0) / elapsed:.1f}/s")
+    print(f"probe idle    : p50 {percentile(idle_latencies, 0.50):.1f} ms, p99 {percentile(idle_latencies, 0.99):.1f} ms")
+    print(f"probe storm   : p50 {percentile(storm_latencies, 0.50):.1f} ms, p99 {percentile(storm_latencies, 0.99):.1f} ms")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,101 @@
+"""
+Parallel document upload benchmark
+
+Sends several large POST /api/documents uploads at once and reports throughput
+and memory: the traced Python heap peak while the uploads run, and the
+process's peak RSS. With streaming uploads the heap peak stays at a few chunk
+buffers per upload regardless of file size.
+
+Usage:
+    python benchmarks/upload_streaming.py --uploads 8 --concurrency 4 --size-mb 49
+
+Without DATABASE_URL a temporary SQLite file database is used; files go to a
+temporary UPLOAD_FOLDER.
+"""
+import os
+import sys
+import time
+import logging
+import argparse
+import resource
+import tempfile
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Parallel upload benchmark")
+    parser.add_argument('--uploads', type=int, default=8, help="Total uploads")
+    parser.add_argument('--concurrency', type=int, default=4, help="Parallel uploads")
+    parser.add_argument('--size-mb', type=int, default=49, help="Size of each file (the request limit is 50 MB)")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    if not os.environ.get('DATABASE_URL'):
+        os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(workdir, 'upload_bench.db')}"
+    os.environ['UPLOAD_FOLDER'] = os.path.join(workdir, 'uploads')
+
+    from app import create_app, db
+    from models import User
+    from flask_jwt_extended import create_access_token
+    from utils import UPLOAD_CHUNK_SIZE
+
+    logging.disable(logging.INFO)
+
+    app = create_app()
+    app.config['TESTING'] = True
+
+    with app.app_context():
+        user = User(name='Bench', mobile_number='9200000000')
+        db.session.add(user)
+        db.session.commit()
+        headers = {'Authorization': f'Bearer {create_access_token(identity=user.id)}'}
+
+    # One source file on disk, streamed by every client so the client side holds no copy
+    source = os.path.join(workdir, 'source.pdf')
+    with open(source, 'wb') as f:
+        block = os.urandom(1024 * 1024)
+        for _ in range(args.size_mb):
+            f.write(block)
+
+    def upload(i):
+        client = app.test_client()
+        with open(source, 'rb') as f:
+            started = time.perf_counter()
+            response = client.post(
+                '/api/documents',
+                headers=headers,
+                data={'file': (f, f'report_{i}.pdf'), 'document_type': 'test_result'},
+                content_type='multipart/form-data'
+            )
+        return response.status_code, time.perf_counter() - started
+
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    tracemalloc.start()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        results = list(executor.map(upload, range(args.uploads)))
+    elapsed = time.perf_counter() - started
+    _, heap_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    statuses = {}
+    for status, _ in results:
+        statuses[status] = statuses.get(status, 0) + 1
+    total_mb = args.size_mb * statuses.get(200, 0)
+
+    print(f"uploads       : {args.uploads} x {args.size_mb} MB ({args.concurrency} concurrent)")
+    print(f"statuses      : {dict(sorted(statuses.items()))}")
+    print(f"chunk size    : {UPLOAD_CHUNK_SIZE // 1024} KB")
+    print(f"throughput    : {total_mb / elapsed:.1f} MB/s")
+    print(f"slowest       : {max(latency for _, latency in results):.2f} s")
+    print(f"heap peak     : {heap_peak / 1024 / 1024:.1f} MB (traced Python allocations)")
+    print(f"peak RSS      : {rss_after / 1024:.1f} MB (+{(rss_after - rss_before) / 1024:.1f} MB during uploads)")
+    return 0 if statuses.get(200) == args.uploads else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,268 @@
+import os
+import re
+import shutil
+import hashlib
+import logging
+import tempfile
+import click
+from io import BytesIO
+from datetime import datetime, timedelta
+from flask.cli import with_appcontext
+from sqlalchemy import event, inspect, insert, update, delete, select, case
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from app import db
+from models import Blob, Document, Prescription
+from utils import UPLOAD_CHUNK_SIZE, StoredFile, shard_path, stream_to_file
+
+logger = logging.getLogger(__name__)
+
+# Unreferenced blobs are kept this many seconds before a sweep may delete them
+BLOB_RELEASE_GRACE = int(os.environ.get("BLOB_RELEASE_GRACE", "3600"))
+BLOB_SWEEP_BATCH_SIZE = int(os.environ.get("BLOB_SWEEP_BATCH_SIZE", "500"))
+
+# Dialects with INSERT ... ON CONFLICT DO NOTHING
+_CONFLICT_INSERTS = {
+    'postgresql': postgresql.insert,
+    'sqlite': sqlite.insert
+}
+
+_SHA256 = re.compile(r'[0-9a-f]{64}')
+
+# Blob files written in the session's open transaction, by content hash
+_SESSION_WRITTEN = 'blobs_written'
+
+# Columns holding a stored file path; each row is one reference to its blob
+_REFERENCE_COLUMNS = {
+    Document: 'file_path',
+    Prescription: 'prescription_image_path'
+}
+
+
+def blob_folder():
+    return os.path.join(os.environ.get("UPLOAD_FOLDER", "uploads"), 'blobs')
+
+
+def blob_path(sha256):
+    """Where the blob with this content hash is written, sharded by the hash itself"""
+    return shard_path(blob_folder(), sha256, key=sha256)
+
+
+def blob_key(path):
+    """Content hash of the blob a stored path points at, or None for files outside the blob store"""
+    if not path:
+        return None
+    name = os.path.basename(path)
+    return name if _SHA256.fullmatch(name) else None
+
+
+def _hash_stream(stream, chunk_size):
+    digest = hashlib.sha256()
+    size = 0
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            break
+        digest.update(chunk)
+        size += len(chunk)
+    return digest.hexdigest(), size
+
+
+def _claim(sha256):
+    """Take one more reference on an existing blob; returns its path, or None if there is no such blob"""
+    result = db.session.execute(
+        update(Blob).where(Blob.sha256 == sha256).values(ref_count=Blob.ref_count + 1, released_at=None),
+        execution_options={"synchronize_session": False}
+    )
+    if not result.rowcount:
+        return None
+    return db.session.execute(select(Blob.file_path).where(Blob.sha256 == sha256)).scalar()
+
+
+def _insert(sha256, path, size, connection=None, ref_count=1):
+    """
+    Add a blob row holding ref_count references, released already if that is 0;
+    False if a row for the same content exists (a concurrent upload won)
+    Runs in the session's transaction unless given a connection
+    """
+    executor = db.session if connection is None else connection
+    dialect = (connection or db.session.get_bind()).dialect
+    now = datetime.utcnow()
+    values = dict(sha256=sha256, file_path=path, size=size, ref_count=ref_count, created_at=now,
+                  released_at=None if ref_count else now)
+    conflict_insert = _CONFLICT_INSERTS.get(dialect.name)
+    if conflict_insert is not None:
+        return executor.execute(conflict_insert(Blob).values(**values).on_conflict_do_nothing()).rowcount > 0
+    try:
+        with executor.begin_nested():
+            executor.execute(insert(Blob).values(**values))
+        return True
+    except IntegrityError:
+        return False
+
+
+def store_blob(stream, chunk_size=UPLOAD_CHUNK_SIZE):
+    """
+    Store a stream under its content hash and take a reference on it for the row
+    the caller is about to save; the caller commits
+    Content that is already stored costs one hashing pass and nothing on disk.
+    If the caller rolls back or never commits, a file written here is left to the sweep.
+    Returns StoredFile(path, size, sha256)
+    """
+    os.makedirs(blob_folder(), exist_ok=True)
+    if not stream.seekable():
+        # Spool once so the content can be hashed before deciding whether to keep it
+        with tempfile.TemporaryFile(dir=blob_folder()) as spool:
+            shutil.copyfileobj(stream, spool, chunk_size)
+            spool.seek(0)
+            return store_blob(spool, chunk_size)
+
+    start = stream.tell()
+    sha256, size = _hash_stream(stream, chunk_size)
+
+    claimed_path = _claim(sha256)
+    if claimed_path is not None and os.path.exists(claimed_path):
+        logger.info(f"Upload matches stored blob {sha256} ({size} bytes)")
+        return StoredFile(claimed_path, size, sha256)
+
+    stream.seek(start)
+    path = claimed_path or blob_path(sha256)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    stored = stream_to_file(stream, path, chunk_size)
+    if stored.sha256 != sha256:
+        os.unlink(stored.path)
+        raise ValueError("Upload changed while it was being stored")
+
+    db.session.info.setdefault(_SESSION_WRITTEN, {})[sha256] = (stored.path, size)
+    if claimed_path is None and not _insert(sha256, stored.path, size):
+        # Same content stored concurrently under the same path; share its row
+        _claim(sha256)
+    logger.info(f"Blob stored: {stored.path} ({size} bytes)")
+    return stored
+
+
+def store_blob_bytes(data):
+    """store_blob for content already in memory"""
+    return store_blob(BytesIO(data))
+
+
+def _release(connection, sha256):
+    blobs = Blob.__table__
+    connection.execute(
+        update(blobs).where(blobs.c.sha256 == sha256).values(
+            ref_count=blobs.c.ref_count - 1,
+            released_at=case((blobs.c.ref_count <= 1, datetime.utcnow()), else_=blobs.c.released_at)
+        )
+    )
+
+
+def _stored_path(mapper, connection, target):
+    """The path a row holds in the database, before this flush changes it"""
+    column = _REFERENCE_COLUMNS[mapper.class_]
+    state = inspect(target)
+    history = state.attrs[column].history
+    if history.deleted:
+        return history.deleted[0]
+    if history.unchanged:
+        return history.unchanged[0]
+    # Assigned without the old value ever being loaded
+    table = mapper.local_table
+    return connection.execute(select(table.c[column]).where(table.c.id == state.identity[0])).scalar()
+
+
+def _on_reference_update(mapper, connection, target):
+    """A row pointed at another file gives back its reference on the old blob"""
+    history = inspect(target).attrs[_REFERENCE_COLUMNS[mapper.class_]].history
+    if not history.added:
+        return
+    old = blob_key(_stored_path(mapper, connection, target))
+    if old and old != blob_key(history.added[0]):
+        _release(connection, old)
+
+
+def _on_reference_delete(mapper, connection, target):
+    key = blob_key(_stored_path(mapper, connection, target))
+    if key:
+        _release(connection, key)
+
+
+def sweep_released_blobs(grace=BLOB_RELEASE_GRACE, batch_size=BLOB_SWEEP_BATCH_SIZE):
+    """
+    Delete one batch of blobs nothing has referenced for grace seconds, files
+    included; commits and returns how many were removed
+    Each file is unlinked while its row deletion is still uncommitted, so an
+    upload of the same content waits for the sweep and then stores it afresh
+    """
+    cutoff = datetime.utcnow() - timedelta(seconds=grace)
+    candidates = db.session.execute(
+        select(Blob.sha256, Blob.file_path)
+        .where(Blob.ref_count <= 0, Blob.released_at <= cutoff)
+        .limit(batch_size)
+    ).all()
+
+    removed = 0
+    for sha256, path in candidates:
+        # Re-checked per row: an upload may have claimed it since the select
+        result = db.session.execute(
+            delete(Blob).where(Blob.sha256 == sha256, Blob.ref_count <= 0),
+            execution_options={"synchronize_session": False}
+        )
+        if not result.rowcount:
+            continue
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+        removed += 1
+    db.session.commit()
+
+    if removed:
+        logger.info(f"Swept {removed} unreferenced blobs")
+    return removed
+
+
+@click.command('sweep-blobs')
+@click.option('--grace', default=BLOB_RELEASE_GRACE, show_default=True, help="Seconds a blob must have been unreferenced")
+@click.option('--batch-size', default=BLOB_SWEEP_BATCH_SIZE, show_default=True, help="Blobs deleted per transaction")
+@with_appcontext
+def sweep_blobs_command(grace, batch_size):
+    """Delete blobs nothing has referenced for the grace period; run periodically, e.g. from cron"""
+    removed = 0
+    while True:
+        swept = sweep_released_blobs(grace, batch_size)
+        removed += swept
+        if swept < batch_size:
+            break
+    click.echo(f"Removed {removed} unreferenced blobs")
+
+
+def _on_session_commit(session):
+    session.info.pop(_SESSION_WRITTEN, None)
+
+
+def _on_transaction_end(session, transaction):
+    """
+    Give files written by a transaction that ended without committing (rolled
+    back or closed) an unreferenced blob row, so the sweep deletes them unless
+    the same content is uploaded again first
+    """
+    if transaction.nested or transaction.parent is not None:
+        return
+    written = session.info.pop(_SESSION_WRITTEN, None)
+    if not written:
+        return
+    try:
+        with session.get_bind().begin() as connection:
+            for sha256, (path, size) in written.items():
+                _insert(sha256, path, size, connection=connection, ref_count=0)
+    except Exception as e:
+        logger.error(f"Could not record {len(written)} orphaned blob files: {str(e)}")
+
+
+for _model in _REFERENCE_COLUMNS:
+    event.listen(_model, 'before_update', _on_reference_update)
+    event.listen(_model, 'before_delete', _on_reference_delete)
+
+event.listen(Session, 'after_commit', _on_session_commit)
+event.listen(Session, 'after_transaction_end', _on_transaction_end)
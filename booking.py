@@ -0,0 +1,154 @@
+import os
+import uuid
+import logging
+from datetime import datetime, date, time, timedelta
+from sqlalchemy import insert
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+from app import db
+from models import Appointment
+from availability import get_booked_slots, mark_slots_changed, slot_key
+from slot_holds import get_slot_holders
+
+logger = logging.getLogger(__name__)
+
+# Largest appointment series one request may book
+MAX_SERIES_OCCURRENCES = int(os.environ.get("MAX_SERIES_OCCURRENCES", "52"))
+
+# Days between occurrences for each supported recurrence frequency
+RECURRENCE_DAYS = {
+    'daily': 1,
+    'weekly': 7
+}
+
+# Dialects with INSERT ... ON CONFLICT DO NOTHING
+_CONFLICT_INSERTS = {
+    'postgresql': postgresql.insert,
+    'sqlite': sqlite.insert
+}
+
+
+def as_slot_date(value):
+    """Appointment dates are stored as midnight datetimes so slot keys compare equal"""
+    if isinstance(value, datetime):
+        return datetime.combine(value.date(), time.min)
+    if isinstance(value, date):
+        return datetime.combine(value, time.min)
+    return value
+
+
+def insert_appointments(rows):
+    """
+    Insert many appointments in one statement, skipping rows whose slot is taken
+    The unique slot index on (doctor_id, appointment_date, appointment_time) for
+    non-cancelled rows decides the winners; returns ids aligned with rows, None
+    for each conflict. Does not commit
+    """
+    if not rows:
+        return []
+
+    rows = [dict(row) for row in rows]
+    for row in rows:
+        row['appointment_date'] = as_slot_date(row['appointment_date'])
+        row.setdefault('id', str(uuid.uuid4()))
+
+    dialect = db.session.get_bind().dialect.name
+    conflict_insert = _CONFLICT_INSERTS.get(dialect)
+    if conflict_insert is not None:
+        # No conflict target: deployed schemas carry extra predicates on the partial index
+        statement = conflict_insert(Appointment).values(rows).on_conflict_do_nothing().returning(Appointment.id)
+        inserted = set(db.session.execute(statement).scalars())
+    else:
+        inserted = set()
+        for row in rows:
+            try:
+                with db.session.begin_nested():
+                    db.session.execute(insert(Appointment).values(**row))
+                inserted.add(row['id'])
+            except IntegrityError:
+                pass
+
+    for row in rows:
+        if row['id'] not in inserted:
+            logger.info(f"Slot conflict for doctor {row['doctor_id']} at {row['appointment_date']} {row['appointment_time']}")
+
+    mark_slots_changed(db.session, {
+        (row['doctor_id'], row['appointment_date']) for row in rows if row['id'] in inserted
+    })
+    return [row['id'] if row['id'] in inserted else None for row in rows]
+
+
+def insert_appointment(**values):
+    """
+    Insert one appointment unless its slot is already taken
+    Returns the new appointment id or None on conflict. Does not commit
+    """
+    return insert_appointments([values])[0]
+
+
+def expand_recurrence(start_date, frequency='weekly', interval=1, count=None, until=None):
+    """
+    Dates of a daily or weekly series starting on start_date
+    Bounded by count and/or an inclusive until date; raises ValueError on a bad rule
+    """
+    if frequency not in RECURRENCE_DAYS:
+        raise ValueError(f"Frequency must be one of: {', '.join(RECURRENCE_DAYS)}")
+    if not isinstance(interval, int) or interval < 1:
+        raise ValueError("Interval must be a positive integer")
+    if count is None and until is None:
+        raise ValueError("Recurrence needs a count or an until date")
+    if count is not None and (not isinstance(count, int) or count < 1):
+        raise ValueError("Count must be a positive integer")
+    if until is not None and until < start_date:
+        raise ValueError("Until date must not be before the start date")
+
+    step = timedelta(days=RECURRENCE_DAYS[frequency] * interval)
+    dates = []
+    day = start_date
+    while (count is None or len(dates) < count) and (until is None or day <= until):
+        if len(dates) >= MAX_SERIES_OCCURRENCES:
+            raise ValueError(f"A series cannot exceed {MAX_SERIES_OCCURRENCES} occurrences")
+        dates.append(day)
+        day += step
+    return dates
+
+
+def book_series(user_id, doctor_id, dates, appointment_time, **fields):
+    """
+    Book the same time slot on every date
+    Taken slots are found with one query over the whole range and the free ones
+    inserted with one batched statement; returns (booked, conflicts) where booked
+    is [(date, appointment_id)] and conflicts the dates that could not be booked
+    Slots held by other users count as taken. Does not commit
+    """
+    if not dates:
+        return [], []
+
+    taken = get_booked_slots(doctor_id, min(dates), max(dates))
+    slot = slot_key(appointment_time)
+    holders = get_slot_holders((doctor_id, day, slot) for day in dates)
+    taken.update((day, slot) for (_, day, _), holder in holders.items() if holder != user_id)
+
+    free_dates = [day for day in dates if (day, slot) not in taken]
+    conflicts = [day for day in dates if (day, slot) in taken]
+
+    appointment_ids = insert_appointments([
+        dict(
+            fields,
+            user_id=user_id,
+            doctor_id=doctor_id,
+            appointment_date=day,
+            appointment_time=appointment_time
+        )
+        for day in free_dates
+    ])
+
+    booked = []
+    for day, appointment_id in zip(free_dates, appointment_ids):
+        if appointment_id:
+            booked.append((day, appointment_id))
+        else:
+            # Lost a race after the range check
+            conflicts.append(day)
+
+    return booked, sorted(conflicts)
@@ -0,0 +1,144 @@
+import time
+import logging
+import threading
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitOpenError(Exception):
+    """Raised when a call is rejected because the circuit is open"""
+    pass
+
+
+class CircuitBreaker:
+    """
+    Count-based circuit breaker over the last window_size calls
+    Opens when the failure rate or slow-call rate reaches its threshold,
+    rejects calls for cooldown seconds, then lets a single probe through
+    """
+
+    def __init__(self, name="circuit", window_size=20, minimum_calls=10,
+                 failure_rate_threshold=0.5, slow_call_threshold=2.0,
+                 slow_call_rate_threshold=0.5, cooldown=30):
+        self.name = name
+        self.window_size = window_size
+        self.minimum_calls = minimum_calls
+        self.failure_rate_threshold = failure_rate_threshold
+        self.slow_call_threshold = slow_call_threshold
+        self.slow_call_rate_threshold = slow_call_rate_threshold
+        self.cooldown = cooldown
+        self.reset()
+
+    def reset(self):
+        """Return to a closed circuit with an empty window"""
+        # Also used after fork, where a lock held by another parent thread would never be released
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._window = deque(maxlen=self.window_size)
+        self._opened_at = None
+        self._probe_started_at = None
+        self._stats = {
+            "calls": 0,
+            "failures": 0,
+            "slow_calls": 0,
+            "rejected": 0,
+            "opened": 0
+        }
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._state
+
+    def allow_request(self):
+        """
+        Decide whether a call may proceed
+        In half-open state only one probe is in flight at a time
+        """
+        with self._lock:
+            now = time.monotonic()
+            if self._state == OPEN and now - self._opened_at >= self.cooldown:
+                self._state = HALF_OPEN
+                self._probe_started_at = None
+
+            if self._state == CLOSED:
+                return True
+
+            if self._state == HALF_OPEN:
+                # A probe that never reported back must not wedge the circuit
+                if self._probe_started_at is None or now - self._probe_started_at >= self.cooldown:
+                    self._probe_started_at = now
+                    return True
+
+            self._stats["rejected"] += 1
+            return False
+
+    def record(self, success, elapsed):
+        """Record the outcome and duration in seconds of a permitted call"""
+        slow = elapsed >= self.slow_call_threshold
+        with self._lock:
+            self._stats["calls"] += 1
+            if not success:
+                self._stats["failures"] += 1
+            if slow:
+                self._stats["slow_calls"] += 1
+
+            if self._state == HALF_OPEN:
+                if success and not slow:
+                    logger.info(f"Circuit {self.name} closed after successful probe")
+                    self._state = CLOSED
+                    self._window.clear()
+                    self._probe_started_at = None
+                else:
+                    self._trip()
+                return
+
+            if self._state != CLOSED:
+                return
+
+            self._window.append((success, slow))
+            if len(self._window) < self.minimum_calls:
+                return
+
+            failure_rate, slow_call_rate = self._rates()
+            if failure_rate >= self.failure_rate_threshold or slow_call_rate >= self.slow_call_rate_threshold:
+                logger.warning(
+                    f"Circuit {self.name} opened: failure rate {failure_rate:.2f}, "
+                    f"slow call rate {slow_call_rate:.2f}"
+                )
+                self._trip()
+
+    def _trip(self):
+        """Open the circuit; caller holds the lock"""
+        self._state = OPEN
+        self._opened_at = time.monotonic()
+        self._probe_started_at = None
+        self._window.clear()
+        self._stats["opened"] += 1
+
+    def _rates(self):
+        """(failure_rate, slow_call_rate) over the window; caller holds the lock"""
+        if not self._window:
+            return 0.0, 0.0
+        failures = sum(1 for success, _ in self._window if not success)
+        slow_calls = sum(1 for _, slow in self._window if slow)
+        return failures / len(self._window), slow_calls / len(self._window)
+
+    def stats(self):
+        """Snapshot of the breaker state and counters"""
+        with self._lock:
+            failure_rate, slow_call_rate = self._rates()
+            stats = dict(self._stats)
+            stats["state"] = self._state
+            stats["window_calls"] = len(self._window)
+            stats["failure_rate"] = round(failure_rate, 3)
+            stats["slow_call_rate"] = round(slow_call_rate, 3)
+            stats["retry_in"] = None
+            if self._state == OPEN:
+                stats["retry_in"] = round(max(0.0, self.cooldown - (time.monotonic() - self._opened_at)), 2)
+            return stats
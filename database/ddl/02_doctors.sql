@@ -40,6 +40,11 @@ CREATE INDEX idx_doctors_hmis_id ON doctors(hmis_id) WHERE hmis_id IS NOT NULL;
 CREATE INDEX idx_doctors_is_deleted ON doctors(is_deleted);
 CREATE INDEX idx_doctors_created_at ON doctors(created_at);
 
+-- Trigram indexes for typo-tolerant doctor search (similarity / word_similarity)
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+CREATE INDEX idx_doctors_name_trgm ON doctors USING gin (name gin_trgm_ops);
+CREATE INDEX idx_doctors_specialty_trgm ON doctors USING gin (specialty gin_trgm_ops);
+
 -- Create trigger for updated_at
 CREATE TRIGGER update_doctors_updated_at BEFORE UPDATE ON doctors
     FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
@@ -11,8 +11,9 @@ CREATE TABLE appointments (
     doctor_id VARCHAR(36) NOT NULL,
     appointment_date DATE NOT NULL,
     appointment_time TIME NOT NULL,
-    status VARCHAR(20) DEFAULT 'scheduled' CHECK (status IN ('scheduled', 'confirmed', 'completed', 'cancelled', 'no_show')),
+    status VARCHAR(20) DEFAULT 'scheduled' CHECK (status IN ('pending', 'scheduled', 'confirmed', 'completed', 'cancelled', 'no_show')),
     symptoms TEXT,
+    consultation_type VARCHAR(20) DEFAULT 'in-person' CHECK (consultation_type IN ('in-person', 'video', 'audio')),
     notes TEXT,
     consultation_fee DECIMAL(10,2),
     booking_source VARCHAR(20) DEFAULT 'phr_app' CHECK (booking_source IN ('phr_app', 'hmis', 'phone', 'walk_in')),
@@ -39,6 +40,7 @@ CREATE INDEX idx_appointments_booking_source ON appointments(booking_source);
 CREATE INDEX idx_appointments_hmis_id ON appointments(hmis_appointment_id) WHERE hmis_appointment_id IS NOT NULL;
 CREATE INDEX idx_appointments_is_deleted ON appointments(is_deleted);
 CREATE INDEX idx_appointments_created_at ON appointments(created_at);
+CREATE INDEX idx_appointments_doctor_date_time ON appointments(doctor_id, appointment_date, appointment_time) INCLUDE (status, consultation_type, id);
 
 -- Create trigger for updated_at
 CREATE TRIGGER update_appointments_updated_at BEFORE UPDATE ON appointments
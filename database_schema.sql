@@ -3,6 +3,9 @@
 -- Note: No foreign key constraints as per requirements
 
 -- Drop tables if they exist (for clean setup)
+DROP TABLE IF EXISTS blobs CASCADE;
+DROP TABLE IF EXISTS revoked_tokens CASCADE;
+DROP TABLE IF EXISTS outbox_events CASCADE;
 DROP TABLE IF EXISTS record_summaries CASCADE;
 DROP TABLE IF EXISTS ambulance_bookings CASCADE;
 DROP TABLE IF EXISTS ambulance_services CASCADE;
@@ -76,12 +79,14 @@ CREATE TABLE appointments (
     doctor_id VARCHAR(36) NOT NULL,
     appointment_date DATE NOT NULL,
     appointment_time TIME NOT NULL,
-    status VARCHAR(20) DEFAULT 'scheduled' CHECK (status IN ('scheduled', 'completed', 'cancelled')),
+    status VARCHAR(20) DEFAULT 'scheduled' CHECK (status IN ('pending', 'scheduled', 'completed', 'cancelled')),
     symptoms TEXT,
     notes TEXT,
     consultation_type VARCHAR(20) DEFAULT 'in-person' CHECK (consultation_type IN ('in-person', 'video', 'audio')),
     payment_status VARCHAR(20) DEFAULT 'pending' CHECK (payment_status IN ('pending', 'paid', 'failed', 'refunded')),
     amount DECIMAL(10, 2),
+    hmis_appointment_id VARCHAR(50),
+    confirmation_number VARCHAR(50),
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
@@ -289,14 +294,48 @@ CREATE TABLE record_summaries (
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
+-- Create Outbox Events table
+CREATE TABLE outbox_events (
+    id VARCHAR(36) PRIMARY KEY DEFAULT gen_random_uuid()::text,
+    event_type VARCHAR(50) NOT NULL,
+    payload JSONB NOT NULL,
+    status VARCHAR(20) DEFAULT 'pending' CHECK (status IN ('pending', 'dispatched', 'failed')),
+    attempts INTEGER DEFAULT 0,
+    available_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    last_error TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    dispatched_at TIMESTAMP
+);
+
+-- Create Revoked Tokens table (JWT denylist; loaded into an in-memory Bloom filter)
+CREATE TABLE revoked_tokens (
+    jti VARCHAR(36) PRIMARY KEY,
+    user_id VARCHAR(36) NOT NULL,
+    revoked_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Create Blobs table (uploaded files stored once per content hash, referenced by documents and prescriptions)
+CREATE TABLE blobs (
+    sha256 VARCHAR(64) PRIMARY KEY,
+    file_path VARCHAR(500) NOT NULL,
+    size BIGINT NOT NULL,
+    ref_count INTEGER NOT NULL DEFAULT 0,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    released_at TIMESTAMP
+);
+
 -- Create indexes for better performance
 CREATE INDEX idx_users_mobile_number ON users(mobile_number);
 CREATE INDEX idx_users_email ON users(email);
 CREATE INDEX idx_users_abha_id ON users(abha_id);
-CREATE INDEX idx_otp_codes_mobile_number ON otp_codes(mobile_number);
+-- OTP verification lookup; used codes drop out of the index
+CREATE INDEX idx_otp_codes_mobile_code_expires ON otp_codes(mobile_number, otp_code, expires_at) WHERE is_used = FALSE;
 CREATE INDEX idx_otp_codes_expires_at ON otp_codes(expires_at);
 CREATE INDEX idx_doctors_specialty ON doctors(specialty);
 CREATE INDEX idx_doctors_hospital_id ON doctors(hospital_id);
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+CREATE INDEX idx_doctors_name_trgm ON doctors USING gin (name gin_trgm_ops);
+CREATE INDEX idx_doctors_specialty_trgm ON doctors USING gin (specialty gin_trgm_ops);
 CREATE INDEX idx_appointments_user_id ON appointments(user_id);
 CREATE INDEX idx_appointments_doctor_id ON appointments(doctor_id);
 CREATE INDEX idx_appointments_date ON appointments(appointment_date);
@@ -317,6 +356,26 @@ CREATE INDEX idx_chat_messages_sender_id ON chat_messages(sender_id);
 CREATE INDEX idx_chat_messages_room_id ON chat_messages(room_id);
 CREATE INDEX idx_ambulance_bookings_user_id ON ambulance_bookings(user_id);
 CREATE INDEX idx_record_summaries_user_id ON record_summaries(user_id);
+CREATE INDEX idx_outbox_events_status_available ON outbox_events(status, available_at);
+CREATE INDEX idx_outbox_events_status_created ON outbox_events(status, created_at);
+CREATE INDEX idx_revoked_tokens_revoked_at ON revoked_tokens(revoked_at);
+CREATE INDEX idx_blobs_released_at ON blobs(released_at);
+
+-- Composite sort keys for keyset (cursor) pagination of list endpoints
+CREATE INDEX idx_appointments_user_date_id ON appointments(user_id, appointment_date, id);
+CREATE INDEX idx_documents_user_created_id ON documents(user_id, created_at, id);
+CREATE INDEX idx_symptoms_created_id ON symptoms(created_at, id);
+CREATE INDEX idx_lab_tests_created_id ON lab_tests(created_at, id);
+CREATE INDEX idx_care_packages_created_id ON care_packages(created_at, id);
+CREATE INDEX idx_ambulance_services_created_id ON ambulance_services(created_at, id);
+
+-- Covering index for doctor schedules and booked-slot lookups
+CREATE INDEX idx_appointments_doctor_date_time ON appointments(doctor_id, appointment_date, appointment_time)
+INCLUDE (status, consultation_type, id);
+
+-- One live booking per slot; cancelled appointments free the slot
+CREATE UNIQUE INDEX idx_appointments_unique_slot ON appointments(doctor_id, appointment_date, appointment_time)
+WHERE status != 'cancelled';
 
 -- Insert sample data for testing (basic reference data)
 
@@ -0,0 +1,269 @@
+import os
+import re
+import time
+import logging
+import threading
+from datetime import datetime
+from flask import g, has_app_context
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+from app import db
+from models import Doctor
+from pagination import paginate_sorted
+
+logger = logging.getLogger(__name__)
+
+# Safety net for changes made by other workers; local writes invalidate immediately
+DOCTOR_DIRECTORY_TTL = int(os.environ.get("DOCTOR_DIRECTORY_TTL", "300"))
+
+_TOKEN_PATTERN = re.compile(r'[a-z0-9]+')
+
+
+def normalize_text(value):
+    """Lowercase and collapse whitespace for matching"""
+    return ' '.join((value or '').lower().split())
+
+
+def tokenize(value):
+    """Split a name into lowercase alphanumeric tokens"""
+    return _TOKEN_PATTERN.findall((value or '').lower())
+
+
+def trigram_sequence(text):
+    """
+    Trigrams of a string in order of appearance, repeats included, as pg_trgm
+    generates them: each word is lowercased and padded with two leading and
+    one trailing space
+    """
+    result = []
+    for word in tokenize(text):
+        padded = f"  {word} "
+        for i in range(len(padded) - 2):
+            result.append(padded[i:i + 3])
+    return result
+
+
+def trigrams(text):
+    """Trigram set of a string, computed the same way as pg_trgm"""
+    return set(trigram_sequence(text))
+
+
+def serialize_doctor(doctor):
+    """Serialize a local doctor row in the /api/doctors response format"""
+    return {
+        "id": doctor.id,
+        "name": doctor.name,
+        "specialty": doctor.specialty,
+        "qualification": doctor.qualification,
+        "experience_years": doctor.experience_years,
+        "hospital_name": doctor.hospital_name,
+        "consultation_fee": float(doctor.consultation_fee) if doctor.consultation_fee else None,
+        "rating": float(doctor.rating) if doctor.rating else None,
+        "profile_image": doctor.profile_image,
+        "source": "local"
+    }
+
+
+def get_doctor_summaries(doctor_ids):
+    """
+    Map doctor id -> {"name", "specialty"} (None for unknown ids)
+    Unseen ids are loaded with one IN query on just those columns and kept on
+    flask.g, so lookups within a request cost at most one query per new batch
+    """
+    doctor_ids = list(doctor_ids)
+    summaries = g.setdefault('doctor_summaries', {}) if has_app_context() else {}
+
+    missing = {doctor_id for doctor_id in doctor_ids if doctor_id not in summaries}
+    if missing:
+        rows = db.session.query(Doctor.id, Doctor.name, Doctor.specialty).filter(Doctor.id.in_(missing)).all()
+        for doctor_id, name, specialty in rows:
+            summaries[doctor_id] = {"name": name, "specialty": specialty}
+        for doctor_id in missing:
+            summaries.setdefault(doctor_id, None)
+
+    return {doctor_id: summaries[doctor_id] for doctor_id in doctor_ids}
+
+
+def snapshot_key(doctor):
+    """(created_at, id) sort key of a doctor in the snapshot, NULL timestamps first"""
+    return doctor.created_at or datetime.min, doctor.id
+
+
+class DoctorSnapshot:
+    """
+    Immutable in-memory copy of the active doctor directory
+    Rows are pre-serialized and indexed by specialty, name tokens and trigrams
+    """
+
+    def __init__(self, doctors, engine=None):
+        self.engine = engine
+        self.rows = []
+        self.keys = []
+        self.by_specialty = {}
+        self.by_name_token = {}
+        self.by_trigram = {}
+        self._names = []
+        self.built_at = time.monotonic()
+
+        for doctor in doctors:
+            position = len(self.rows)
+            self.rows.append(serialize_doctor(doctor))
+            self.keys.append(snapshot_key(doctor))
+            self._names.append(normalize_text(doctor.name))
+            self.by_specialty.setdefault(normalize_text(doctor.specialty), []).append(position)
+            for token in set(tokenize(doctor.name)):
+                self.by_name_token.setdefault(token, set()).add(position)
+            for trigram in trigrams(doctor.name) | trigrams(doctor.specialty):
+                self.by_trigram.setdefault(trigram, []).append(position)
+
+    def _specialty_positions(self, specialty):
+        """Positions whose specialty contains the search term"""
+        term = normalize_text(specialty)
+
+        # Distinct specialties are few, so a substring scan over the keys is cheap
+        positions = set()
+        for key, key_positions in self.by_specialty.items():
+            if term in key:
+                positions.update(key_positions)
+        return positions
+
+    def _name_positions(self, name_search):
+        """Positions whose name contains the search term"""
+        term = normalize_text(name_search)
+        query_tokens = tokenize(term)
+        if not query_tokens:
+            # Punctuation-only terms have no tokens to look up; scan the names
+            return {position for position, name in enumerate(self._names) if term in name}
+
+        positions = None
+        for query_token in query_tokens:
+            token_positions = set()
+            for token, ids in self.by_name_token.items():
+                if query_token in token:
+                    token_positions.update(ids)
+            positions = token_positions if positions is None else positions & token_positions
+            if not positions:
+                return set()
+
+        # Token candidates are a superset; confirm the full term like ILIKE '%term%'
+        return {position for position in positions if term in self._names[position]}
+
+    def _match_positions(self, specialty=None, name_search=None):
+        """Sorted row positions matching the optional filters, or None for all rows"""
+        if not specialty and not name_search:
+            return None
+
+        positions = None
+        if specialty:
+            positions = self._specialty_positions(specialty)
+        if name_search and (positions is None or positions):
+            name_positions = self._name_positions(name_search)
+            positions = name_positions if positions is None else positions & name_positions
+
+        return sorted(positions)
+
+    def search(self, specialty=None, name_search=None):
+        """Return serialized doctors matching the optional filters"""
+        positions = self._match_positions(specialty, name_search)
+        if positions is None:
+            return list(self.rows)
+        return [self.rows[position] for position in positions]
+
+    def search_page(self, specialty=None, name_search=None, cursor=None, limit=50):
+        """Return one keyset page of matching doctors ordered by (created_at, id)"""
+        positions = self._match_positions(specialty, name_search)
+        if positions is None:
+            return paginate_sorted(self.rows, self.keys, cursor, limit)
+        rows = [self.rows[position] for position in positions]
+        keys = [self.keys[position] for position in positions]
+        return paginate_sorted(rows, keys, cursor, limit)
+
+
+class DoctorDirectory:
+    """
+    Per-worker cache of the doctor directory
+    Rebuilt lazily from the database after any Doctor write
+    """
+
+    def __init__(self, ttl=DOCTOR_DIRECTORY_TTL):
+        self.ttl = ttl
+        self._snapshot = None
+        self._version = 0
+        self._lock = threading.Lock()
+
+    def invalidate(self):
+        """Drop the current snapshot so the next read rebuilds it"""
+        with self._lock:
+            self._version += 1
+            self._snapshot = None
+
+    def _is_fresh(self, snapshot):
+        return (
+            snapshot is not None
+            and snapshot.engine is db.engine
+            and (time.monotonic() - snapshot.built_at) < self.ttl
+        )
+
+    def get_snapshot(self):
+        """Return a current snapshot, rebuilding it if needed"""
+        snapshot = self._snapshot
+        if self._is_fresh(snapshot):
+            return snapshot
+
+        with self._lock:
+            snapshot = self._snapshot
+            if self._is_fresh(snapshot):
+                return snapshot
+            version = self._version
+
+        # Rows are kept in snapshot key order so pages can be cut with bisect; sorted
+        # here rather than in SQL, whose NULL placement and collation vary by database
+        doctors = Doctor.query.filter_by(is_active=True).all()
+        doctors.sort(key=snapshot_key)
+        snapshot = DoctorSnapshot(doctors, db.engine)
+
+        with self._lock:
+            # Only publish if no write happened while we were reading
+            if self._version == version:
+                self._snapshot = snapshot
+
+        logger.info(f"Doctor directory rebuilt with {len(snapshot.rows)} doctors")
+        return snapshot
+
+    def search(self, specialty=None, name_search=None):
+        """Search the cached directory"""
+        return self.get_snapshot().search(specialty, name_search)
+
+    def search_page(self, specialty=None, name_search=None, cursor=None, limit=50):
+        """Search the cached directory one keyset page at a time"""
+        return self.get_snapshot().search_page(specialty, name_search, cursor, limit)
+
+
+doctor_directory = DoctorDirectory()
+
+_SESSION_FLAG = 'doctor_directory_dirty'
+
+
+def _on_doctor_write(mapper, connection, target):
+    """Invalidate on flush and flag the session to invalidate again on commit"""
+    doctor_directory.invalidate()
+    session = object_session(target)
+    if session is not None:
+        session.info[_SESSION_FLAG] = True
+
+
+def _on_session_commit(session):
+    # A reader may have rebuilt between flush and commit from pre-commit data
+    if session.info.pop(_SESSION_FLAG, False):
+        doctor_directory.invalidate()
+
+
+def _on_session_rollback(session, previous_transaction):
+    session.info.pop(_SESSION_FLAG, None)
+
+
+event.listen(Doctor, 'after_insert', _on_doctor_write)
+event.listen(Doctor, 'after_update', _on_doctor_write)
+event.listen(Doctor, 'after_delete', _on_doctor_write)
+event.listen(Session, 'after_commit', _on_session_commit)
+event.listen(Session, 'after_soft_rollback', _on_session_rollback)
@@ -0,0 +1,75 @@
+import logging
+from collections import Counter
+from datetime import datetime, time, timedelta
+from app import db
+from models import Appointment
+from availability import iter_dates, slot_key
+
+logger = logging.getLogger(__name__)
+
+SCHEDULE_VIEWS = ('day', 'week')
+
+
+def schedule_range(day, view='day'):
+    """(start, end) dates of the day or Monday-to-Sunday week containing day"""
+    if view not in SCHEDULE_VIEWS:
+        raise ValueError(f"View must be one of: {', '.join(SCHEDULE_VIEWS)}")
+    if view == 'day':
+        return day, day
+    start = day - timedelta(days=day.weekday())
+    return start, start + timedelta(days=6)
+
+
+def get_doctor_schedule(doctor_id, start_date, end_date, detailed=True):
+    """
+    Appointments per day with status counts for one doctor
+    One query reading only columns held in idx_appointments_doctor_date_time
+    Without detailed, days list only the times of active appointments
+    """
+    rows = db.session.query(
+        Appointment.appointment_date,
+        Appointment.appointment_time,
+        Appointment.status,
+        Appointment.consultation_type,
+        Appointment.id
+    ).filter(
+        Appointment.doctor_id == doctor_id,
+        Appointment.appointment_date >= datetime.combine(start_date, time.min),
+        Appointment.appointment_date < datetime.combine(end_date + timedelta(days=1), time.min)
+    ).order_by(
+        Appointment.appointment_date,
+        Appointment.appointment_time
+    ).all()
+
+    days = {day: {"date": day.isoformat(), "appointments": [], "counts": Counter()} for day in iter_dates(start_date, end_date)}
+    totals = Counter()
+
+    for appointment_date, appointment_time, status, consultation_type, appointment_id in rows:
+        if isinstance(appointment_date, datetime):
+            appointment_date = appointment_date.date()
+        day = days[appointment_date]
+        if detailed:
+            day["appointments"].append({
+                "id": appointment_id,
+                "appointment_time": slot_key(appointment_time),
+                "status": status,
+                "consultation_type": consultation_type
+            })
+        elif status != 'cancelled':
+            day["appointments"].append({"appointment_time": slot_key(appointment_time)})
+        day["counts"][status] += 1
+        totals[status] += 1
+
+    schedule = []
+    for day in days.values():
+        day["counts"] = dict(day["counts"])
+        schedule.append(day)
+
+    return {
+        "success": True,
+        "doctor_id": doctor_id,
+        "from": start_date.isoformat(),
+        "to": end_date.isoformat(),
+        "days": schedule,
+        "counts": dict(totals)
+    }
@@ -0,0 +1,189 @@
+import logging
+from collections import Counter
+from sqlalchemy import func, literal, or_
+from app import db
+from models import Doctor
+from doctor_directory import doctor_directory, serialize_doctor, trigram_sequence, trigrams
+
+logger = logging.getLogger(__name__)
+
+# Minimum text similarity for a doctor to be considered a match (pg_trgm default)
+SIMILARITY_THRESHOLD = 0.3
+# Minimum word similarity for the <% operator (pg_trgm.word_similarity_threshold default)
+WORD_SIMILARITY_THRESHOLD = 0.6
+
+# Relevance weights: text match dominates, rating and experience break ties
+TEXT_WEIGHT = 0.7
+RATING_WEIGHT = 0.2
+EXPERIENCE_WEIGHT = 0.1
+MAX_EXPERIENCE_YEARS = 40
+
+def similarity(a, b):
+    """pg_trgm similarity(): shared trigrams over all distinct trigrams"""
+    trigrams_a = a if isinstance(a, set) else trigrams(a)
+    trigrams_b = b if isinstance(b, set) else trigrams(b)
+    if not trigrams_a or not trigrams_b:
+        return 0.0
+    return len(trigrams_a & trigrams_b) / len(trigrams_a | trigrams_b)
+
+
+def word_similarity(query, text):
+    """
+    pg_trgm word_similarity(): the best similarity between the query's trigram
+    set and any contiguous extent of the text's ordered trigrams
+    Port of iterate_word_similarity() from trgm_op.c (non-strict variant): an
+    extent ends on each text trigram found in the query and its start is moved
+    forward while that raises the score
+    """
+    query_trigrams = trigrams(query)
+    sequence = trigram_sequence(text)
+    if not query_trigrams or not sequence:
+        return 0.0
+
+    def score(count, extent_size):
+        return count / (len(query_trigrams) + extent_size - count)
+
+    last_position = {}
+    extent_size = 0
+    count = 0
+    lower = -1
+    best = 0.0
+    for upper, trigram in enumerate(sequence):
+        found = trigram in query_trigrams
+        if lower >= 0 or found:
+            if last_position.get(trigram, -1) < 0:
+                extent_size += 1
+                if found:
+                    count += 1
+            last_position[trigram] = upper
+        if not found:
+            continue
+
+        if lower == -1:
+            lower = upper
+            extent_size = 1
+        current = score(count, extent_size)
+
+        # Try later starts; a trigram leaves the extent at its last position in it
+        tmp_count, tmp_size, previous_lower = count, extent_size, lower
+        for tmp_lower in range(lower, upper + 1):
+            candidate = score(tmp_count, tmp_size)
+            if candidate > current:
+                current, extent_size, lower, count = candidate, tmp_size, tmp_lower, tmp_count
+            dropped = sequence[tmp_lower]
+            if last_position.get(dropped) == tmp_lower:
+                tmp_size -= 1
+                if dropped in query_trigrams:
+                    tmp_count -= 1
+        best = max(best, current)
+
+        for tmp_lower in range(previous_lower, lower):
+            dropped = sequence[tmp_lower]
+            if last_position.get(dropped) == tmp_lower:
+                last_position[dropped] = -1
+    return best
+
+
+def text_score(query, name, specialty):
+    """
+    Best trigram match of the query against name or specialty, or 0.0 when
+    neither the % nor the <% operator would match, as in the PostgreSQL search
+    """
+    best_similarity = max(similarity(query, name), similarity(query, specialty))
+    best_word_similarity = max(word_similarity(query, name), word_similarity(query, specialty))
+    if best_similarity < SIMILARITY_THRESHOLD and best_word_similarity < WORD_SIMILARITY_THRESHOLD:
+        return 0.0
+    return max(best_similarity, best_word_similarity)
+
+
+def relevance(score, rating, experience_years):
+    """Combine text match, rating and experience into one ranking score"""
+    rating_part = min(float(rating or 0), 5.0) / 5.0
+    experience_part = min(experience_years or 0, MAX_EXPERIENCE_YEARS) / MAX_EXPERIENCE_YEARS
+    return TEXT_WEIGHT * score + RATING_WEIGHT * rating_part + EXPERIENCE_WEIGHT * experience_part
+
+
+def _search_postgres(query, limit):
+    """Ranked search using the pg_trgm GIN indexes on name and specialty"""
+    text_match = func.greatest(
+        func.similarity(Doctor.name, query),
+        func.word_similarity(query, Doctor.name),
+        func.similarity(Doctor.specialty, query),
+        func.word_similarity(query, Doctor.specialty)
+    )
+    rank = (
+        TEXT_WEIGHT * text_match
+        + RATING_WEIGHT * func.least(func.coalesce(Doctor.rating, 0), 5) / 5.0
+        + EXPERIENCE_WEIGHT * func.least(func.coalesce(Doctor.experience_years, 0), MAX_EXPERIENCE_YEARS) / float(MAX_EXPERIENCE_YEARS)
+    )
+
+    rows = db.session.query(Doctor, rank.label('relevance')).filter(
+        Doctor.is_active == True,
+        # The % and <% operators are what the gin_trgm_ops indexes can serve
+        or_(
+            Doctor.name.op('%')(query),
+            literal(query).op('<%')(Doctor.name),
+            Doctor.specialty.op('%')(query),
+            literal(query).op('<%')(Doctor.specialty)
+        )
+    ).order_by(rank.desc(), Doctor.id).limit(limit).all()
+
+    results = []
+    for doctor, score in rows:
+        row = serialize_doctor(doctor)
+        row['relevance'] = round(float(score), 4)
+        results.append(row)
+    return results
+
+
+def _search_snapshot(query, limit):
+    """Ranked search over the in-memory directory using its trigram index"""
+    snapshot = doctor_directory.get_snapshot()
+    query_trigrams = trigrams(query)
+    if not query_trigrams:
+        return []
+
+    # Only doctors sharing enough trigrams with the query can pass the threshold
+    hits = Counter()
+    for trigram in query_trigrams:
+        hits.update(snapshot.by_trigram.get(trigram, ()))
+    min_hits = max(1, int(len(query_trigrams) * SIMILARITY_THRESHOLD))
+
+    scored = []
+    for position, count in hits.items():
+        if count < min_hits:
+            continue
+        row = snapshot.rows[position]
+        score = text_score(query, row['name'], row['specialty'])
+        if score < SIMILARITY_THRESHOLD:
+            continue
+        scored.append((relevance(score, row['rating'], row['experience_years']), row['id'], row))
+
+    scored.sort(key=lambda item: (-item[0], item[1]))
+
+    results = []
+    for score, _, row in scored[:limit]:
+        row = dict(row)
+        row['relevance'] = round(score, 4)
+        results.append(row)
+    return results
+
+
+def search_doctors_ranked(query, limit=20):
+    """
+    Typo-tolerant doctor search ranked by similarity, rating and experience
+    Uses pg_trgm on PostgreSQL and an equivalent in-memory index elsewhere
+    """
+    query = ' '.join((query or '').split())
+    if not query:
+        return []
+
+    if db.engine.dialect.name == 'postgresql':
+        try:
+            return _search_postgres(query, limit)
+        except Exception as e:
+            # pg_trgm may not be installed on this database yet
+            logger.error(f"Trigram doctor search failed, using in-memory fallback: {str(e)}")
+            db.session.rollback()
+
+    return _search_snapshot(query, limit)
@@ -0,0 +1,109 @@
+import logging
+import requests
+from app import db
+from models import Appointment, User
+from outbox import enqueue, register_handler, register_failure_handler
+from hmis_integration import post_hmis_booking
+from notification_service import queue_notification
+
+logger = logging.getLogger(__name__)
+
+HMIS_BOOKING_EVENT = 'hmis_booking'
+
+# HMIS answers worth retrying besides 5xx; any other 4xx is a final rejection
+HMIS_RETRYABLE_STATUSES = {408, 425, 429}
+
+
+class HMISBookingError(Exception):
+    """Transient HMIS booking failure; the outbox retries the event with backoff"""
+    pass
+
+
+def is_hmis_doctor(doctor_id):
+    return str(doctor_id).startswith('hmis_')
+
+
+def hmis_idempotency_key(appointment_id):
+    """Stable per appointment, so every retry is the same request to HMIS"""
+    return f"phr-appointment-{appointment_id}"
+
+
+def queue_hmis_booking(appointment_id):
+    """
+    Stage the HMIS booking for a pending appointment in the current transaction
+    The outbox pushes it to HMIS after commit
+    """
+    return enqueue(HMIS_BOOKING_EVENT, {
+        "appointment_id": appointment_id,
+        "idempotency_key": hmis_idempotency_key(appointment_id)
+    })
+
+
+def _reject(appointment, reason):
+    """Free the slot of a booking HMIS did not accept and tell the patient"""
+    appointment.status = 'cancelled'
+    appointment.notes = reason
+    queue_notification(
+        appointment.user_id,
+        "Appointment Not Confirmed",
+        f"The hospital could not confirm your appointment on "
+        f"{appointment.appointment_date.date().isoformat()} at {appointment.appointment_time.strftime('%H:%M')}",
+        "appointment"
+    )
+
+
+@register_handler(HMIS_BOOKING_EVENT, lane='hmis')
+def push_booking_to_hmis(payload):
+    """Book a pending appointment with HMIS and record its confirmation"""
+    appointment = Appointment.query.get(payload["appointment_id"])
+    if not appointment or appointment.status != 'pending':
+        # Cancelled by the patient meanwhile, or already confirmed
+        return
+
+    user = User.query.get(appointment.user_id)
+    if not user:
+        _reject(appointment, "Patient not found")
+        return
+
+    booking = (appointment.doctor_id, appointment.appointment_date.date(), appointment.appointment_time, appointment.symptoms)
+    # Nothing is written yet; end the read transaction so none is open during the HMIS call
+    db.session.expunge(user)
+    db.session.commit()
+
+    try:
+        response = post_hmis_booking(user, *booking, idempotency_key=payload["idempotency_key"])
+    except requests.exceptions.RequestException as e:
+        raise HMISBookingError(f"HMIS unreachable: {str(e)}")
+
+    appointment = Appointment.query.get(payload["appointment_id"])
+    if not appointment or appointment.status != 'pending':
+        # Cancelled while HMIS was booking; keep the cancellation
+        logger.warning(f"Appointment {payload['appointment_id']} changed during HMIS booking")
+        return
+
+    if response.status_code >= 500 or response.status_code in HMIS_RETRYABLE_STATUSES:
+        raise HMISBookingError(f"HMIS returned {response.status_code}")
+
+    if not response.ok:
+        logger.warning(f"HMIS rejected appointment {appointment.id}: {response.status_code} - {response.text}")
+        _reject(appointment, "Rejected by hospital")
+        return
+
+    data = response.json()
+    appointment.hmis_appointment_id = data.get('appointment_id')
+    appointment.confirmation_number = data.get('confirmation_number')
+    appointment.status = 'scheduled'
+    queue_notification(
+        appointment.user_id,
+        "Appointment Confirmed",
+        f"Your appointment is confirmed (confirmation number {appointment.confirmation_number})",
+        "appointment"
+    )
+
+
+@register_failure_handler(HMIS_BOOKING_EVENT)
+def abandon_hmis_booking(payload):
+    """HMIS stayed unavailable through every retry; release the slot"""
+    appointment = Appointment.query.get(payload["appointment_id"])
+    if appointment and appointment.status == 'pending':
+        _reject(appointment, "Hospital system unavailable")
@@ -0,0 +1,158 @@
+import os
+import logging
+import threading
+import requests
+from time import perf_counter
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from circuit_breaker import CircuitBreaker, CircuitOpenError
+
+logger = logging.getLogger(__name__)
+
+# HMIS integration configuration
+HMIS_BASE_URL = os.environ.get("HMIS_BASE_URL", "https://api.hmis-example.com")
+HMIS_API_KEY = os.environ.get("HMIS_API_KEY", "hmis_api_key")
+
+# Connection pool and retry policy
+HMIS_POOL_CONNECTIONS = int(os.environ.get("HMIS_POOL_CONNECTIONS", "4"))
+HMIS_POOL_MAXSIZE = int(os.environ.get("HMIS_POOL_MAXSIZE", "16"))
+HMIS_MAX_RETRIES = int(os.environ.get("HMIS_MAX_RETRIES", "2"))
+HMIS_RETRY_BACKOFF = float(os.environ.get("HMIS_RETRY_BACKOFF", "0.2"))
+HMIS_RETRY_JITTER = float(os.environ.get("HMIS_RETRY_JITTER", "0.1"))
+HMIS_CONNECT_TIMEOUT = float(os.environ.get("HMIS_CONNECT_TIMEOUT", "3.05"))
+HMIS_READ_TIMEOUT = float(os.environ.get("HMIS_READ_TIMEOUT", os.environ.get("HMIS_REQUEST_TIMEOUT", "10")))
+
+# Circuit breaker; opens on error rate or slow-call rate over the last window of calls
+HMIS_BREAKER_WINDOW = int(os.environ.get("HMIS_BREAKER_WINDOW", "20"))
+HMIS_BREAKER_MIN_CALLS = int(os.environ.get("HMIS_BREAKER_MIN_CALLS", "10"))
+HMIS_BREAKER_FAILURE_RATE = float(os.environ.get("HMIS_BREAKER_FAILURE_RATE", "0.5"))
+HMIS_BREAKER_SLOW_CALL_SECONDS = float(os.environ.get("HMIS_BREAKER_SLOW_CALL_SECONDS", "2.0"))
+HMIS_BREAKER_SLOW_CALL_RATE = float(os.environ.get("HMIS_BREAKER_SLOW_CALL_RATE", "0.5"))
+HMIS_BREAKER_COOLDOWN = float(os.environ.get("HMIS_BREAKER_COOLDOWN", "30"))
+
+
+class HMISUnavailableError(CircuitOpenError, requests.exceptions.ConnectionError):
+    """Raised instead of calling HMIS while the circuit is open"""
+    pass
+
+
+class HMISClient:
+    """
+    Keep-alive HTTP client for the HMIS API
+    One pooled requests.Session per process; retries apply to idempotent methods only
+    """
+
+    def __init__(self, base_url=HMIS_BASE_URL, api_key=HMIS_API_KEY,
+                 pool_connections=HMIS_POOL_CONNECTIONS, pool_maxsize=HMIS_POOL_MAXSIZE,
+                 max_retries=HMIS_MAX_RETRIES, backoff_factor=HMIS_RETRY_BACKOFF,
+                 backoff_jitter=HMIS_RETRY_JITTER, connect_timeout=HMIS_CONNECT_TIMEOUT,
+                 read_timeout=HMIS_READ_TIMEOUT):
+        self.base_url = base_url.rstrip('/')
+        self.api_key = api_key
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.backoff_jitter = backoff_jitter
+        self.timeout = (connect_timeout, read_timeout)
+        self._session = None
+        self._session_pid = None
+        self._lock = threading.Lock()
+        self.breaker = CircuitBreaker(
+            name="hmis",
+            window_size=HMIS_BREAKER_WINDOW,
+            minimum_calls=HMIS_BREAKER_MIN_CALLS,
+            failure_rate_threshold=HMIS_BREAKER_FAILURE_RATE,
+            slow_call_threshold=HMIS_BREAKER_SLOW_CALL_SECONDS,
+            slow_call_rate_threshold=HMIS_BREAKER_SLOW_CALL_RATE,
+            cooldown=HMIS_BREAKER_COOLDOWN
+        )
+
+    def _build_session(self):
+        """
+        Create a session with a bounded connection pool and retry policy
+        Connection failures and gateway errors are retried; read timeouts are not,
+        so a degraded HMIS costs at most one read timeout per call
+        """
+        retry = Retry(
+            total=self.max_retries,
+            connect=self.max_retries,
+            read=0,
+            status=self.max_retries,
+            status_forcelist=(502, 503, 504),
+            allowed_methods=frozenset(['GET', 'HEAD']),
+            backoff_factor=self.backoff_factor,
+            backoff_jitter=self.backoff_jitter,
+            respect_retry_after_header=True,
+            raise_on_status=False
+        )
+        adapter = HTTPAdapter(
+            pool_connections=self.pool_connections,
+            pool_maxsize=self.pool_maxsize,
+            max_retries=retry
+        )
+
+        session = requests.Session()
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        session.headers.update({
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json"
+        })
+        return session
+
+    @property
+    def session(self):
+        """The pooled session for the current process"""
+        # Sockets must not be shared with a parent process after a gunicorn fork
+        if self._session is None or self._session_pid != os.getpid():
+            with self._lock:
+                if self._session is None or self._session_pid != os.getpid():
+                    self._session = self._build_session()
+                    self._session_pid = os.getpid()
+        return self._session
+
+    def reset(self):
+        """Discard pooled connections, e.g. in a freshly forked worker"""
+        # Runs right after fork, where a lock held by another parent thread would never be released
+        self._lock = threading.Lock()
+        self._session = None
+        self._session_pid = None
+        self.breaker.reset()
+
+    def request(self, method, path, **kwargs):
+        """
+        Send a request relative to the HMIS base URL
+        Fails fast with HMISUnavailableError while the circuit is open
+        """
+        if not self.breaker.allow_request():
+            raise HMISUnavailableError(f"HMIS circuit open, skipping {method} {path}")
+
+        kwargs.setdefault('timeout', self.timeout)
+        started = perf_counter()
+        success = False
+        try:
+            response = self.session.request(method, f"{self.base_url}{path}", **kwargs)
+            # 4xx means HMIS is up and answering; only server errors count against it
+            success = response.status_code < 500
+            return response
+        finally:
+            self.breaker.record(success, perf_counter() - started)
+
+    def get(self, path, **kwargs):
+        return self.request('GET', path, **kwargs)
+
+    def post(self, path, **kwargs):
+        return self.request('POST', path, **kwargs)
+
+
+_client = HMISClient()
+
+
+def get_hmis_client():
+    """Shared HMIS client for this process"""
+    return _client
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_client.reset)
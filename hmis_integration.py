@@ -1,13 +1,94 @@
 import requests
 import logging
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, date
 import os
+from ttl_cache import TTLCache
+from hmis_client import get_hmis_client, HMISUnavailableError
 
 logger = logging.getLogger(__name__)
 
 # HMIS integration configuration
-HMIS_BASE_URL = os.environ.get("HMIS_BASE_URL", "https://api.hmis-example.com")
-HMIS_API_KEY = os.environ.get("HMIS_API_KEY", "hmis_api_key")
+HMIS_SEARCH_WORKERS = int(os.environ.get("HMIS_SEARCH_WORKERS", "8"))
+
+# HMIS doctor search cache; entries past the TTL are served while one refresh runs
+HMIS_SEARCH_CACHE_SIZE = int(os.environ.get("HMIS_SEARCH_CACHE_SIZE", "1024"))
+HMIS_SEARCH_CACHE_TTL = int(os.environ.get("HMIS_SEARCH_CACHE_TTL", "60"))
+HMIS_SEARCH_CACHE_STALE_TTL = int(os.environ.get("HMIS_SEARCH_CACHE_STALE_TTL", "300"))
+
+_search_cache = TTLCache(
+    maxsize=HMIS_SEARCH_CACHE_SIZE,
+    ttl=HMIS_SEARCH_CACHE_TTL,
+    stale_ttl=HMIS_SEARCH_CACHE_STALE_TTL,
+    name="hmis-search"
+)
+
+# HMIS availability per (doctor, date); short TTL, dropped when a booking touches the slot day
+HMIS_AVAILABILITY_CACHE_SIZE = int(os.environ.get("HMIS_AVAILABILITY_CACHE_SIZE", "4096"))
+HMIS_AVAILABILITY_CACHE_TTL = int(os.environ.get("HMIS_AVAILABILITY_CACHE_TTL", "30"))
+
+_availability_cache = TTLCache(
+    maxsize=HMIS_AVAILABILITY_CACHE_SIZE,
+    ttl=HMIS_AVAILABILITY_CACHE_TTL,
+    name="hmis-availability"
+)
+
+# Shared pool for HMIS calls that run alongside local database work
+_hmis_executor = None
+_hmis_executor_pid = None
+_hmis_executor_lock = threading.Lock()
+
+class HMISError(Exception):
+    """Raised when HMIS returns an unusable response"""
+    pass
+
+def _fetch_doctors(specialty=None, name_search=None):
+    """
+    Query the HMIS doctor search endpoint
+    Raises on connection errors and non-200 responses so failures are never cached
+    """
+    path = "/doctors/search"
+    
+    params = {}
+    if specialty:
+        params['specialty'] = specialty
+    if name_search:
+        params['name'] = name_search
+    
+    response = get_hmis_client().get(path, params=params)
+    
+    if response.status_code != 200:
+        raise HMISError(f"HMIS doctor search failed: {response.status_code} - {response.text}")
+    
+    hmis_doctors = response.json().get('doctors', [])
+    
+    # Transform HMIS doctor data to our format
+    doctors_list = []
+    for doctor in hmis_doctors:
+        doctors_list.append({
+            "id": f"hmis_{doctor.get('id')}",
+            "name": doctor.get('name'),
+            "specialty": doctor.get('specialty'),
+            "qualification": doctor.get('qualification'),
+            "experience_years": doctor.get('experience_years'),
+            "hospital_name": doctor.get('hospital_name'),
+            "consultation_fee": doctor.get('consultation_fee'),
+            "rating": doctor.get('rating'),
+            "profile_image": doctor.get('profile_image'),
+            "source": "hmis",
+            "hmis_id": doctor.get('id')
+        })
+    
+    return doctors_list
+
+def _search_cache_key(specialty, name_search):
+    """Normalize search terms so equivalent queries share one cache entry"""
+    return (
+        ' '.join((specialty or '').lower().split()),
+        ' '.join((name_search or '').lower().split())
+    )
 
 def search_doctors(specialty=None, name_search=None):
     """
@@ -15,78 +96,110 @@ def search_doctors(specialty=None, name_search=None):
     Returns list of doctors matching the criteria
     """
     try:
-        url = f"{HMIS_BASE_URL}/doctors/search"
-        headers = {
-            "Authorization": f"Bearer {HMIS_API_KEY}",
-            "Content-Type": "application/json"
-        }
-        
-        params = {}
-        if specialty:
-            params['specialty'] = specialty
-        if name_search:
-            params['name'] = name_search
-        
-        response = requests.get(url, headers=headers, params=params, timeout=10)
+        key = _search_cache_key(specialty, name_search)
+        doctors_list = _search_cache.get_or_load(key, lambda: _fetch_doctors(*key))
+        return list(doctors_list)
         
-        if response.status_code == 200:
-            hmis_doctors = response.json().get('doctors', [])
-            
-            # Transform HMIS doctor data to our format
-            doctors_list = []
-            for doctor in hmis_doctors:
-                doctors_list.append({
-                    "id": f"hmis_{doctor.get('id')}",
-                    "name": doctor.get('name'),
-                    "specialty": doctor.get('specialty'),
-                    "qualification": doctor.get('qualification'),
-                    "experience_years": doctor.get('experience_years'),
-                    "hospital_name": doctor.get('hospital_name'),
-                    "consultation_fee": doctor.get('consultation_fee'),
-                    "rating": doctor.get('rating'),
-                    "profile_image": doctor.get('profile_image'),
-                    "source": "hmis",
-                    "hmis_id": doctor.get('id')
-                })
-            
-            return doctors_list
-        else:
-            logger.error(f"HMIS doctor search failed: {response.status_code} - {response.text}")
-            return []
-            
+    except HMISUnavailableError as e:
+        logger.warning(str(e))
+        return []
     except requests.exceptions.RequestException as e:
         logger.error(f"Error connecting to HMIS for doctor search: {str(e)}")
         return []
+    except HMISError as e:
+        logger.error(str(e))
+        return []
     except Exception as e:
         logger.error(f"Unexpected error in HMIS doctor search: {str(e)}")
         return []
 
+def get_search_cache_stats():
+    """Hit/miss/refresh counters for the HMIS doctor search cache"""
+    return _search_cache.stats()
+
+def get_circuit_breaker_stats():
+    """State and counters of the HMIS circuit breaker"""
+    return get_hmis_client().breaker.stats()
+
+def _get_hmis_executor():
+    """Return the worker pool, recreating it after a fork"""
+    global _hmis_executor, _hmis_executor_pid
+    if _hmis_executor is None or _hmis_executor_pid != os.getpid():
+        with _hmis_executor_lock:
+            if _hmis_executor is None or _hmis_executor_pid != os.getpid():
+                _hmis_executor = ThreadPoolExecutor(
+                    max_workers=HMIS_SEARCH_WORKERS,
+                    thread_name_prefix="hmis"
+                )
+                _hmis_executor_pid = os.getpid()
+    return _hmis_executor
+
+def _timed_call(func, *args):
+    """Run func and return (result, elapsed_ms)"""
+    started = time.perf_counter()
+    result = func(*args)
+    return result, round((time.perf_counter() - started) * 1000, 2)
+
+def submit_hmis_call(func, *args):
+    """
+    Run an HMIS integration function in the background
+    The future resolves to (result, elapsed_ms)
+    """
+    return _get_hmis_executor().submit(_timed_call, func, *args)
+
+def search_doctors_async(specialty=None, name_search=None):
+    """Start an HMIS doctor search without blocking the caller"""
+    return submit_hmis_call(search_doctors, specialty, name_search)
+
+def _availability_cache_key(doctor_id, appointment_date):
+    """(HMIS doctor id, ISO date) so prefixed ids and date/datetime values share an entry"""
+    doctor_id = str(doctor_id)
+    hmis_doctor_id = doctor_id.replace('hmis_', '') if doctor_id.startswith('hmis_') else doctor_id
+    if isinstance(appointment_date, datetime):
+        appointment_date = appointment_date.date()
+    if isinstance(appointment_date, date):
+        appointment_date = appointment_date.isoformat()
+    return hmis_doctor_id, appointment_date
+
+def invalidate_doctor_availability(doctor_id, appointment_date):
+    """Drop the cached HMIS availability for one doctor and date"""
+    _availability_cache.invalidate(_availability_cache_key(doctor_id, appointment_date))
+
+def get_availability_cache_stats():
+    """Hit/miss/invalidation counters for the HMIS availability cache"""
+    return _availability_cache.stats()
+
 def get_doctor_availability(doctor_id, appointment_date):
     """
     Get doctor availability from HMIS system
     Returns available time slots for the given date
     """
     try:
-        # Remove 'hmis_' prefix if present
-        hmis_doctor_id = doctor_id.replace('hmis_', '') if doctor_id.startswith('hmis_') else doctor_id
+        key = _availability_cache_key(doctor_id, appointment_date)
+        cached_slots = _availability_cache.get(key)
+        if cached_slots is not None:
+            return {
+                "success": True,
+                "slots": list(cached_slots)
+            }
         
-        url = f"{HMIS_BASE_URL}/doctors/{hmis_doctor_id}/availability"
-        headers = {
-            "Authorization": f"Bearer {HMIS_API_KEY}",
-            "Content-Type": "application/json"
-        }
+        hmis_doctor_id, date_str = key
+        path = f"/doctors/{hmis_doctor_id}/availability"
         
         params = {
-            "date": appointment_date.isoformat() if isinstance(appointment_date, date) else appointment_date
+            "date": date_str
         }
         
-        response = requests.get(url, headers=headers, params=params, timeout=10)
+        response = get_hmis_client().get(path, params=params)
         
         if response.status_code == 200:
             data = response.json()
+            slots = data.get('available_slots', [])
+            # Failures are never cached so the next request retries HMIS
+            _availability_cache.set(key, tuple(slots))
             return {
                 "success": True,
-                "slots": data.get('available_slots', [])
+                "slots": slots
             }
         else:
             logger.error(f"HMIS availability check failed: {response.status_code} - {response.text}")
@@ -124,11 +237,7 @@ def share_profile_with_hmis(user_id, hospital_id):
                 "message": "User not found"
             }
         
-        url = f"{HMIS_BASE_URL}/patients/share-profile"
-        headers = {
-            "Authorization": f"Bearer {HMIS_API_KEY}",
-            "Content-Type": "application/json"
-        }
+        path = "/patients/share-profile"
         
         profile_data = {
             "patient_id": user.id,
@@ -143,7 +252,7 @@ def share_profile_with_hmis(user_id, hospital_id):
             "shared_at": datetime.utcnow().isoformat()
         }
         
-        response = requests.post(url, headers=headers, json=profile_data, timeout=10)
+        response = get_hmis_client().post(path, json=profile_data)
         
         if response.status_code == 200:
             return {
@@ -171,7 +280,31 @@ def share_profile_with_hmis(user_id, hospital_id):
             "message": "Unexpected error occurred"
         }
 
-def book_appointment_with_hmis(user_id, doctor_id, appointment_date, appointment_time, symptoms):
+def post_hmis_booking(user, doctor_id, appointment_date, appointment_time, symptoms, idempotency_key=None):
+    """
+    Send one booking request to HMIS and return the raw response
+    With an idempotency key HMIS answers a repeated request with the original booking
+    """
+    # Remove 'hmis_' prefix if present
+    hmis_doctor_id = doctor_id.replace('hmis_', '') if doctor_id.startswith('hmis_') else doctor_id
+    
+    path = "/appointments/book"
+    
+    appointment_data = {
+        "patient_id": user.id,
+        "patient_name": user.name,
+        "patient_mobile": user.mobile_number,
+        "doctor_id": hmis_doctor_id,
+        "appointment_date": appointment_date.isoformat() if hasattr(appointment_date, 'isoformat') else appointment_date,
+        "appointment_time": appointment_time.strftime('%H:%M') if hasattr(appointment_time, 'strftime') else appointment_time,
+        "symptoms": symptoms,
+        "booked_via": "phr_app"
+    }
+    
+    headers = {"Idempotency-Key": idempotency_key} if idempotency_key else None
+    return get_hmis_client().post(path, json=appointment_data, headers=headers)
+
+def book_appointment_with_hmis(user_id, doctor_id, appointment_date, appointment_time, symptoms, idempotency_key=None):
     """
     Book appointment directly with HMIS system
     Used when the doctor is from HMIS
@@ -186,27 +319,7 @@ def book_appointment_with_hmis(user_id, doctor_id, appointment_date, appointment
                 "message": "User not found"
             }
         
-        # Remove 'hmis_' prefix if present
-        hmis_doctor_id = doctor_id.replace('hmis_', '') if doctor_id.startswith('hmis_') else doctor_id
-        
-        url = f"{HMIS_BASE_URL}/appointments/book"
-        headers = {
-            "Authorization": f"Bearer {HMIS_API_KEY}",
-            "Content-Type": "application/json"
-        }
-        
-        appointment_data = {
-            "patient_id": user.id,
-            "patient_name": user.name,
-            "patient_mobile": user.mobile_number,
-            "doctor_id": hmis_doctor_id,
-            "appointment_date": appointment_date.isoformat() if hasattr(appointment_date, 'isoformat') else appointment_date,
-            "appointment_time": appointment_time.strftime('%H:%M') if hasattr(appointment_time, 'strftime') else appointment_time,
-            "symptoms": symptoms,
-            "booked_via": "phr_app"
-        }
-        
-        response = requests.post(url, headers=headers, json=appointment_data, timeout=10)
+        response = post_hmis_booking(user, doctor_id, appointment_date, appointment_time, symptoms, idempotency_key)
         
         if response.status_code == 200:
             data = response.json()
@@ -244,7 +357,6 @@ def receive_document_from_hmis(document_data):
     try:
         from models import Document, User
         from app import db
-        import uuid
         
         patient_id = document_data.get('patient_id')
         document_type = document_data.get('document_type')
@@ -262,40 +374,37 @@ def receive_document_from_hmis(document_data):
                 "message": "Patient not found"
             }
         
-        # Save the document
+        # Save the document; a file the hospital already sent is stored once
         import base64
-        file_data = base64.b64decode(file_content)
-        filename = f"hmis_{uuid.uuid4()}.{file_type}"
-        file_path = os.path.join(os.environ.get("UPLOAD_FOLDER", "uploads"), filename)
-        
-        with open(file_path, 'wb') as f:
-            f.write(file_data)
+        from blob_store import store_blob_bytes
+        stored = store_blob_bytes(base64.b64decode(file_content))
         
         # Create document record
         document = Document(
             user_id=patient_id,
             document_type=document_type,
             title=title,
-            file_path=file_path,
+            file_path=stored.path,
             file_type=file_type,
-            file_size=len(file_data),
+            file_size=stored.size,
             uploaded_by='hospital',
             upload_source=hospital_id,
             tags=[doctor_name] if doctor_name else []
         )
         
         db.session.add(document)
-        db.session.commit()
         
-        # Create notification for patient
-        from notification_service import create_notification
-        create_notification(
+        # Notify the patient in the same transaction as the document row
+        from notification_service import queue_notification
+        queue_notification(
             patient_id,
             "New Document Uploaded",
             f"A new {document_type} has been uploaded by {doctor_name or 'Hospital'}",
             "document_upload"
         )
         
+        db.session.commit()
+        
         return {
             "success": True,
             "message": "Document uploaded successfully",
@@ -314,13 +423,9 @@ def get_hospital_list():
     Get list of hospitals from HMIS
     """
     try:
-        url = f"{HMIS_BASE_URL}/hospitals"
-        headers = {
-            "Authorization": f"Bearer {HMIS_API_KEY}",
-            "Content-Type": "application/json"
-        }
+        path = "/hospitals"
         
-        response = requests.get(url, headers=headers, timeout=10)
+        response = get_hmis_client().get(path)
         
         if response.status_code == 200:
             return {
@@ -1,6 +1,6 @@
 from app import db
 from datetime import datetime
-from werkzeug.security import generate_password_hash, check_password_hash
+from password_hashing import hash_password, verify_password
 import uuid
 
 class User(db.Model):
@@ -22,13 +22,22 @@ class User(db.Model):
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = hash_password(password)
     
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        return verify_password(self.password_hash, password)
 
 class OTP(db.Model):
     __tablename__ = 'otp_codes'
+    __table_args__ = (
+        # Verification lookup; used codes drop out of the index
+        db.Index(
+            'idx_otp_codes_mobile_code_expires', 'mobile_number', 'otp_code', 'expires_at',
+            postgresql_where=db.text("is_used = false"),
+            sqlite_where=db.text("is_used = 0")
+        ),
+        db.Index('idx_otp_codes_expires_at', 'expires_at'),
+    )
     
     id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     mobile_number = db.Column(db.String(15), nullable=False)
@@ -57,23 +66,43 @@ class Doctor(db.Model):
 
 class Appointment(db.Model):
     __tablename__ = 'appointments'
+    __table_args__ = (
+        db.Index('idx_appointments_user_date_id', 'user_id', 'appointment_date', 'id'),
+        # Covering index for doctor schedules and booked-slot lookups (index-only scans on PostgreSQL)
+        db.Index(
+            'idx_appointments_doctor_date_time', 'doctor_id', 'appointment_date', 'appointment_time',
+            postgresql_include=['status', 'consultation_type', 'id']
+        ),
+        # One live booking per slot; cancelled rows free the slot
+        db.Index(
+            'idx_appointments_unique_slot', 'doctor_id', 'appointment_date', 'appointment_time',
+            unique=True,
+            postgresql_where=db.text("status != 'cancelled'"),
+            sqlite_where=db.text("status != 'cancelled'")
+        ),
+    )
     
     id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     user_id = db.Column(db.String(36), nullable=False)
     doctor_id = db.Column(db.String(36), nullable=False)
     appointment_date = db.Column(db.DateTime, nullable=False)
     appointment_time = db.Column(db.Time, nullable=False)
-    status = db.Column(db.String(20), default='scheduled')  # scheduled, completed, cancelled
+    status = db.Column(db.String(20), default='scheduled')  # pending (awaiting HMIS), scheduled, completed, cancelled
     symptoms = db.Column(db.Text, nullable=True)
     notes = db.Column(db.Text, nullable=True)
     consultation_type = db.Column(db.String(20), default='in-person')  # in-person, video, audio
     payment_status = db.Column(db.String(20), default='pending')
     amount = db.Column(db.Numeric(10, 2), nullable=True)
+    hmis_appointment_id = db.Column(db.String(50), nullable=True)
+    confirmation_number = db.Column(db.String(50), nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
 class Symptom(db.Model):
     __tablename__ = 'symptoms'
+    __table_args__ = (
+        db.Index('idx_symptoms_created_id', 'created_at', 'id'),
+    )
     
     id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     name = db.Column(db.String(100), nullable=False)
@@ -99,6 +128,9 @@ class SymptomAssessment(db.Model):
 
 class Document(db.Model):
     __tablename__ = 'documents'
+    __table_args__ = (
+        db.Index('idx_documents_user_created_id', 'user_id', 'created_at', 'id'),
+    )
     
     id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     user_id = db.Column(db.String(36), nullable=False)
@@ -156,6 +188,9 @@ class MedicineTracker(db.Model):
 
 class LabTest(db.Model):
     __tablename__ = 'lab_tests'
+    __table_args__ = (
+        db.Index('idx_lab_tests_created_id', 'created_at', 'id'),
+    )
     
     id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     name = db.Column(db.String(200), nullable=False)
@@ -196,6 +231,9 @@ class Notification(db.Model):
 
 class CarePackage(db.Model):
     __tablename__ = 'care_packages'
+    __table_args__ = (
+        db.Index('idx_care_packages_created_id', 'created_at', 'id'),
+    )
     
     id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     name = db.Column(db.String(200), nullable=False)
@@ -234,6 +272,9 @@ class ChatMessage(db.Model):
 
 class AmbulanceService(db.Model):
     __tablename__ = 'ambulance_services'
+    __table_args__ = (
+        db.Index('idx_ambulance_services_created_id', 'created_at', 'id'),
+    )
     
     id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     service_name = db.Column(db.String(200), nullable=False)
@@ -274,3 +315,46 @@ class RecordSummary(db.Model):
     ai_insights = db.Column(db.JSON, nullable=True)
     generated_by = db.Column(db.String(50), default='gemini_ai')
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class OutboxEvent(db.Model):
+    __tablename__ = 'outbox_events'
+    __table_args__ = (
+        db.Index('idx_outbox_events_status_available', 'status', 'available_at'),
+        # Retention purge of dispatched and failed events
+        db.Index('idx_outbox_events_status_created', 'status', 'created_at'),
+    )
+    
+    id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    event_type = db.Column(db.String(50), nullable=False)  # notification, ...
+    payload = db.Column(db.JSON, nullable=False)
+    status = db.Column(db.String(20), default='pending')  # pending, dispatched, failed
+    attempts = db.Column(db.Integer, default=0)
+    available_at = db.Column(db.DateTime, default=datetime.utcnow)
+    last_error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    dispatched_at = db.Column(db.DateTime, nullable=True)
+
+class RevokedToken(db.Model):
+    __tablename__ = 'revoked_tokens'
+    __table_args__ = (
+        # Incremental refresh of the in-memory revocation filter
+        db.Index('idx_revoked_tokens_revoked_at', 'revoked_at'),
+    )
+    
+    jti = db.Column(db.String(36), primary_key=True)
+    user_id = db.Column(db.String(36), nullable=False)
+    revoked_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+class Blob(db.Model):
+    __tablename__ = 'blobs'
+    __table_args__ = (
+        # Sweep of unreferenced blobs past their grace period
+        db.Index('idx_blobs_released_at', 'released_at'),
+    )
+    
+    sha256 = db.Column(db.String(64), primary_key=True)
+    file_path = db.Column(db.String(500), nullable=False)
+    size = db.Column(db.BigInteger, nullable=False)
+    ref_count = db.Column(db.Integer, nullable=False, default=0)  # documents and prescriptions pointing at the file
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    released_at = db.Column(db.DateTime, nullable=True)  # when ref_count last dropped to zero
@@ -2,6 +2,7 @@ import logging
 from datetime import datetime, timedelta
 from app import db
 from models import Notification, User, MedicineTracker
+from outbox import enqueue, register_handler
 
 logger = logging.getLogger(__name__)
 
@@ -30,6 +31,36 @@ def create_notification(user_id, title, message, notification_type, scheduled_fo
         db.session.rollback()
         return None
 
+def queue_notification(user_id, title, message, notification_type, scheduled_for=None, extra_data=None):
+    """
+    Stage a notification in the caller's transaction
+    It is created by the outbox dispatcher once the caller commits
+    """
+    enqueue('notification', {
+        "user_id": user_id,
+        "title": title,
+        "message": message,
+        "notification_type": notification_type,
+        "scheduled_for": (scheduled_for or datetime.utcnow()).isoformat(),
+        "extra_data": extra_data or {}
+    })
+
+@register_handler('notification')
+def deliver_notification(payload):
+    """
+    Outbox handler creating a queued notification
+    Runs in this event's own transaction, which commits the notification with the
+    event's dispatched status; a failure rolls back only this event
+    """
+    db.session.add(Notification(
+        user_id=payload['user_id'],
+        title=payload['title'],
+        message=payload['message'],
+        notification_type=payload['notification_type'],
+        scheduled_for=datetime.fromisoformat(payload['scheduled_for']),
+        extra_data=payload.get('extra_data') or {}
+    ))
+
 def get_user_notifications(user_id, limit=50, include_read=True):
     """
     Get notifications for a user
@@ -0,0 +1,133 @@
+import os
+import time
+import logging
+import threading
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import update, delete, select
+from app import db
+from models import OTP
+
+logger = logging.getLogger(__name__)
+
+# Where OTPs live: database (shared by all workers) or memory (single process only)
+OTP_STORE = os.environ.get("OTP_STORE", "database")
+OTP_TTL = int(os.environ.get("OTP_TTL", "600"))
+
+# Expired codes are deleted in batches at most once per interval per worker
+OTP_SWEEP_INTERVAL = float(os.environ.get("OTP_SWEEP_INTERVAL", "60"))
+OTP_SWEEP_BATCH_SIZE = int(os.environ.get("OTP_SWEEP_BATCH_SIZE", "1000"))
+
+
+class MemoryOTPStore:
+    """
+    OTPs in a dict guarded by a lock
+    Only visible to one process; meant for tests and single-node deployments
+    """
+
+    def __init__(self):
+        self._codes = {}
+        self._lock = threading.Lock()
+
+    def issue(self, mobile_number, otp_code, ttl):
+        with self._lock:
+            self._codes[(mobile_number, otp_code)] = time.time() + ttl
+
+    def consume(self, mobile_number, otp_code):
+        """Verify and invalidate a code in one step"""
+        with self._lock:
+            expires_at = self._codes.pop((mobile_number, otp_code), None)
+            return expires_at is not None and expires_at > time.time()
+
+    def sweep(self, batch_size):
+        with self._lock:
+            now = time.time()
+            expired = [key for key, expires_at in self._codes.items() if expires_at <= now][:batch_size]
+            for key in expired:
+                del self._codes[key]
+            return len(expired)
+
+
+class DatabaseOTPStore:
+    """
+    OTPs in the otp_codes table
+    Writes join the caller's transaction; nothing here commits
+    """
+
+    def issue(self, mobile_number, otp_code, ttl):
+        db.session.add(OTP(
+            mobile_number=mobile_number,
+            otp_code=otp_code,
+            expires_at=datetime.utcnow() + timedelta(seconds=ttl)
+        ))
+
+    def consume(self, mobile_number, otp_code):
+        """
+        Verify and mark a code used in one UPDATE on the partial
+        (mobile_number, otp_code, expires_at) index; concurrent attempts with the
+        same code cannot both succeed
+        """
+        statement = update(OTP).where(
+            OTP.mobile_number == mobile_number,
+            OTP.otp_code == otp_code,
+            OTP.is_used == False,
+            OTP.expires_at > datetime.utcnow()
+        ).values(is_used=True)
+
+        if db.session.get_bind().dialect.update_returning:
+            return db.session.execute(statement.returning(OTP.id)).first() is not None
+        return db.session.execute(statement).rowcount > 0
+
+    def sweep(self, batch_size):
+        """Delete up to batch_size expired codes, used or not"""
+        expired = select(OTP.id).where(OTP.expires_at <= datetime.utcnow()).limit(batch_size)
+        result = db.session.execute(
+            delete(OTP).where(OTP.id.in_(expired.scalar_subquery())),
+            execution_options={"synchronize_session": False}
+        )
+        return result.rowcount
+
+
+def create_otp_store(kind):
+    """Build the OTP store for a backend name"""
+    if kind == 'database':
+        return DatabaseOTPStore()
+    if kind == 'memory':
+        return MemoryOTPStore()
+    raise ValueError(f"Unsupported OTP store: {kind}")
+
+
+def init_otp_store(app):
+    app.extensions['otp_store'] = create_otp_store(app.config['OTP_STORE'])
+    app.extensions['otp_last_sweep'] = 0.0
+
+
+def get_otp_store():
+    return current_app.extensions['otp_store']
+
+
+def issue_otp(mobile_number, otp_code, ttl=OTP_TTL):
+    """Store a code for ttl seconds; the caller commits"""
+    get_otp_store().issue(mobile_number, otp_code, ttl)
+
+
+def consume_otp(mobile_number, otp_code):
+    """True when the code was valid; it cannot be used again once the caller commits"""
+    return get_otp_store().consume(mobile_number, otp_code)
+
+
+def sweep_expired_otps(batch_size=OTP_SWEEP_BATCH_SIZE):
+    """Delete one batch of expired codes; returns how many were removed"""
+    removed = get_otp_store().sweep(batch_size)
+    if removed:
+        logger.info(f"Swept {removed} expired OTPs")
+    return removed
+
+
+def maybe_sweep_expired_otps():
+    """Run one sweep batch if this worker has not swept within OTP_SWEEP_INTERVAL"""
+    now = time.monotonic()
+    if now - current_app.extensions['otp_last_sweep'] < OTP_SWEEP_INTERVAL:
+        return 0
+    current_app.extensions['otp_last_sweep'] = now
+    return sweep_expired_otps()
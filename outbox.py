@@ -0,0 +1,289 @@
+import os
+import time
+import logging
+import threading
+from datetime import datetime, timedelta
+from sqlalchemy import event, update, delete, select
+from sqlalchemy.orm import Session
+from app import db
+from models import OutboxEvent
+
+logger = logging.getLogger(__name__)
+
+# Outbox dispatcher configuration
+OUTBOX_DISPATCHER_ENABLED = os.environ.get("OUTBOX_DISPATCHER_ENABLED", "True").lower() == "true"
+OUTBOX_BATCH_SIZE = int(os.environ.get("OUTBOX_BATCH_SIZE", "100"))
+OUTBOX_POLL_INTERVAL = float(os.environ.get("OUTBOX_POLL_INTERVAL", "5"))
+OUTBOX_MAX_ATTEMPTS = int(os.environ.get("OUTBOX_MAX_ATTEMPTS", "8"))
+OUTBOX_RETRY_BACKOFF = float(os.environ.get("OUTBOX_RETRY_BACKOFF", "2"))
+# Seconds a claimed event stays reserved for the dispatcher delivering it; must
+# cover a whole batch, after which another dispatcher may take the event over
+OUTBOX_LEASE = float(os.environ.get("OUTBOX_LEASE", "300"))
+# Batch size for event types dispatched in their own lane (slow downstream calls)
+OUTBOX_LANE_BATCH_SIZE = int(os.environ.get("OUTBOX_LANE_BATCH_SIZE", "10"))
+# Days dispatched and failed events are kept, and how often and in what batches the dispatcher purges older ones
+OUTBOX_RETENTION_DAYS = float(os.environ.get("OUTBOX_RETENTION_DAYS", "7"))
+OUTBOX_PURGE_INTERVAL = float(os.environ.get("OUTBOX_PURGE_INTERVAL", "3600"))
+OUTBOX_PURGE_BATCH_SIZE = int(os.environ.get("OUTBOX_PURGE_BATCH_SIZE", "1000"))
+
+DEFAULT_LANE = 'default'
+
+_SESSION_FLAG = 'outbox_pending'
+
+_handlers = {}
+_failure_handlers = {}
+_lanes = {}
+_dispatcher = None
+_dispatcher_lock = threading.Lock()
+
+
+def register_handler(event_type, lane=DEFAULT_LANE):
+    """
+    Decorator registering the function that delivers one event type
+    Handlers run after the event is claimed and committed, so no outbox row is
+    locked while they work; their writes commit together with the event's status.
+    Event types in their own lane are dispatched by a separate thread in small
+    batches, so a slow downstream never holds up other events.
+    """
+    def decorator(func):
+        _handlers[event_type] = func
+        if lane != DEFAULT_LANE:
+            _lanes[event_type] = lane
+        return func
+    return decorator
+
+
+def unregister_handler(event_type):
+    _handlers.pop(event_type, None)
+    _failure_handlers.pop(event_type, None)
+    _lanes.pop(event_type, None)
+
+
+def register_failure_handler(event_type):
+    """Decorator registering the function called once an event of this type fails permanently"""
+    def decorator(func):
+        _failure_handlers[event_type] = func
+        return func
+    return decorator
+
+
+def _give_up(event_id, event_type, payload):
+    """Run the failure handler for an event that ran out of attempts, if there is one"""
+    handler = _failure_handlers.get(event_type)
+    if handler is None:
+        return
+    try:
+        with db.session.begin_nested():
+            handler(payload)
+    except Exception as e:
+        logger.error(f"Outbox failure handler for event {event_id} failed: {str(e)}")
+
+
+def enqueue(event_type, payload, available_at=None):
+    """
+    Stage a side effect in the current transaction
+    Nothing is delivered unless the caller commits
+    """
+    outbox_event = OutboxEvent(
+        event_type=event_type,
+        payload=payload,
+        available_at=available_at or datetime.utcnow()
+    )
+    db.session.add(outbox_event)
+    db.session.info[_SESSION_FLAG] = True
+    return outbox_event
+
+
+def retry_delay(attempts):
+    """Exponential backoff before the next delivery attempt"""
+    return timedelta(seconds=OUTBOX_RETRY_BACKOFF * 2 ** (attempts - 1))
+
+
+def _lane_filter(query, lane):
+    if lane is None:
+        return query
+    if lane == DEFAULT_LANE:
+        return query.filter(OutboxEvent.event_type.notin_(list(_lanes))) if _lanes else query
+    return query.filter(OutboxEvent.event_type.in_([t for t, l in _lanes.items() if l == lane]))
+
+
+def _deliver(event_id, event_type, payload, attempts, lease):
+    """Run one claimed event's handler and record the outcome in the same short transaction"""
+    error = None
+    try:
+        handler = _handlers.get(event_type)
+        if handler is None:
+            raise LookupError(f"No outbox handler for {event_type}")
+        handler(payload)
+    except Exception as e:
+        db.session.rollback()
+        error = e
+
+    if error is None:
+        values = {"status": 'dispatched', "dispatched_at": datetime.utcnow()}
+    else:
+        attempts += 1
+        values = {"attempts": attempts, "last_error": str(error)}
+        if attempts >= OUTBOX_MAX_ATTEMPTS:
+            logger.error(f"Outbox event {event_id} failed permanently: {str(error)}")
+            values["status"] = 'failed'
+        else:
+            logger.warning(f"Outbox event {event_id} failed (attempt {attempts}): {str(error)}")
+            values["available_at"] = datetime.utcnow() + retry_delay(attempts)
+
+    # Only while our lease holds; otherwise another dispatcher has taken the event over
+    result = db.session.execute(
+        update(OutboxEvent).where(
+            OutboxEvent.id == event_id,
+            OutboxEvent.status == 'pending',
+            OutboxEvent.available_at == lease
+        ).values(**values),
+        execution_options={"synchronize_session": False}
+    )
+    if not result.rowcount:
+        logger.warning(f"Outbox event {event_id} lease expired before delivery was recorded")
+        db.session.rollback()
+        return
+    if values.get("status") == 'failed':
+        _give_up(event_id, event_type, payload)
+    db.session.commit()
+
+
+def dispatch_batch(batch_size=OUTBOX_BATCH_SIZE, lane=None):
+    """
+    Claim up to batch_size due events of a lane (any lane if None) and deliver them
+    The claim pushes available_at out by OUTBOX_LEASE and commits at once, so
+    row locks are held only for the claim; each event is then delivered and
+    recorded in its own transaction
+    Returns the number of events claimed
+    """
+    now = datetime.utcnow()
+    events = _lane_filter(OutboxEvent.query.filter(
+        OutboxEvent.status == 'pending',
+        OutboxEvent.available_at <= now
+    ), lane).order_by(
+        OutboxEvent.available_at
+    ).limit(batch_size).with_for_update(skip_locked=True).all()
+
+    lease = now + timedelta(seconds=OUTBOX_LEASE)
+    claimed = []
+    for outbox_event in events:
+        outbox_event.available_at = lease
+        claimed.append((outbox_event.id, outbox_event.event_type, outbox_event.payload, outbox_event.attempts or 0))
+    db.session.commit()
+
+    for event_id, event_type, payload, attempts in claimed:
+        _deliver(event_id, event_type, payload, attempts, lease)
+    return len(claimed)
+
+
+def purge_batch(retention_days=OUTBOX_RETENTION_DAYS, batch_size=OUTBOX_PURGE_BATCH_SIZE):
+    """
+    Delete up to batch_size dispatched or failed events created more than
+    retention_days ago; commits and returns how many were removed
+    """
+    cutoff = datetime.utcnow() - timedelta(days=retention_days)
+    ids = db.session.execute(
+        select(OutboxEvent.id)
+        .where(OutboxEvent.status.in_(['dispatched', 'failed']), OutboxEvent.created_at < cutoff)
+        .limit(batch_size)
+    ).scalars().all()
+    if ids:
+        db.session.execute(
+            delete(OutboxEvent).where(OutboxEvent.id.in_(ids)),
+            execution_options={"synchronize_session": False}
+        )
+    db.session.commit()
+    return len(ids)
+
+
+class OutboxDispatcher:
+    """
+    Background threads draining the outbox, one per lane
+    Wake on every commit that staged events and poll as a fallback for
+    events written by other workers or waiting on a retry; the default lane
+    also purges finished events every OUTBOX_PURGE_INTERVAL seconds
+    """
+
+    def __init__(self, app, batch_size=OUTBOX_BATCH_SIZE, poll_interval=OUTBOX_POLL_INTERVAL):
+        self.app = app
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.pid = os.getpid()
+        self._last_purge = 0.0
+        lanes = [DEFAULT_LANE] + sorted(set(_lanes.values()))
+        self._wakeups = {lane: threading.Event() for lane in lanes}
+        self._threads = [
+            threading.Thread(target=self._run, args=(lane,), name=f"outbox-dispatcher-{lane}", daemon=True)
+            for lane in lanes
+        ]
+
+    def start(self):
+        for thread in self._threads:
+            thread.start()
+
+    def wake(self):
+        for wakeup in self._wakeups.values():
+            wakeup.set()
+
+    def _run(self, lane):
+        batch_size = self.batch_size if lane == DEFAULT_LANE else OUTBOX_LANE_BATCH_SIZE
+        wakeup = self._wakeups[lane]
+        while True:
+            wakeup.wait(self.poll_interval)
+            wakeup.clear()
+            with self.app.app_context():
+                try:
+                    # Keep draining while batches come back full
+                    while dispatch_batch(batch_size, lane) == batch_size:
+                        pass
+                    if lane == DEFAULT_LANE:
+                        self._maybe_purge()
+                except Exception as e:
+                    logger.error(f"Outbox dispatch failed: {str(e)}")
+                    db.session.rollback()
+                finally:
+                    db.session.remove()
+
+    def _maybe_purge(self):
+        now = time.monotonic()
+        if now - self._last_purge < OUTBOX_PURGE_INTERVAL:
+            return
+        self._last_purge = now
+        removed = 0
+        while True:
+            purged = purge_batch()
+            removed += purged
+            if purged < OUTBOX_PURGE_BATCH_SIZE:
+                break
+        if removed:
+            logger.info(f"Purged {removed} finished outbox events")
+
+
+def init_outbox(app):
+    """Start the dispatcher lazily in each serving process, after any fork"""
+    @app.before_request
+    def _ensure_outbox_dispatcher():
+        global _dispatcher
+        if not OUTBOX_DISPATCHER_ENABLED or app.testing:
+            return
+        if _dispatcher is None or _dispatcher.pid != os.getpid():
+            with _dispatcher_lock:
+                if _dispatcher is None or _dispatcher.pid != os.getpid():
+                    _dispatcher = OutboxDispatcher(app)
+                    _dispatcher.start()
+
+
+def _on_session_commit(session):
+    if session.info.pop(_SESSION_FLAG, False) and _dispatcher is not None and _dispatcher.pid == os.getpid():
+        _dispatcher.wake()
+
+
+def _on_session_rollback(session, previous_transaction):
+    # A rolled back savepoint leaves events staged in the outer transaction
+    if not previous_transaction.nested:
+        session.info.pop(_SESSION_FLAG, None)
+
+
+event.listen(Session, 'after_commit', _on_session_commit)
+event.listen(Session, 'after_soft_rollback', _on_session_rollback)
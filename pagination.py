@@ -0,0 +1,104 @@
+import json
+import base64
+from bisect import bisect_right
+from datetime import datetime, date
+from flask import request
+from sqlalchemy import and_, or_
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 100
+
+
+class InvalidCursor(ValueError):
+    """Raised when a pagination cursor cannot be decoded"""
+    pass
+
+
+def get_page_limit(default=DEFAULT_PAGE_SIZE):
+    """Read the 'limit' query parameter, clamped to 1..MAX_PAGE_SIZE"""
+    limit = request.args.get('limit', default, type=int)
+    return max(1, min(limit, MAX_PAGE_SIZE))
+
+
+def _to_json_value(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def _from_json_value(value, python_type):
+    if value is None:
+        return None
+    if python_type is datetime:
+        return datetime.fromisoformat(value)
+    if python_type is date:
+        return date.fromisoformat(value)
+    return python_type(value)
+
+
+def encode_cursor(values):
+    """Encode sort key values as an opaque URL-safe token"""
+    payload = json.dumps([_to_json_value(value) for value in values], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token, python_types):
+    """Decode a token produced by encode_cursor back into typed key values"""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+        if not isinstance(values, list) or len(values) != len(python_types):
+            raise InvalidCursor("Cursor does not match this listing")
+        return tuple(_from_json_value(value, python_type) for value, python_type in zip(values, python_types))
+    except InvalidCursor:
+        raise
+    except (ValueError, TypeError) as e:
+        raise InvalidCursor(f"Malformed cursor: {str(e)}")
+
+
+def _keyset_filter(columns, values, descending):
+    """Row-value comparison (c1, c2, ...) > (v1, v2, ...) expanded for portability"""
+    clauses = []
+    for i, column in enumerate(columns):
+        equal_prefix = [columns[j] == values[j] for j in range(i)]
+        beyond = column < values[i] if descending else column > values[i]
+        clauses.append(and_(*equal_prefix, beyond))
+    return or_(*clauses)
+
+
+def paginate_query(query, columns, cursor=None, limit=DEFAULT_PAGE_SIZE, descending=False):
+    """
+    Keyset-paginate a query on a unique composite sort key
+    Returns (items, next_cursor); next_cursor is None on the last page
+    """
+    if cursor:
+        values = decode_cursor(cursor, [column.type.python_type for column in columns])
+        query = query.filter(_keyset_filter(columns, values, descending))
+
+    order = [column.desc() if descending else column.asc() for column in columns]
+    items = query.order_by(*order).limit(limit + 1).all()
+
+    next_cursor = None
+    if len(items) > limit:
+        items = items[:limit]
+        last = items[-1]
+        next_cursor = encode_cursor([getattr(last, column.key) for column in columns])
+
+    return items, next_cursor
+
+
+def paginate_sorted(items, keys, cursor=None, limit=DEFAULT_PAGE_SIZE, key_types=(datetime, str)):
+    """
+    Keyset-paginate an in-memory list already sorted ascending by keys
+    keys[i] is the sort key tuple of items[i]
+    """
+    start = 0
+    if cursor:
+        start = bisect_right(keys, decode_cursor(cursor, list(key_types)))
+
+    page = items[start:start + limit]
+    next_cursor = None
+    if start + limit < len(items):
+        next_cursor = encode_cursor(keys[start + limit - 1])
+
+    return page, next_cursor
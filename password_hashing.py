@@ -0,0 +1,82 @@
+import os
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from werkzeug.security import generate_password_hash, check_password_hash
+
+logger = logging.getLogger(__name__)
+
+# Password hashing runs in a separate process pool so scrypt never pins request threads
+# 0 workers hashes inline on the calling thread
+PASSWORD_HASH_WORKERS = int(os.environ.get("PASSWORD_HASH_WORKERS", str(max(1, (os.cpu_count() or 2) // 2))))
+# Hash jobs allowed to be running or queued per worker process before new ones are shed
+PASSWORD_HASH_MAX_PENDING = int(os.environ.get("PASSWORD_HASH_MAX_PENDING", str(PASSWORD_HASH_WORKERS * 4)))
+PASSWORD_HASH_TIMEOUT = float(os.environ.get("PASSWORD_HASH_TIMEOUT", "10"))
+PASSWORD_HASH_RETRY_AFTER = int(os.environ.get("PASSWORD_HASH_RETRY_AFTER", "1"))
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+_pending = None
+
+
+class PasswordHashingOverloaded(Exception):
+    """Too many password hashes are already queued; the caller should retry later"""
+
+    def __init__(self, retry_after=PASSWORD_HASH_RETRY_AFTER):
+        super().__init__("Password hashing queue is full")
+        self.retry_after = retry_after
+
+
+def _mp_context():
+    """
+    forkserver children start from a clean process that has only imported
+    werkzeug.security, not the app, its threads or its database connections
+    """
+    if 'forkserver' in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context('forkserver')
+        context.set_forkserver_preload(['werkzeug.security'])
+        return context
+    return multiprocessing.get_context('spawn')
+
+
+def _get_pool():
+    """Process pool of the current worker, rebuilt after a fork"""
+    global _pool, _pool_pid, _pending
+    if _pool is None or _pool_pid != os.getpid():
+        with _pool_lock:
+            if _pool is None or _pool_pid != os.getpid():
+                _pool = ProcessPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, mp_context=_mp_context())
+                _pool_pid = os.getpid()
+                _pending = threading.BoundedSemaphore(PASSWORD_HASH_MAX_PENDING)
+    return _pool
+
+
+def _run(func, *args):
+    """Run func in the pool, shedding the call when the queue is already full"""
+    if PASSWORD_HASH_WORKERS <= 0:
+        return func(*args)
+
+    pool = _get_pool()
+    pending = _pending
+    if not pending.acquire(blocking=False):
+        logger.warning("Password hashing queue full; shedding request")
+        raise PasswordHashingOverloaded()
+    try:
+        future = pool.submit(func, *args)
+    except Exception:
+        pending.release()
+        raise
+    future.add_done_callback(lambda _: pending.release())
+    return future.result(timeout=PASSWORD_HASH_TIMEOUT)
+
+
+def hash_password(password):
+    return _run(generate_password_hash, password)
+
+
+def verify_password(password_hash, password):
+    if not password_hash:
+        return False
+    return _run(check_password_hash, password_hash, password)
@@ -0,0 +1,178 @@
+import os
+import math
+import time
+import hashlib
+import logging
+import threading
+from functools import wraps
+from collections import OrderedDict
+from flask import current_app, request, jsonify
+
+try:
+    import redis
+except ImportError:  # Optional; only needed for a shared limiter
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+# Where buckets live: memory:// (per process) or redis://host:port/db (shared by all workers)
+RATELIMIT_STORAGE_URL = os.environ.get("RATELIMIT_STORAGE_URL", "memory://")
+RATELIMIT_MEMORY_MAX_KEYS = int(os.environ.get("RATELIMIT_MEMORY_MAX_KEYS", "100000"))
+
+# Token buckets for /api/auth: burst size / refill period
+AUTH_RATELIMIT_ACCOUNT = os.environ.get("AUTH_RATELIMIT_ACCOUNT", "5/minute")
+AUTH_RATELIMIT_IP = os.environ.get("AUTH_RATELIMIT_IP", "30/minute")
+AUTH_RATELIMIT_GLOBAL = os.environ.get("AUTH_RATELIMIT_GLOBAL", "200/second")
+
+_PERIODS = {
+    'second': 1,
+    'minute': 60,
+    'hour': 3600,
+    'day': 86400
+}
+
+
+def parse_rate(rate):
+    """'5/minute' -> (capacity 5, refill 5/60 tokens per second)"""
+    count, period = rate.split('/')
+    capacity = int(count)
+    return capacity, capacity / _PERIODS[period.strip()]
+
+
+class MemoryRateLimitStore:
+    """
+    Token buckets in a bounded dict guarded by a lock
+    Only counts requests seen by one process; limits are per worker
+    """
+
+    def __init__(self, max_keys=RATELIMIT_MEMORY_MAX_KEYS):
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def acquire(self, limits):
+        """
+        Take one token from every bucket in limits [(key, capacity, rate)], or none
+        Returns 0 when admitted, otherwise seconds until the emptiest bucket has a token
+        """
+        now = time.monotonic()
+        with self._lock:
+            levels = []
+            wait = 0.0
+            for key, capacity, rate in limits:
+                tokens, updated = self._buckets.get(key, (capacity, now))
+                tokens = min(capacity, tokens + (now - updated) * rate)
+                levels.append((key, tokens))
+                if tokens < 1:
+                    wait = max(wait, (1 - tokens) / rate)
+            if wait:
+                return wait
+
+            for key, tokens in levels:
+                self._buckets[key] = (tokens - 1, now)
+                self._buckets.move_to_end(key)
+            # Dropping the stalest bucket only resets it to full
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+            return 0
+
+
+class RedisRateLimitStore:
+    """
+    Token buckets shared by every worker through Redis
+    One hash per bucket, checked and updated by a single script so all buckets
+    are taken atomically
+    """
+
+    _ACQUIRE_SCRIPT = """
+    local now = redis.call('TIME')
+    now = tonumber(now[1]) + tonumber(now[2]) / 1000000
+    local levels = {}
+    local wait = 0
+    for i, key in ipairs(KEYS) do
+        local capacity = tonumber(ARGV[2 * i - 1])
+        local rate = tonumber(ARGV[2 * i])
+        local bucket = redis.call('HMGET', key, 'tokens', 'updated')
+        local tokens = tonumber(bucket[1]) or capacity
+        local updated = tonumber(bucket[2]) or now
+        tokens = math.min(capacity, tokens + (now - updated) * rate)
+        levels[i] = tokens
+        if tokens < 1 then wait = math.max(wait, (1 - tokens) / rate) end
+    end
+    if wait > 0 then return tostring(wait) end
+    for i, key in ipairs(KEYS) do
+        local capacity = tonumber(ARGV[2 * i - 1])
+        local rate = tonumber(ARGV[2 * i])
+        redis.call('HSET', key, 'tokens', levels[i] - 1, 'updated', now)
+        redis.call('PEXPIRE', key, math.ceil(capacity / rate * 1000))
+    end
+    return '0'
+    """
+
+    def __init__(self, url, prefix="ratelimit"):
+        if redis is None:
+            raise RuntimeError("The redis package is required for a redis:// rate limit store")
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+        self._acquire = self.client.register_script(self._ACQUIRE_SCRIPT)
+
+    def acquire(self, limits):
+        keys = [f"{self.prefix}:{key}" for key, _, _ in limits]
+        args = []
+        for _, capacity, rate in limits:
+            args.extend([capacity, rate])
+        return float(self._acquire(keys=keys, args=args))
+
+
+def create_rate_limit_store(url):
+    """Build the bucket store for a storage URL"""
+    if url.startswith(('redis://', 'rediss://', 'unix://')):
+        return RedisRateLimitStore(url)
+    if url.startswith('memory://'):
+        return MemoryRateLimitStore()
+    raise ValueError(f"Unsupported rate limit storage URL: {url}")
+
+
+def init_rate_limiter(app):
+    app.extensions['rate_limiter'] = create_rate_limit_store(app.config['RATELIMIT_STORAGE_URL'])
+
+
+def _account_key(value):
+    # Bucket keys never carry raw phone numbers or emails
+    return hashlib.sha256(str(value).encode()).hexdigest()[:32]
+
+
+def auth_rate_limit(account_field):
+    """
+    Admit a request to an auth endpoint only if its account, client IP and the
+    global auth bucket all have a token; otherwise answer 429 before any
+    database or hashing work
+    """
+    account_limit = parse_rate(AUTH_RATELIMIT_ACCOUNT)
+    ip_limit = parse_rate(AUTH_RATELIMIT_IP)
+    global_limit = parse_rate(AUTH_RATELIMIT_GLOBAL)
+
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            limits = [("auth:global", *global_limit), (f"auth:ip:{request.remote_addr}", *ip_limit)]
+            body = request.get_json(silent=True)
+            # A body that is not a JSON object is limited by IP and globally only
+            account = body.get(account_field) if isinstance(body, dict) else None
+            if account:
+                limits.append((f"auth:account:{_account_key(account)}", *account_limit))
+
+            try:
+                wait = current_app.extensions['rate_limiter'].acquire(limits)
+            except Exception as e:
+                # Fail open: a limiter outage must not lock everyone out
+                logger.error(f"Rate limiter unavailable: {str(e)}")
+                wait = 0
+
+            if wait:
+                response = jsonify({"success": False, "message": "Too many requests, please retry later"})
+                response.headers['Retry-After'] = str(max(1, math.ceil(wait)))
+                return response, 429
+            return func(*args, **kwargs)
+        return wrapper
+    return decorator
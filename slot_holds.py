@@ -0,0 +1,264 @@
+import os
+import json
+import time
+import uuid
+import logging
+import threading
+from datetime import datetime
+from flask import current_app
+
+try:
+    import redis
+except ImportError:  # Optional; only needed for a shared hold store
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+# Where holds live: memory:// (per process) or redis://host:port/db (shared by all workers)
+SLOT_HOLD_STORAGE_URL = os.environ.get("SLOT_HOLD_STORAGE_URL", "memory://")
+SLOT_HOLD_TTL = int(os.environ.get("SLOT_HOLD_TTL", "120"))
+SLOT_HOLD_MAX_TTL = int(os.environ.get("SLOT_HOLD_MAX_TTL", "300"))
+# Live holds one user may have at once; a new hold past this releases their hold closest to lapsing
+SLOT_HOLD_MAX_PER_USER = int(os.environ.get("SLOT_HOLD_MAX_PER_USER", "2"))
+
+
+def _slot(doctor_id, appointment_date, appointment_time):
+    """Hashable slot identity: (doctor_id, 'YYYY-MM-DD', 'HH:MM')"""
+    return str(doctor_id), appointment_date.isoformat(), appointment_time.strftime('%H:%M')
+
+
+def _new_hold(slot, user_id, ttl):
+    doctor_id, appointment_date, appointment_time = slot
+    return {
+        "hold_id": str(uuid.uuid4()),
+        "doctor_id": doctor_id,
+        "appointment_date": appointment_date,
+        "appointment_time": appointment_time,
+        "user_id": user_id,
+        "expires_at": time.time() + ttl
+    }
+
+
+class MemorySlotHoldStore:
+    """
+    Slot holds in a dict guarded by a lock
+    Only visible to one process; meant for tests and single-worker deployments
+    """
+
+    def __init__(self):
+        self._by_slot = {}
+        self._by_id = {}
+        self._by_user = {}
+        self._lock = threading.Lock()
+
+    def _drop(self, hold):
+        """Forget a hold under every index; caller holds the lock"""
+        self._by_id.pop(hold["hold_id"], None)
+        slot = (hold["doctor_id"], hold["appointment_date"], hold["appointment_time"])
+        if self._by_slot.get(slot) is hold:
+            del self._by_slot[slot]
+        user_holds = self._by_user.get(hold["user_id"])
+        if user_holds is not None:
+            user_holds.pop(hold["hold_id"], None)
+            if not user_holds:
+                del self._by_user[hold["user_id"]]
+
+    def _live(self, hold, now):
+        """Return hold if it has not expired, dropping it otherwise; caller holds the lock"""
+        if hold is None:
+            return None
+        if hold["expires_at"] > now:
+            return hold
+        self._drop(hold)
+        return None
+
+    def acquire(self, slot, user_id, ttl, max_per_user=SLOT_HOLD_MAX_PER_USER):
+        with self._lock:
+            now = time.time()
+            if self._live(self._by_slot.get(slot), now):
+                return None
+            user_holds = [h for h in list(self._by_user.get(user_id, {}).values()) if self._live(h, now)]
+            user_holds.sort(key=lambda h: h["expires_at"])
+            for old in user_holds[:max(0, len(user_holds) - max_per_user + 1)]:
+                self._drop(old)
+            hold = _new_hold(slot, user_id, ttl)
+            self._by_slot[slot] = hold
+            self._by_id[hold["hold_id"]] = hold
+            self._by_user.setdefault(user_id, {})[hold["hold_id"]] = hold
+            return dict(hold)
+
+    def get(self, hold_id):
+        with self._lock:
+            hold = self._live(self._by_id.get(hold_id), time.time())
+            return dict(hold) if hold else None
+
+    def release(self, hold_id):
+        with self._lock:
+            hold = self._by_id.get(hold_id)
+            if hold is None:
+                return False
+            self._drop(hold)
+            return True
+
+    def holders(self, slots):
+        with self._lock:
+            now = time.time()
+            result = {}
+            for slot in slots:
+                hold = self._live(self._by_slot.get(slot), now)
+                if hold:
+                    result[slot] = hold["user_id"]
+            return result
+
+
+class RedisSlotHoldStore:
+    """
+    Slot holds shared by every worker through Redis
+    One key per slot, one per hold id and a sorted set per user of their hold
+    ids scored by expiry, all written together by one script
+    """
+
+    # KEYS: slot, hold id, user; ARGV: hold, hold id, ttl, expires_at, now, max per user, key prefix
+    # Claim a free slot, first releasing the user's holds closest to lapsing beyond the limit
+    _ACQUIRE_SCRIPT = """
+    if redis.call('EXISTS', KEYS[1]) == 1 then return 0 end
+    redis.call('ZREMRANGEBYSCORE', KEYS[3], '-inf', ARGV[5])
+    local excess = redis.call('ZCARD', KEYS[3]) - tonumber(ARGV[6]) + 1
+    if excess > 0 then
+        for _, old_id in ipairs(redis.call('ZRANGE', KEYS[3], 0, excess - 1)) do
+            local id_key = ARGV[7] .. ':id:' .. old_id
+            local old = redis.call('GET', id_key)
+            if old then
+                local h = cjson.decode(old)
+                local slot_key = ARGV[7] .. ':slot:' .. h.doctor_id .. ':' .. h.appointment_date .. ':' .. h.appointment_time
+                if redis.call('GET', slot_key) == old then redis.call('DEL', slot_key) end
+                redis.call('DEL', id_key)
+            end
+            redis.call('ZREM', KEYS[3], old_id)
+        end
+    end
+    redis.call('SET', KEYS[1], ARGV[1], 'EX', ARGV[3])
+    redis.call('SET', KEYS[2], ARGV[1], 'EX', ARGV[3])
+    redis.call('ZADD', KEYS[3], ARGV[4], ARGV[2])
+    if redis.call('TTL', KEYS[3]) < tonumber(ARGV[3]) then redis.call('EXPIRE', KEYS[3], ARGV[3]) end
+    return 1
+    """
+
+    # Delete the slot key only if it still belongs to this hold
+    _RELEASE_SCRIPT = """
+    local hold = redis.call('GET', KEYS[2])
+    if not hold then return 0 end
+    if redis.call('GET', KEYS[1]) == hold then redis.call('DEL', KEYS[1]) end
+    redis.call('DEL', KEYS[2])
+    redis.call('ZREM', KEYS[3], ARGV[1])
+    return 1
+    """
+
+    def __init__(self, url, prefix="slot_hold"):
+        if redis is None:
+            raise RuntimeError("The redis package is required for a redis:// slot hold store")
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+        self._acquire = self.client.register_script(self._ACQUIRE_SCRIPT)
+        self._release = self.client.register_script(self._RELEASE_SCRIPT)
+
+    def _slot_key(self, slot):
+        return f"{self.prefix}:slot:{':'.join(slot)}"
+
+    def _hold_key(self, hold_id):
+        return f"{self.prefix}:id:{hold_id}"
+
+    def _user_key(self, user_id):
+        return f"{self.prefix}:user:{user_id}"
+
+    def acquire(self, slot, user_id, ttl, max_per_user=SLOT_HOLD_MAX_PER_USER):
+        hold = _new_hold(slot, user_id, ttl)
+        claimed = self._acquire(
+            keys=[self._slot_key(slot), self._hold_key(hold["hold_id"]), self._user_key(user_id)],
+            args=[json.dumps(hold), hold["hold_id"], ttl, hold["expires_at"], time.time(), max_per_user, self.prefix]
+        )
+        return hold if claimed else None
+
+    def get(self, hold_id):
+        value = self.client.get(self._hold_key(hold_id))
+        return json.loads(value) if value else None
+
+    def release(self, hold_id):
+        hold = self.get(hold_id)
+        if hold is None:
+            return False
+        slot = (hold["doctor_id"], hold["appointment_date"], hold["appointment_time"])
+        return bool(self._release(
+            keys=[self._slot_key(slot), self._hold_key(hold_id), self._user_key(hold["user_id"])],
+            args=[hold_id]
+        ))
+
+    def holders(self, slots):
+        slots = list(slots)
+        if not slots:
+            return {}
+        values = self.client.mget([self._slot_key(slot) for slot in slots])
+        return {slot: json.loads(value)["user_id"] for slot, value in zip(slots, values) if value}
+
+
+def create_slot_hold_store(url):
+    """Build the hold store for a storage URL"""
+    if url.startswith(('redis://', 'rediss://', 'unix://')):
+        return RedisSlotHoldStore(url)
+    if url.startswith('memory://'):
+        return MemorySlotHoldStore()
+    raise ValueError(f"Unsupported slot hold storage URL: {url}")
+
+
+def init_slot_holds(app):
+    app.extensions['slot_holds'] = create_slot_hold_store(app.config['SLOT_HOLD_STORAGE_URL'])
+
+
+def get_slot_hold_store():
+    """Hold store of the current app, or None when holds are not configured"""
+    return current_app.extensions.get('slot_holds')
+
+
+def hold_slot(doctor_id, appointment_date, appointment_time, user_id, ttl=SLOT_HOLD_TTL):
+    """
+    Reserve a slot for ttl seconds
+    A user keeps at most SLOT_HOLD_MAX_PER_USER holds; past that their hold
+    closest to lapsing is released to make room
+    Returns the hold, or None when the slot is already held
+    """
+    ttl = max(1, min(int(ttl), SLOT_HOLD_MAX_TTL))
+    slot = _slot(doctor_id, appointment_date, appointment_time)
+    return get_slot_hold_store().acquire(slot, user_id, ttl, max(1, SLOT_HOLD_MAX_PER_USER))
+
+
+def get_hold(hold_id):
+    """The live hold with this id, or None if it expired or was released"""
+    return get_slot_hold_store().get(hold_id)
+
+
+def release_hold(hold_id):
+    """Drop a hold; returns False when it no longer exists"""
+    return get_slot_hold_store().release(hold_id)
+
+
+def hold_matches(hold, doctor_id, appointment_date, appointment_time):
+    """Whether a hold covers exactly this slot"""
+    return (hold["doctor_id"], hold["appointment_date"], hold["appointment_time"]) == \
+        _slot(doctor_id, appointment_date, appointment_time)
+
+
+def get_slot_holders(slots):
+    """
+    Map (doctor_id, date, 'HH:MM') -> holding user id for the held ones among slots
+    One round trip to the store
+    """
+    store = get_slot_hold_store()
+    if store is None:
+        return {}
+    keys = {(str(doctor_id), day.isoformat(), slot): (doctor_id, day, slot) for doctor_id, day, slot in slots}
+    return {keys[key]: user_id for key, user_id in store.holders(keys).items()}
+
+
+def hold_expires_at(hold):
+    """ISO timestamp of when a hold lapses"""
+    return datetime.utcfromtimestamp(hold["expires_at"]).isoformat()
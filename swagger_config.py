@@ -60,6 +60,20 @@ def swagger_json():
                     "description": "Enter JWT token obtained from authentication endpoints"
                 }
             },
+            "parameters": {
+                "Cursor": {
+                    "name": "cursor",
+                    "in": "query",
+                    "schema": {"type": "string"},
+                    "description": "Opaque token from next_cursor of the previous page"
+                },
+                "Limit": {
+                    "name": "limit",
+                    "in": "query",
+                    "schema": {"type": "integer", "default": 50, "minimum": 1, "maximum": 100},
+                    "description": "Page size"
+                }
+            },
             "schemas": {
                 "User": {
                     "type": "object",
@@ -250,6 +264,17 @@ def swagger_json():
                     }
                 }
             },
+            "/auth/logout": {
+                "post": {
+                    "tags": ["Authentication"],
+                    "summary": "Logout and revoke the current access token",
+                    "security": [{"bearerAuth": []}],
+                    "responses": {
+                        "200": {"description": "Token revoked; later requests with it get 401"},
+                        "401": {"description": "Missing, invalid or already revoked token"}
+                    }
+                }
+            },
             "/auth/login-abha": {
                 "post": {
                     "tags": ["Authentication"],
@@ -406,7 +431,20 @@ def swagger_json():
                             "in": "query",
                             "schema": {"type": "string"},
                             "description": "Search by doctor name"
-                        }
+                        },
+                        {
+                            "name": "q",
+                            "in": "query",
+                            "schema": {"type": "string"},
+                            "description": "Typo-tolerant search over name and specialty, ranked by relevance"
+                        },
+                        {
+                            "name": "limit",
+                            "in": "query",
+                            "schema": {"type": "integer", "default": 20, "maximum": 100},
+                            "description": "Page size, or maximum number of ranked results when using q"
+                        },
+                        {"$ref": "#/components/parameters/Cursor"}
                     ],
                     "responses": {
                         "200": {
@@ -420,6 +458,17 @@ def swagger_json():
                                             "doctors": {
                                                 "type": "array",
                                                 "items": {"$ref": "#/components/schemas/Doctor"}
+                                            },
+                                            "partial": {
+                                                "type": "boolean",
+                                                "description": "True when HMIS results missed the request deadline"
+                                            },
+                                            "timings": {
+                                                "type": "object",
+                                                "properties": {
+                                                    "local_ms": {"type": "number"},
+                                                    "hmis_ms": {"type": "number", "nullable": True}
+                                                }
                                             }
                                         }
                                     }
@@ -429,6 +478,56 @@ def swagger_json():
                     }
                 }
             },
+            "/doctors/availability": {
+                "post": {
+                    "tags": ["Doctors"],
+                    "summary": "Get an availability grid for many doctors",
+                    "security": [{"bearerAuth": []}],
+                    "requestBody": {
+                        "required": True,
+                        "content": {
+                            "application/json": {
+                                "schema": {
+                                    "type": "object",
+                                    "required": ["doctor_ids", "from"],
+                                    "properties": {
+                                        "doctor_ids": {
+                                            "type": "array",
+                                            "items": {"type": "string"},
+                                            "maxItems": 50
+                                        },
+                                        "from": {"type": "string", "format": "date"},
+                                        "to": {"type": "string", "format": "date"}
+                                    }
+                                }
+                            }
+                        }
+                    },
+                    "responses": {
+                        "200": {
+                            "description": "Free slots per doctor aligned with dates",
+                            "content": {
+                                "application/json": {
+                                    "schema": {
+                                        "type": "object",
+                                        "properties": {
+                                            "success": {"type": "boolean"},
+                                            "dates": {
+                                                "type": "array",
+                                                "items": {"type": "string"}
+                                            },
+                                            "slots": {"type": "object"},
+                                            "next_available": {"type": "object"},
+                                            "partial": {"type": "boolean", "description": "Some HMIS days were not fetched within the call budget or deadline and are shown without slots"},
+                                            "errors": {"type": "object"}
+                                        }
+                                    }
+                                }
+                            }
+                        }
+                    }
+                }
+            },
             "/doctors/{doctor_id}/availability": {
                 "get": {
                     "tags": ["Doctors"],
@@ -444,7 +543,21 @@ def swagger_json():
                         {
                             "name": "date",
                             "in": "query",
-                            "required": True,
+                            "required": False,
+                            "description": "Single day; use from/to for a range",
+                            "schema": {"type": "string", "format": "date"}
+                        },
+                        {
+                            "name": "from",
+                            "in": "query",
+                            "required": False,
+                            "schema": {"type": "string", "format": "date"}
+                        },
+                        {
+                            "name": "to",
+                            "in": "query",
+                            "required": False,
+                            "description": "Inclusive end date, at most 31 days after from",
                             "schema": {"type": "string", "format": "date"}
                         }
                     ],
@@ -461,7 +574,83 @@ def swagger_json():
                                             "available_slots": {
                                                 "type": "array",
                                                 "items": {"type": "string"}
-                                            }
+                                            },
+                                            "from": {"type": "string"},
+                                            "to": {"type": "string"},
+                                            "days": {
+                                                "type": "array",
+                                                "items": {
+                                                    "type": "object",
+                                                    "properties": {
+                                                        "date": {"type": "string"},
+                                                        "available_slots": {
+                                                            "type": "array",
+                                                            "items": {"type": "string"}
+                                                        }
+                                                    }
+                                                }
+                                            },
+                                            "partial": {"type": "boolean", "description": "Some HMIS days were not fetched within the call budget or deadline"}
+                                        }
+                                    }
+                                }
+                            }
+                        }
+                    }
+                }
+            },
+            "/doctors/{doctor_id}/schedule": {
+                "get": {
+                    "tags": ["Doctors"],
+                    "summary": "Get a doctor's day or week schedule",
+                    "description": "Lists the times of active appointments and status counts; appointment ids, statuses and consultation types are not returned",
+                    "security": [{"bearerAuth": []}],
+                    "parameters": [
+                        {
+                            "name": "doctor_id",
+                            "in": "path",
+                            "required": True,
+                            "schema": {"type": "string"}
+                        },
+                        {
+                            "name": "date",
+                            "in": "query",
+                            "required": False,
+                            "description": "Day to show, or any day in the week; defaults to today",
+                            "schema": {"type": "string", "format": "date"}
+                        },
+                        {
+                            "name": "view",
+                            "in": "query",
+                            "required": False,
+                            "schema": {"type": "string", "enum": ["day", "week"], "default": "day"}
+                        }
+                    ],
+                    "responses": {
+                        "200": {
+                            "description": "Appointments per day with status counts",
+                            "content": {
+                                "application/json": {
+                                    "schema": {
+                                        "type": "object",
+                                        "properties": {
+                                            "success": {"type": "boolean"},
+                                            "doctor_id": {"type": "string"},
+                                            "view": {"type": "string"},
+                                            "from": {"type": "string", "format": "date"},
+                                            "to": {"type": "string", "format": "date"},
+                                            "days": {
+                                                "type": "array",
+                                                "items": {
+                                                    "type": "object",
+                                                    "properties": {
+                                                        "date": {"type": "string", "format": "date"},
+                                                        "appointments": {"type": "array", "items": {"type": "object"}},
+                                                        "counts": {"type": "object"}
+                                                    }
+                                                }
+                                            },
+                                            "counts": {"type": "object"}
                                         }
                                     }
                                 }
@@ -486,7 +675,8 @@ def swagger_json():
                                         "appointment_date": {"type": "string", "format": "date"},
                                         "appointment_time": {"type": "string", "format": "time"},
                                         "symptoms": {"type": "string"},
-                                        "consultation_type": {"type": "string", "enum": ["in-person", "video", "audio"]}
+                                        "consultation_type": {"type": "string", "enum": ["in-person", "video", "audio"]},
+                                        "hold_id": {"type": "string", "description": "Hold from POST /appointments/holds for this slot"}
                                     },
                                     "required": ["doctor_id", "appointment_date", "appointment_time"]
                                 }
@@ -503,11 +693,21 @@ def swagger_json():
                                         "properties": {
                                             "success": {"type": "boolean"},
                                             "message": {"type": "string"},
-                                            "appointment_id": {"type": "string"}
+                                            "appointment_id": {"type": "string"},
+                                            "status": {"type": "string", "enum": ["scheduled", "pending"]}
                                         }
                                     }
                                 }
                             }
+                        },
+                        "202": {"description": "HMIS doctor: appointment accepted as pending and confirmed with the hospital in the background"},
+                        "409": {
+                            "description": "Time slot is already booked, held by another patient, or the hold has expired",
+                            "content": {
+                                "application/json": {
+                                    "schema": {"$ref": "#/components/schemas/ErrorResponse"}
+                                }
+                            }
                         }
                     }
                 },
@@ -516,6 +716,8 @@ def swagger_json():
                     "summary": "Get user appointments",
                     "security": [{"bearerAuth": []}],
                     "parameters": [
+                        {"$ref": "#/components/parameters/Cursor"},
+                        {"$ref": "#/components/parameters/Limit"},
                         {
                             "name": "status",
                             "in": "query",
@@ -543,12 +745,169 @@ def swagger_json():
                     }
                 }
             },
+            "/appointments/holds": {
+                "post": {
+                    "tags": ["Appointments"],
+                    "summary": "Hold a slot for a short time while booking",
+                    "description": "A patient keeps at most SLOT_HOLD_MAX_PER_USER holds (default 2); a new hold beyond that releases their hold closest to expiring",
+                    "security": [{"bearerAuth": []}],
+                    "requestBody": {
+                        "required": True,
+                        "content": {
+                            "application/json": {
+                                "schema": {
+                                    "type": "object",
+                                    "required": ["doctor_id", "appointment_date", "appointment_time"],
+                                    "properties": {
+                                        "doctor_id": {"type": "string"},
+                                        "appointment_date": {"type": "string", "format": "date"},
+                                        "appointment_time": {"type": "string", "example": "09:00"},
+                                        "ttl": {"type": "integer", "description": "Seconds to hold the slot", "default": 120, "maximum": 300}
+                                    }
+                                }
+                            }
+                        }
+                    },
+                    "responses": {
+                        "200": {
+                            "description": "Slot held; pass hold_id when booking",
+                            "content": {
+                                "application/json": {
+                                    "schema": {
+                                        "type": "object",
+                                        "properties": {
+                                            "success": {"type": "boolean"},
+                                            "message": {"type": "string"},
+                                            "hold_id": {"type": "string"},
+                                            "expires_at": {"type": "string", "format": "date-time"}
+                                        }
+                                    }
+                                }
+                            }
+                        },
+                        "409": {"description": "Slot already booked or held by another patient"}
+                    }
+                }
+            },
+            "/appointments/holds/{hold_id}": {
+                "delete": {
+                    "tags": ["Appointments"],
+                    "summary": "Release a slot hold",
+                    "security": [{"bearerAuth": []}],
+                    "parameters": [
+                        {
+                            "name": "hold_id",
+                            "in": "path",
+                            "required": True,
+                            "schema": {"type": "string"}
+                        }
+                    ],
+                    "responses": {
+                        "200": {"description": "Slot hold released"},
+                        "404": {"description": "Hold not found"}
+                    }
+                }
+            },
+            "/appointments/series": {
+                "post": {
+                    "tags": ["Appointments"],
+                    "summary": "Book a recurring appointment series",
+                    "security": [{"bearerAuth": []}],
+                    "requestBody": {
+                        "required": True,
+                        "content": {
+                            "application/json": {
+                                "schema": {
+                                    "type": "object",
+                                    "required": ["doctor_id", "start_date", "appointment_time", "recurrence"],
+                                    "properties": {
+                                        "doctor_id": {"type": "string"},
+                                        "start_date": {"type": "string", "format": "date"},
+                                        "appointment_time": {"type": "string", "example": "09:00"},
+                                        "recurrence": {
+                                            "type": "object",
+                                            "properties": {
+                                                "frequency": {"type": "string", "enum": ["daily", "weekly"], "default": "weekly"},
+                                                "interval": {"type": "integer", "default": 1},
+                                                "count": {"type": "integer", "maximum": 52},
+                                                "until": {"type": "string", "format": "date"}
+                                            }
+                                        },
+                                        "symptoms": {"type": "string"},
+                                        "consultation_type": {"type": "string", "enum": ["in-person", "video", "audio"]}
+                                    }
+                                }
+                            }
+                        }
+                    },
+                    "responses": {
+                        "200": {
+                            "description": "Series booked; dates that were taken are listed in conflicts",
+                            "content": {
+                                "application/json": {
+                                    "schema": {
+                                        "type": "object",
+                                        "properties": {
+                                            "success": {"type": "boolean"},
+                                            "message": {"type": "string"},
+                                            "appointments": {
+                                                "type": "array",
+                                                "items": {
+                                                    "type": "object",
+                                                    "properties": {
+                                                        "appointment_id": {"type": "string"},
+                                                        "appointment_date": {"type": "string", "format": "date"}
+                                                    }
+                                                }
+                                            },
+                                            "conflicts": {
+                                                "type": "array",
+                                                "items": {
+                                                    "type": "object",
+                                                    "properties": {
+                                                        "appointment_date": {"type": "string", "format": "date"},
+                                                        "message": {"type": "string"}
+                                                    }
+                                                }
+                                            }
+                                        }
+                                    }
+                                }
+                            }
+                        },
+                        "400": {"description": "Invalid recurrence rule"},
+                        "409": {"description": "No date in the series could be booked"}
+                    }
+                }
+            },
+            "/appointments/{appointment_id}/cancel": {
+                "post": {
+                    "tags": ["Appointments"],
+                    "summary": "Cancel an appointment",
+                    "security": [{"bearerAuth": []}],
+                    "parameters": [
+                        {
+                            "name": "appointment_id",
+                            "in": "path",
+                            "required": True,
+                            "schema": {"type": "string"}
+                        }
+                    ],
+                    "responses": {
+                        "200": {"description": "Appointment cancelled"},
+                        "400": {"description": "Appointment already cancelled or completed"},
+                        "404": {"description": "Appointment not found"}
+                    }
+                }
+            },
             "/symptoms": {
                 "get": {
                     "tags": ["Symptom Checker"],
                     "summary": "Get list of symptoms",
                     "security": [{"bearerAuth": []}],
                     "parameters": [
+                        {"$ref": "#/components/parameters/Cursor"},
+                        {"$ref": "#/components/parameters/Limit"},
                         {
                             "name": "category",
                             "in": "query",
@@ -674,7 +1033,16 @@ def swagger_json():
                             "description": "Document uploaded",
                             "content": {
                                 "application/json": {
-                                    "schema": {"$ref": "#/components/schemas/SuccessResponse"}
+                                    "schema": {
+                                        "type": "object",
+                                        "properties": {
+                                            "success": {"type": "boolean"},
+                                            "message": {"type": "string"},
+                                            "document_id": {"type": "string"},
+                                            "file_size": {"type": "integer"},
+                                            "sha256": {"type": "string", "description": "Hex SHA-256 of the stored file; identical uploads share one stored copy"}
+                                        }
+                                    }
                                 }
                             }
                         }
@@ -685,6 +1053,8 @@ def swagger_json():
                     "summary": "Get user documents",
                     "security": [{"bearerAuth": []}],
                     "parameters": [
+                        {"$ref": "#/components/parameters/Cursor"},
+                        {"$ref": "#/components/parameters/Limit"},
                         {
                             "name": "type",
                             "in": "query",
@@ -813,6 +1183,8 @@ def swagger_json():
                     "summary": "Get available lab tests",
                     "security": [{"bearerAuth": []}],
                     "parameters": [
+                        {"$ref": "#/components/parameters/Cursor"},
+                        {"$ref": "#/components/parameters/Limit"},
                         {
                             "name": "category",
                             "in": "query",
@@ -894,6 +1266,10 @@ def swagger_json():
                 "get": {
                     "tags": ["Care Packages"],
                     "summary": "Get available care packages",
+                    "parameters": [
+                        {"$ref": "#/components/parameters/Cursor"},
+                        {"$ref": "#/components/parameters/Limit"}
+                    ],
                     "responses": {
                         "200": {
                             "description": "List of care packages",
@@ -917,6 +1293,8 @@ def swagger_json():
                     "tags": ["Ambulance Services"],
                     "summary": "Get available ambulance services",
                     "parameters": [
+                        {"$ref": "#/components/parameters/Cursor"},
+                        {"$ref": "#/components/parameters/Limit"},
                         {
                             "name": "type",
                             "in": "query",
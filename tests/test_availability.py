@@ -0,0 +1,138 @@
+import unittest
+from unittest import mock
+from datetime import date, datetime, time
+from app import create_app, db
+from models import Doctor, Appointment
+from availability import get_booked_slots, get_availability, get_availability_grid
+from hmis_client import get_hmis_client
+import hmis_integration
+
+
+class TestAvailability(unittest.TestCase):
+
+    def setUp(self):
+        """Set up app, database and a doctor with Friday slots"""
+        self.app = create_app()
+        self.app.config['TESTING'] = True
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+
+        doctor = Doctor(name='Dr. Test', specialty='Cardiology',
+                        availability={'friday': ['09:00', '10:00', '11:00']})
+        db.session.add(doctor)
+        db.session.commit()
+        self.doctor_id = doctor.id
+
+    def tearDown(self):
+        """Clean up after tests"""
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def book(self, day, slot, status='scheduled'):
+        db.session.add(Appointment(
+            user_id='user-1',
+            doctor_id=self.doctor_id,
+            appointment_date=datetime.combine(day, time.min),
+            appointment_time=datetime.strptime(slot, '%H:%M').time(),
+            status=status
+        ))
+        db.session.commit()
+
+    def test_booked_slots_skip_cancelled(self):
+        """Test cancelled appointments do not block their slot"""
+        self.book(date(2024, 12, 20), '09:00')
+        self.book(date(2024, 12, 20), '10:00', status='cancelled')
+        self.book(date(2024, 12, 27), '11:00')
+
+        booked = get_booked_slots(self.doctor_id, date(2024, 12, 20), date(2024, 12, 26))
+        self.assertEqual(booked, {(date(2024, 12, 20), '09:00')})
+
+    def test_range_availability(self):
+        """Test a week range returns every day with booked slots removed"""
+        self.book(date(2024, 12, 20), '10:00')
+
+        result = get_availability(self.doctor_id, date(2024, 12, 16), date(2024, 12, 22))
+        self.assertTrue(result['success'])
+        self.assertEqual(len(result['days']), 7)
+
+        by_date = {day['date']: day['available_slots'] for day in result['days']}
+        self.assertEqual(by_date['2024-12-20'], ['09:00', '11:00'])
+        self.assertEqual(by_date['2024-12-19'], [])
+
+    def test_availability_grid(self):
+        """Test the grid aligns slots with dates and reports the next free slot"""
+        other = Doctor(name='Dr. Other', specialty='Neurology', availability={'saturday': ['12:00']})
+        db.session.add(other)
+        db.session.commit()
+        self.book(date(2024, 12, 20), '09:00')
+
+        grid = get_availability_grid([self.doctor_id, other.id], date(2024, 12, 20), date(2024, 12, 21))
+        self.assertEqual(grid['dates'], ['2024-12-20', '2024-12-21'])
+        self.assertEqual(grid['slots'][self.doctor_id], [['10:00', '11:00'], []])
+        self.assertEqual(grid['slots'][other.id], [[], ['12:00']])
+        self.assertEqual(grid['next_available'][other.id], {"date": "2024-12-21", "time": "12:00"})
+        self.assertEqual(grid['errors'], {})
+
+    def test_hmis_availability_cached_until_booking(self):
+        """Test HMIS availability is cached per doctor/date and dropped when a booking commits"""
+        hmis_integration._availability_cache.clear()
+        response = mock.Mock(status_code=200)
+        response.json.return_value = {'available_slots': ['09:00', '10:00']}
+
+        with mock.patch.object(get_hmis_client(), 'get', return_value=response) as hmis_get:
+            day = date(2024, 12, 20)
+            self.assertEqual(hmis_integration.get_doctor_availability('hmis_7', day)['slots'], ['09:00', '10:00'])
+            hmis_integration.get_doctor_availability('7', day)
+            self.assertEqual(hmis_get.call_count, 1)
+
+            db.session.add(Appointment(user_id='user-1', doctor_id='hmis_7',
+                                       appointment_date=datetime.combine(day, time.min),
+                                       appointment_time=time(9, 0)))
+            db.session.commit()
+
+            result = get_availability('hmis_7', day, day)
+            self.assertEqual(result['days'][0]['available_slots'], ['10:00'])
+            self.assertEqual(hmis_get.call_count, 2)
+
+    def test_hmis_calls_capped_per_request(self):
+        """Test HMIS doctors get a shorter day window once the call budget is spent"""
+        hmis_integration._availability_cache.clear()
+        response = mock.Mock(status_code=200)
+        response.json.return_value = {'available_slots': ['09:00']}
+
+        with mock.patch('availability.MAX_HMIS_CALLS_PER_REQUEST', 4), \
+                mock.patch.object(get_hmis_client(), 'get', return_value=response) as hmis_get:
+            grid = get_availability_grid(['hmis_1', 'hmis_2'], date(2024, 12, 16), date(2024, 12, 22))
+
+        self.assertEqual(hmis_get.call_count, 4)
+        self.assertTrue(grid['partial'])
+        self.assertEqual(grid['slots']['hmis_1'], [['09:00'], ['09:00'], [], [], [], [], []])
+
+    def test_hmis_deadline_returns_partial(self):
+        """Test a slow HMIS is abandoned at the deadline and the result marked partial"""
+        hmis_integration._availability_cache.clear()
+
+        def slow_get(*args, **kwargs):
+            import time as clock
+            clock.sleep(0.5)
+            response = mock.Mock(status_code=200)
+            response.json.return_value = {'available_slots': ['09:00']}
+            return response
+
+        with mock.patch('availability.HMIS_AVAILABILITY_DEADLINE', 0.1), \
+                mock.patch.object(get_hmis_client(), 'get', side_effect=slow_get):
+            result = get_availability('hmis_7', date(2024, 12, 20), date(2024, 12, 20))
+
+        self.assertTrue(result['success'])
+        self.assertTrue(result['partial'])
+        self.assertEqual(result['days'][0]['available_slots'], [])
+
+    def test_local_availability_is_complete(self):
+        """Test local doctors never report a partial result"""
+        self.assertFalse(get_availability(self.doctor_id, date(2024, 12, 20), date(2024, 12, 20))['partial'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,228 @@
+import io
+import os
+import hashlib
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+from unittest import mock
+from app import create_app, db
+from models import Blob, Document, Prescription, User
+from flask_jwt_extended import create_access_token
+from blob_store import store_blob, store_blob_bytes, sweep_released_blobs, blob_folder
+
+
+def stored_files(folder):
+    return sorted(os.path.relpath(os.path.join(root, name), folder)
+                  for root, _, names in os.walk(folder) for name in names)
+
+
+class UnseekableStream(io.BytesIO):
+
+    def seekable(self):
+        return False
+
+
+class TestBlobStore(unittest.TestCase):
+
+    def setUp(self):
+        """Set up app, database, a user and an empty upload folder"""
+        self.env = mock.patch.dict(os.environ, {'UPLOAD_FOLDER': tempfile.mkdtemp()})
+        self.env.start()
+        self.app = create_app()
+        self.app.config['TESTING'] = True
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+        self.client = self.app.test_client()
+
+        user = User(name='Test User', mobile_number='9876543210')
+        db.session.add(user)
+        db.session.commit()
+        self.user_id = user.id
+        self.headers = {'Authorization': f'Bearer {create_access_token(identity=user.id)}'}
+
+    def tearDown(self):
+        """Clean up after tests"""
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+        self.env.stop()
+
+    def upload(self, data, name='report.pdf'):
+        return self.client.post(
+            '/api/documents',
+            headers=self.headers,
+            data={'file': (io.BytesIO(data), name), 'document_type': 'test_result'},
+            content_type='multipart/form-data'
+        )
+
+    def add_document(self, stored):
+        document = Document(user_id=self.user_id, document_type='test_result', title='Report',
+                            file_path=stored.path, file_type='pdf', file_size=stored.size)
+        db.session.add(document)
+        db.session.commit()
+        return document
+
+    def test_duplicate_upload_shares_one_file(self):
+        """Test uploading the same content twice stores one file with two references"""
+        data = os.urandom(5000)
+        first = self.upload(data).get_json()
+        second = self.upload(data, name='copy.pdf').get_json()
+
+        first_doc = db.session.get(Document, first['document_id'])
+        second_doc = db.session.get(Document, second['document_id'])
+        self.assertEqual(first_doc.file_path, second_doc.file_path)
+        sha256 = hashlib.sha256(data).hexdigest()
+        self.assertEqual(stored_files(blob_folder()), [os.path.join(sha256[:2], sha256[2:4], sha256)])
+        self.assertEqual(db.session.get(Blob, first['sha256']).ref_count, 2)
+
+    def test_prescriptions_share_blobs_with_documents(self):
+        """Test a prescription image identical to a document references the same blob"""
+        data = os.urandom(2000)
+        sha256 = self.upload(data).get_json()['sha256']
+
+        response = self.client.post(
+            '/api/prescriptions',
+            headers=self.headers,
+            data={'prescription_image': (io.BytesIO(data), 'rx.jpg')},
+            content_type='multipart/form-data'
+        )
+
+        prescription = db.session.get(Prescription, response.get_json()['prescription_id'])
+        self.assertEqual(os.path.basename(prescription.prescription_image_path), sha256)
+        self.assertEqual(db.session.get(Blob, sha256).ref_count, 2)
+
+    def test_deleting_references_releases_blob(self):
+        """Test the last deleted reference leaves a blob the sweep removes"""
+        stored = store_blob_bytes(b'lab report')
+        first = self.add_document(stored)
+        second = self.add_document(store_blob_bytes(b'lab report'))
+
+        db.session.delete(first)
+        db.session.commit()
+        self.assertEqual(sweep_released_blobs(grace=0), 0)
+        self.assertTrue(os.path.exists(stored.path))
+
+        db.session.delete(second)
+        db.session.commit()
+        blob = db.session.get(Blob, stored.sha256)
+        self.assertEqual(blob.ref_count, 0)
+        self.assertIsNotNone(blob.released_at)
+
+        self.assertEqual(sweep_released_blobs(grace=0), 1)
+        self.assertFalse(os.path.exists(stored.path))
+        self.assertIsNone(db.session.get(Blob, stored.sha256))
+
+    def test_repointed_row_releases_old_blob(self):
+        """Test changing a row's file gives back its reference on the old blob"""
+        old = store_blob_bytes(b'first scan')
+        document = self.add_document(old)
+
+        document.file_path = store_blob_bytes(b'second scan').path
+        db.session.commit()
+
+        self.assertEqual(db.session.get(Blob, old.sha256).ref_count, 0)
+        self.assertEqual(db.session.get(Blob, hashlib.sha256(b'second scan').hexdigest()).ref_count, 1)
+
+    def test_sweep_waits_for_grace_period(self):
+        """Test a recently released blob survives a sweep and can be claimed again"""
+        stored = store_blob_bytes(b'discharge summary')
+        db.session.delete(self.add_document(stored))
+        db.session.commit()
+
+        self.assertEqual(sweep_released_blobs(grace=3600), 0)
+        self.add_document(store_blob_bytes(b'discharge summary'))
+        self.assertEqual(db.session.get(Blob, stored.sha256).ref_count, 1)
+        self.assertIsNone(db.session.get(Blob, stored.sha256).released_at)
+
+    def test_rolled_back_upload_is_swept(self):
+        """Test a file written by a transaction that rolls back is left to the sweep, not orphaned"""
+        stored = store_blob_bytes(b'abandoned scan')
+        db.session.rollback()
+
+        blob = db.session.get(Blob, stored.sha256)
+        self.assertEqual(blob.ref_count, 0)
+        self.assertIsNotNone(blob.released_at)
+        self.assertTrue(os.path.exists(stored.path))
+
+        self.assertEqual(sweep_released_blobs(grace=0), 1)
+        self.assertFalse(os.path.exists(stored.path))
+
+    def test_upload_in_closed_session_is_swept(self):
+        """Test a file written by a session closed without committing is left to the sweep"""
+        stored = store_blob_bytes(b'request failed')
+        db.session.remove()
+
+        self.assertEqual(db.session.get(Blob, stored.sha256).ref_count, 0)
+        self.assertEqual(sweep_released_blobs(grace=0), 1)
+        self.assertFalse(os.path.exists(stored.path))
+
+    def test_rolled_back_duplicate_keeps_shared_blob(self):
+        """Test rolling back a second reference leaves the committed one intact"""
+        stored = store_blob_bytes(b'shared scan')
+        self.add_document(stored)
+
+        store_blob_bytes(b'shared scan')
+        db.session.rollback()
+
+        self.assertEqual(db.session.get(Blob, stored.sha256).ref_count, 1)
+        self.assertEqual(sweep_released_blobs(grace=0), 0)
+        self.assertTrue(os.path.exists(stored.path))
+
+    def test_missing_file_is_rewritten(self):
+        """Test a blob row whose file is gone gets the file back on the next upload"""
+        stored = store_blob_bytes(b'x-ray')
+        db.session.commit()
+        os.unlink(stored.path)
+
+        again = store_blob_bytes(b'x-ray')
+        db.session.commit()
+
+        with open(again.path, 'rb') as f:
+            self.assertEqual(f.read(), b'x-ray')
+        self.assertEqual(db.session.get(Blob, stored.sha256).ref_count, 2)
+
+    def test_unseekable_stream(self):
+        """Test streams that cannot rewind are spooled and stored like any other"""
+        data = os.urandom(3000)
+        stored = store_blob(UnseekableStream(data), chunk_size=1024)
+        db.session.commit()
+
+        self.assertEqual(stored.sha256, hashlib.sha256(data).hexdigest())
+        self.assertEqual(stored.size, 3000)
+        self.assertEqual([os.path.basename(path) for path in stored_files(blob_folder())], [stored.sha256])
+
+    def test_sweep_command_removes_released_blobs(self):
+        """Test flask sweep-blobs deletes every blob released longer ago than the grace period"""
+        kept = store_blob_bytes(b'still referenced')
+        self.add_document(kept)
+        released = [store_blob_bytes(b'released %d' % i) for i in range(3)]
+        for stored in released:
+            db.session.delete(self.add_document(stored))
+        db.session.commit()
+
+        with mock.patch('blob_store.datetime') as clock:
+            clock.utcnow.return_value = datetime.utcnow() + timedelta(seconds=7200)
+            result = self.app.test_cli_runner().invoke(args=['sweep-blobs', '--grace', '3600', '--batch-size', '2'])
+
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertIn('Removed 3 unreferenced blobs', result.output)
+        for stored in released:
+            self.assertIsNone(db.session.get(Blob, stored.sha256))
+            self.assertFalse(os.path.exists(stored.path))
+        self.assertTrue(os.path.exists(kept.path))
+        self.assertEqual(db.session.get(Blob, kept.sha256).ref_count, 1)
+
+    def test_download_uses_document_name(self):
+        """Test a download is named after the document, not the content hash"""
+        document_id = self.upload(b'%PDF-1.4 report', name='blood_test.pdf').get_json()['document_id']
+
+        response = self.client.get(f'/api/documents/{document_id}/download', headers=self.headers)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('filename=blood_test.pdf', response.headers['Content-Disposition'])
+        response.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
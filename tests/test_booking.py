@@ -0,0 +1,78 @@
+import unittest
+from datetime import date, time
+from app import create_app, db
+from models import Appointment
+from booking import insert_appointment, expand_recurrence, book_series
+
+
+class TestBooking(unittest.TestCase):
+
+    def setUp(self):
+        """Set up app and database"""
+        self.app = create_app()
+        self.app.config['TESTING'] = True
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+
+    def tearDown(self):
+        """Clean up after tests"""
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def book(self, user_id):
+        appointment_id = insert_appointment(
+            user_id=user_id,
+            doctor_id='doctor-1',
+            appointment_date=date(2024, 12, 20),
+            appointment_time=time(9, 0)
+        )
+        db.session.commit()
+        return appointment_id
+
+    def test_second_booking_for_slot_conflicts(self):
+        """Test the unique slot index lets only one booking through"""
+        self.assertIsNotNone(self.book('user-1'))
+        self.assertIsNone(self.book('user-2'))
+        self.assertEqual(Appointment.query.count(), 1)
+
+    def test_cancelled_booking_frees_slot(self):
+        """Test a cancelled appointment no longer blocks its slot"""
+        appointment = db.session.get(Appointment, self.book('user-1'))
+        appointment.status = 'cancelled'
+        db.session.commit()
+
+        self.assertIsNotNone(self.book('user-2'))
+        self.assertEqual(Appointment.query.filter_by(status='scheduled').count(), 1)
+
+    def test_expand_recurrence(self):
+        """Test count- and until-bounded series and invalid rules"""
+        weekly = expand_recurrence(date(2024, 12, 20), 'weekly', count=3)
+        self.assertEqual(weekly, [date(2024, 12, 20), date(2024, 12, 27), date(2025, 1, 3)])
+
+        every_other_day = expand_recurrence(date(2024, 12, 20), 'daily', interval=2, until=date(2024, 12, 25))
+        self.assertEqual(every_other_day, [date(2024, 12, 20), date(2024, 12, 22), date(2024, 12, 24)])
+
+        with self.assertRaises(ValueError):
+            expand_recurrence(date(2024, 12, 20), 'weekly')
+        with self.assertRaises(ValueError):
+            expand_recurrence(date(2024, 12, 20), 'daily', count=1000)
+        with self.assertRaises(ValueError):
+            expand_recurrence(date(2024, 12, 20), 'weekly', until=date(2024, 12, 19))
+
+    def test_book_series_reports_conflicts(self):
+        """Test a series books free dates in one batch and reports taken ones"""
+        self.book('user-1')
+        dates = expand_recurrence(date(2024, 12, 13), 'weekly', count=3)
+
+        booked, conflicts = book_series('user-2', 'doctor-1', dates, time(9, 0))
+        db.session.commit()
+
+        self.assertEqual([day for day, _ in booked], [date(2024, 12, 13), date(2024, 12, 27)])
+        self.assertEqual(conflicts, [date(2024, 12, 20)])
+        self.assertEqual(Appointment.query.filter_by(user_id='user-2').count(), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
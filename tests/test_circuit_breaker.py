@@ -0,0 +1,69 @@
+import unittest
+from unittest import mock
+from circuit_breaker import CircuitBreaker, CLOSED, OPEN, HALF_OPEN
+
+
+class TestCircuitBreaker(unittest.TestCase):
+
+    def setUp(self):
+        """Create a breaker with a small window and a controllable clock"""
+        self.now = 1000.0
+        patcher = mock.patch('circuit_breaker.time.monotonic', side_effect=lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.breaker = CircuitBreaker(
+            name="test",
+            window_size=4,
+            minimum_calls=4,
+            failure_rate_threshold=0.5,
+            slow_call_threshold=1.0,
+            slow_call_rate_threshold=0.75,
+            cooldown=30
+        )
+
+    def test_opens_on_failure_rate(self):
+        """Test the circuit opens once half the window has failed and then fails fast"""
+        for success in (True, False, True):
+            self.breaker.record(success, 0.1)
+        self.assertEqual(self.breaker.state, CLOSED)
+
+        self.breaker.record(False, 0.1)
+        self.assertEqual(self.breaker.state, OPEN)
+        self.assertFalse(self.breaker.allow_request())
+        self.assertEqual(self.breaker.stats()["rejected"], 1)
+
+    def test_opens_on_slow_calls(self):
+        """Test successful but slow calls also open the circuit"""
+        for _ in range(3):
+            self.breaker.record(True, 5.0)
+        self.breaker.record(True, 0.1)
+        self.assertEqual(self.breaker.state, OPEN)
+
+    def test_single_half_open_probe(self):
+        """Test only one probe is let through after the cooldown"""
+        for _ in range(4):
+            self.breaker.record(False, 0.1)
+
+        self.now += 31
+        self.assertTrue(self.breaker.allow_request())
+        self.assertEqual(self.breaker.state, HALF_OPEN)
+        self.assertFalse(self.breaker.allow_request())
+
+        self.breaker.record(True, 0.1)
+        self.assertEqual(self.breaker.state, CLOSED)
+        self.assertTrue(self.breaker.allow_request())
+
+    def test_failed_probe_reopens(self):
+        """Test a failed probe restarts the cooldown"""
+        for _ in range(4):
+            self.breaker.record(False, 0.1)
+
+        self.now += 31
+        self.assertTrue(self.breaker.allow_request())
+        self.breaker.record(False, 0.1)
+        self.assertEqual(self.breaker.state, OPEN)
+        self.assertEqual(self.breaker.stats()["retry_in"], 30)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,147 @@
+import unittest
+from app import create_app, db
+from models import Doctor
+from sqlalchemy import event
+from doctor_directory import doctor_directory, get_doctor_summaries
+from doctor_search import search_doctors_ranked, similarity, word_similarity
+
+
+class TestDoctorDirectory(unittest.TestCase):
+
+    def setUp(self):
+        """Set up app, database and a few doctors"""
+        self.app = create_app()
+        self.app.config['TESTING'] = True
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+
+        db.session.add_all([
+            Doctor(name='Dr. Priya Sharma', specialty='Cardiology', rating=4.5, experience_years=12),
+            Doctor(name='Dr. Amit Singh', specialty='Neurology', rating=4.6, experience_years=10),
+            Doctor(name='Dr. Meera Iyer', specialty='Pediatric Cardiology', rating=4.9, experience_years=9),
+            Doctor(name='Dr. Retired', specialty='Cardiology', is_active=False)
+        ])
+        db.session.commit()
+
+    def tearDown(self):
+        """Clean up after tests"""
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def test_lists_only_active_doctors(self):
+        """Test inactive doctors are excluded"""
+        names = [doctor['name'] for doctor in doctor_directory.search()]
+        self.assertEqual(len(names), 3)
+        self.assertNotIn('Dr. Retired', names)
+
+    def test_specialty_substring_match(self):
+        """Test specialty filter behaves like ILIKE '%term%'"""
+        doctors = doctor_directory.search(specialty='cardio')
+        self.assertEqual(
+            sorted(doctor['name'] for doctor in doctors),
+            ['Dr. Meera Iyer', 'Dr. Priya Sharma']
+        )
+
+    def test_name_substring_match(self):
+        """Test name filter matches partial tokens and full phrases"""
+        self.assertEqual(len(doctor_directory.search(name_search='shar')), 1)
+        self.assertEqual(len(doctor_directory.search(name_search='amit sin')), 1)
+        self.assertEqual(len(doctor_directory.search(name_search='singh amit')), 0)
+
+    def test_punctuation_name_search(self):
+        """Test a term without letters or digits matches like ILIKE instead of returning everyone"""
+        self.assertEqual(doctor_directory.search(name_search='-'), [])
+        self.assertEqual(len(doctor_directory.search(name_search='.')), 3)
+
+    def test_pages_with_missing_created_at(self):
+        """Test rows without created_at are paged first and every doctor appears once"""
+        for i in range(3):
+            db.session.add(Doctor(name=f'Dr. Legacy {i}', specialty='General'))
+        db.session.commit()
+        Doctor.query.filter(Doctor.name.like('Dr. Legacy%')).update({'created_at': None})
+        db.session.commit()
+        doctor_directory.invalidate()
+
+        names = []
+        cursor = None
+        while True:
+            page, cursor = doctor_directory.search_page(cursor=cursor, limit=2)
+            names.extend(doctor['name'] for doctor in page)
+            if not cursor:
+                break
+
+        self.assertEqual(len(names), 6)
+        self.assertEqual(len(set(names)), 6)
+        self.assertEqual(sorted(names[:3]), ['Dr. Legacy 0', 'Dr. Legacy 1', 'Dr. Legacy 2'])
+
+    def test_combined_filters(self):
+        """Test specialty and name filters intersect"""
+        doctors = doctor_directory.search(specialty='cardiology', name_search='meera')
+        self.assertEqual([doctor['name'] for doctor in doctors], ['Dr. Meera Iyer'])
+
+    def test_write_invalidates_snapshot(self):
+        """Test inserts and updates are visible on the next read"""
+        doctor_directory.search()
+
+        db.session.add(Doctor(name='Dr. New Joiner', specialty='Dermatology'))
+        db.session.commit()
+        self.assertEqual(len(doctor_directory.search(specialty='derma')), 1)
+
+        doctor = Doctor.query.filter_by(name='Dr. Amit Singh').first()
+        doctor.is_active = False
+        db.session.commit()
+        self.assertEqual(doctor_directory.search(specialty='neuro'), [])
+
+    def test_trigram_similarity_matches_pg_trgm(self):
+        """Test similarity() agrees with pg_trgm on known values"""
+        self.assertEqual(similarity('word', 'word'), 1.0)
+        self.assertAlmostEqual(similarity('word', 'two words'), 4 / 11)
+        self.assertEqual(similarity('abc', 'xyz'), 0.0)
+
+    def test_word_similarity_matches_pg_trgm(self):
+        """Test word_similarity() agrees with pg_trgm on known values"""
+        self.assertAlmostEqual(word_similarity('word', 'two words'), 0.8)
+        self.assertAlmostEqual(word_similarity('shar', 'sharma'), 0.8)
+        self.assertAlmostEqual(word_similarity('two words', 'word'), 0.4)
+        self.assertEqual(word_similarity('sharma', 'Dr. Priya Sharma'), 1.0)
+        self.assertEqual(word_similarity('abc', 'xyz'), 0.0)
+
+    def test_ranked_search_tolerates_typos(self):
+        """Test misspelled queries still find the doctor"""
+        doctors = search_doctors_ranked('sharmaa')
+        self.assertEqual(doctors[0]['name'], 'Dr. Priya Sharma')
+        self.assertIn('relevance', doctors[0])
+
+        specialties = {doctor['specialty'] for doctor in search_doctors_ranked('cardiolgy')}
+        self.assertEqual(specialties, {'Cardiology', 'Pediatric Cardiology'})
+
+    def test_ranked_search_orders_by_relevance(self):
+        """Test rating breaks ties between equal text matches and unrelated doctors are dropped"""
+        doctors = search_doctors_ranked('cardiology')
+        self.assertEqual([doctor['name'] for doctor in doctors], ['Dr. Meera Iyer', 'Dr. Priya Sharma'])
+        scores = [doctor['relevance'] for doctor in doctors]
+        self.assertEqual(scores, sorted(scores, reverse=True))
+        self.assertEqual(search_doctors_ranked('orthopedics'), [])
+
+    def test_doctor_summaries_batched_per_request(self):
+        """Test summaries load in one query and are reused within the request"""
+        ids = [doctor.id for doctor in Doctor.query.all()]
+        statements = []
+        listener = lambda *args: statements.append(args[2])
+        event.listen(db.engine, 'before_cursor_execute', listener)
+        try:
+            with self.app.test_request_context():
+                summaries = get_doctor_summaries(ids + ['missing'])
+                get_doctor_summaries(ids)
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', listener)
+
+        self.assertEqual(len(statements), 1)
+        self.assertIsNone(summaries['missing'])
+        self.assertIn({"name": "Dr. Amit Singh", "specialty": "Neurology"}, summaries.values())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+import unittest
+from datetime import date, datetime, time
+from app import create_app, db
+from models import Appointment
+from flask_jwt_extended import create_access_token
+from doctor_schedule import schedule_range, get_doctor_schedule
+
+
+class TestDoctorSchedule(unittest.TestCase):
+
+    def setUp(self):
+        """Set up app, database and a few appointments"""
+        self.app = create_app()
+        self.app.config['TESTING'] = True
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+
+        for day, hour, status in [(20, 10, 'scheduled'), (20, 9, 'completed'), (18, 11, 'cancelled'), (23, 9, 'scheduled')]:
+            db.session.add(Appointment(
+                user_id='user-1',
+                doctor_id='doctor-1',
+                appointment_date=datetime(2024, 12, day),
+                appointment_time=time(hour, 0),
+                status=status
+            ))
+        db.session.commit()
+
+    def tearDown(self):
+        """Clean up after tests"""
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def test_schedule_range(self):
+        """Test week views run Monday to Sunday"""
+        self.assertEqual(schedule_range(date(2024, 12, 20), 'day'), (date(2024, 12, 20), date(2024, 12, 20)))
+        self.assertEqual(schedule_range(date(2024, 12, 20), 'week'), (date(2024, 12, 16), date(2024, 12, 22)))
+        with self.assertRaises(ValueError):
+            schedule_range(date(2024, 12, 20), 'month')
+
+    def test_week_schedule(self):
+        """Test appointments are grouped per day in time order with status counts"""
+        schedule = get_doctor_schedule('doctor-1', date(2024, 12, 16), date(2024, 12, 22))
+
+        self.assertEqual(len(schedule['days']), 7)
+        self.assertEqual(schedule['counts'], {'scheduled': 1, 'completed': 1, 'cancelled': 1})
+
+        friday = schedule['days'][4]
+        self.assertEqual(friday['date'], '2024-12-20')
+        self.assertEqual([item['appointment_time'] for item in friday['appointments']], ['09:00', '10:00'])
+        self.assertEqual(friday['counts'], {'completed': 1, 'scheduled': 1})
+
+    def test_summary_schedule_hides_appointment_details(self):
+        """Test callers without details see only active appointment times and counts"""
+        schedule = get_doctor_schedule('doctor-1', date(2024, 12, 16), date(2024, 12, 22), detailed=False)
+
+        self.assertEqual(schedule['days'][4]['appointments'], [{'appointment_time': '09:00'}, {'appointment_time': '10:00'}])
+        self.assertEqual(schedule['days'][2]['appointments'], [])
+        self.assertEqual(schedule['counts'], {'scheduled': 1, 'completed': 1, 'cancelled': 1})
+
+    def test_patient_schedule_api_omits_ids(self):
+        """Test a patient token gets the summary schedule from the API"""
+        token = create_access_token(identity='user-1')
+        response = self.app.test_client().get(
+            '/api/doctors/doctor-1/schedule?date=2024-12-20',
+            headers={'Authorization': f'Bearer {token}'}
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()['days'][0]['appointments'], [{'appointment_time': '09:00'}, {'appointment_time': '10:00'}])
+
+
+if __name__ == '__main__':
+    unittest.main()
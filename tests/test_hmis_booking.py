@@ -0,0 +1,108 @@
+import unittest
+from unittest import mock
+from datetime import datetime, time
+from app import create_app, db
+from models import Appointment, Notification, OutboxEvent, User
+from outbox import dispatch_batch
+from hmis_client import get_hmis_client
+from hmis_booking import queue_hmis_booking, hmis_idempotency_key
+
+
+def hmis_response(status_code, body=None):
+    response = mock.Mock(status_code=status_code, ok=status_code < 400, text='')
+    response.json.return_value = body or {}
+    return response
+
+
+class TestHMISBooking(unittest.TestCase):
+
+    def setUp(self):
+        """Set up app, database and a pending HMIS appointment"""
+        self.app = create_app()
+        self.app.config['TESTING'] = True
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+
+        user = User(name='Test User', mobile_number='9876543210')
+        db.session.add(user)
+        db.session.flush()
+        appointment = Appointment(
+            user_id=user.id,
+            doctor_id='hmis_7',
+            appointment_date=datetime(2024, 12, 20),
+            appointment_time=time(9, 0),
+            status='pending'
+        )
+        db.session.add(appointment)
+        db.session.flush()
+        self.appointment_id = appointment.id
+        queue_hmis_booking(appointment.id)
+        db.session.commit()
+
+    def tearDown(self):
+        """Clean up after tests"""
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def dispatch(self, response):
+        with mock.patch.object(get_hmis_client(), 'post', return_value=response) as post:
+            dispatch_batch()
+        return post
+
+    def test_confirmation_recorded(self):
+        """Test a successful push stores the HMIS ids and schedules the appointment"""
+        post = self.dispatch(hmis_response(200, {"appointment_id": "H-1", "confirmation_number": "C-42"}))
+
+        headers = post.call_args.kwargs['headers']
+        self.assertEqual(headers['Idempotency-Key'], hmis_idempotency_key(self.appointment_id))
+
+        appointment = db.session.get(Appointment, self.appointment_id)
+        self.assertEqual(appointment.status, 'scheduled')
+        self.assertEqual(appointment.hmis_appointment_id, 'H-1')
+        self.assertEqual(appointment.confirmation_number, 'C-42')
+
+    def test_no_transaction_open_during_hmis_call(self):
+        """Test the HMIS request is made with no database transaction or outbox lock held"""
+        in_transaction = []
+
+        def post(*args, **kwargs):
+            in_transaction.append(db.session().in_transaction())
+            return hmis_response(200, {"appointment_id": "H-1", "confirmation_number": "C-42"})
+
+        with mock.patch.object(get_hmis_client(), 'post', side_effect=post):
+            dispatch_batch(lane='hmis')
+
+        self.assertEqual(in_transaction, [False])
+        self.assertEqual(db.session.get(Appointment, self.appointment_id).status, 'scheduled')
+
+    def test_server_error_is_retried(self):
+        """Test a 5xx keeps the appointment pending and reschedules the push"""
+        self.dispatch(hmis_response(503))
+
+        outbox_event = OutboxEvent.query.filter_by(event_type='hmis_booking').one()
+        self.assertEqual(outbox_event.status, 'pending')
+        self.assertEqual(outbox_event.attempts, 1)
+        self.assertGreater(outbox_event.available_at, datetime.utcnow())
+        self.assertEqual(db.session.get(Appointment, self.appointment_id).status, 'pending')
+
+    def test_rejection_cancels_appointment(self):
+        """Test a 4xx frees the slot and notifies the patient"""
+        self.dispatch(hmis_response(400))
+
+        self.assertEqual(db.session.get(Appointment, self.appointment_id).status, 'cancelled')
+        dispatch_batch()
+        self.assertEqual(Notification.query.filter_by(title='Appointment Not Confirmed').count(), 1)
+
+    def test_gives_up_after_max_attempts(self):
+        """Test the slot is released once HMIS stays down through every retry"""
+        with mock.patch('outbox.OUTBOX_MAX_ATTEMPTS', 1):
+            self.dispatch(hmis_response(503))
+
+        self.assertEqual(OutboxEvent.query.filter_by(event_type='hmis_booking').one().status, 'failed')
+        self.assertEqual(db.session.get(Appointment, self.appointment_id).status, 'cancelled')
+
+
+if __name__ == '__main__':
+    unittest.main()
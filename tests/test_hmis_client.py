@@ -0,0 +1,99 @@
+import time
+import threading
+import unittest
+import requests
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from hmis_client import HMISClient
+
+
+class ScriptedHandler(BaseHTTPRequestHandler):
+    """Answers each request with the next (status, delay) from the server's script"""
+
+    def _respond(self):
+        self.server.requests.append((self.command, self.path))
+        status, delay = self.server.script.pop(0) if self.server.script else (200, 0)
+        if delay:
+            time.sleep(delay)
+        body = b'{}'
+        try:
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        except OSError:
+            pass
+
+    do_GET = _respond
+    do_POST = _respond
+
+    def log_message(self, *args):
+        pass
+
+
+class TestHMISClient(unittest.TestCase):
+
+    def setUp(self):
+        """Start a local HMIS stand-in and a client with fast retries and a short read timeout"""
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), ScriptedHandler)
+        self.server.script = []
+        self.server.requests = []
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+
+        self.client = HMISClient(
+            base_url=f"http://127.0.0.1:{self.server.server_address[1]}",
+            max_retries=2,
+            backoff_factor=0,
+            backoff_jitter=0,
+            read_timeout=0.3
+        )
+
+    def test_gateway_errors_are_retried(self):
+        """Test a GET answered 503 is retried and the later success returned"""
+        self.server.script = [(503, 0), (502, 0), (200, 0)]
+
+        response = self.client.get('/doctors/search')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(self.server.requests), 3)
+
+    def test_retries_are_bounded(self):
+        """Test a GET keeps failing only max_retries extra times and returns the last answer"""
+        self.server.script = [(503, 0)] * 5
+
+        response = self.client.get('/doctors/search')
+
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(len(self.server.requests), 3)
+
+    def test_other_errors_are_not_retried(self):
+        """Test statuses outside the retry list come back after one attempt"""
+        self.server.script = [(500, 0), (200, 0)]
+
+        self.assertEqual(self.client.get('/doctors/search').status_code, 500)
+        self.assertEqual(len(self.server.requests), 1)
+
+    def test_post_is_not_retried(self):
+        """Test non-idempotent requests are sent once even on a gateway error"""
+        self.server.script = [(503, 0), (200, 0)]
+
+        self.assertEqual(self.client.post('/appointments/book', json={}).status_code, 503)
+        self.assertEqual(len(self.server.requests), 1)
+
+    def test_read_timeout_is_not_retried(self):
+        """Test a slow HMIS costs one read timeout, not one per retry"""
+        self.server.script = [(200, 1.0), (200, 1.0), (200, 1.0)]
+
+        started = time.perf_counter()
+        with self.assertRaises(requests.exceptions.ConnectionError):
+            self.client.get('/doctors/search')
+        elapsed = time.perf_counter() - started
+
+        self.assertEqual(len(self.server.requests), 1)
+        self.assertLess(elapsed, 0.9)
+
+
+if __name__ == '__main__':
+    unittest.main()
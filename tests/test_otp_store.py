@@ -0,0 +1,78 @@
+import unittest
+from unittest import mock
+from datetime import datetime, timedelta
+from app import create_app, db
+from models import OTP
+from otp_store import MemoryOTPStore, DatabaseOTPStore
+from auth import request_otp, verify_otp
+
+
+class TestMemoryOTPStore(unittest.TestCase):
+
+    def test_code_is_single_use(self):
+        """Test a code verifies once and only before it expires"""
+        store = MemoryOTPStore()
+        store.issue('9876543210', '123456', 60)
+        self.assertFalse(store.consume('9876543210', '000000'))
+        self.assertTrue(store.consume('9876543210', '123456'))
+        self.assertFalse(store.consume('9876543210', '123456'))
+
+        with mock.patch('otp_store.time.time', return_value=1000.0):
+            store.issue('9876543210', '654321', 60)
+        with mock.patch('otp_store.time.time', return_value=1061.0):
+            self.assertEqual(store.sweep(100), 1)
+            self.assertFalse(store.consume('9876543210', '654321'))
+
+
+class TestDatabaseOTPStore(unittest.TestCase):
+
+    def setUp(self):
+        """Set up app and database"""
+        self.app = create_app()
+        self.app.config['TESTING'] = True
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+        self.store = DatabaseOTPStore()
+
+    def tearDown(self):
+        """Clean up after tests"""
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def test_consume_marks_code_used(self):
+        """Test verification consumes the code in one update"""
+        self.store.issue('9876543210', '123456', 60)
+        db.session.commit()
+
+        self.assertTrue(self.store.consume('9876543210', '123456'))
+        db.session.commit()
+        self.assertFalse(self.store.consume('9876543210', '123456'))
+        self.assertTrue(OTP.query.one().is_used)
+
+    def test_sweep_deletes_expired_in_batches(self):
+        """Test the sweep removes at most one batch of expired codes"""
+        past = datetime.utcnow() - timedelta(minutes=1)
+        for i in range(5):
+            db.session.add(OTP(mobile_number='9876543210', otp_code=f'00000{i}', expires_at=past))
+        self.store.issue('9876543210', '123456', 60)
+        db.session.commit()
+
+        self.assertEqual(self.store.sweep(3), 3)
+        self.assertEqual(self.store.sweep(3), 2)
+        self.assertEqual(self.store.sweep(3), 0)
+        self.assertEqual(OTP.query.count(), 1)
+
+    def test_login_flow(self):
+        """Test request_otp and verify_otp through the configured store"""
+        with mock.patch('auth.generate_otp', return_value='123456'):
+            self.assertTrue(request_otp('9876543210')['success'])
+
+        self.assertFalse(verify_otp('9876543210', '000000')['success'])
+        self.assertTrue(verify_otp('9876543210', '123456')['success'])
+        self.assertFalse(verify_otp('9876543210', '123456')['success'])
+
+
+if __name__ == '__main__':
+    unittest.main()
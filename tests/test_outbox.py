@@ -0,0 +1,127 @@
+import unittest
+from datetime import datetime, timedelta
+from app import create_app, db
+from models import Notification, OutboxEvent
+from outbox import enqueue, dispatch_batch, purge_batch, register_handler, unregister_handler, OUTBOX_LEASE
+from notification_service import queue_notification
+
+
+class TestOutbox(unittest.TestCase):
+
+    def setUp(self):
+        """Set up app and database"""
+        self.app = create_app()
+        self.app.config['TESTING'] = True
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+
+    def tearDown(self):
+        """Clean up after tests"""
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def test_notification_delivered_after_commit(self):
+        """Test queued notifications are created by the dispatcher in one batch"""
+        queue_notification('user-1', 'Title', 'Message', 'appointment', extra_data={"k": "v"})
+        queue_notification('user-1', 'Second', 'Message', 'appointment')
+        db.session.commit()
+        self.assertEqual(Notification.query.count(), 0)
+
+        self.assertEqual(dispatch_batch(), 2)
+        self.assertEqual(Notification.query.count(), 2)
+        self.assertEqual(OutboxEvent.query.filter_by(status='dispatched').count(), 2)
+        self.assertEqual(dispatch_batch(), 0)
+
+    def test_rolled_back_events_are_discarded(self):
+        """Test nothing is delivered when the main transaction rolls back"""
+        queue_notification('user-1', 'Title', 'Message', 'appointment')
+        db.session.rollback()
+        self.assertEqual(dispatch_batch(), 0)
+
+    def test_failed_event_is_rescheduled(self):
+        """Test a failing handler only reschedules its own event"""
+        @register_handler('test_failure')
+        def fail(payload):
+            raise RuntimeError("boom")
+        self.addCleanup(unregister_handler, 'test_failure')
+
+        enqueue('test_failure', {})
+        queue_notification('user-1', 'Title', 'Message', 'appointment')
+        db.session.commit()
+
+        dispatch_batch()
+        failed = OutboxEvent.query.filter_by(event_type='test_failure').one()
+        self.assertEqual(failed.status, 'pending')
+        self.assertEqual(failed.attempts, 1)
+        self.assertEqual(failed.last_error, 'boom')
+        self.assertGreater(failed.available_at, datetime.utcnow())
+        self.assertEqual(Notification.query.count(), 1)
+
+    def test_handler_runs_after_claim_commits(self):
+        """Test events are leased and committed before their handler runs"""
+        seen = {}
+
+        @register_handler('test_slow', lane='slow')
+        def slow(payload):
+            seen['available_at'] = db.session.get(OutboxEvent, payload['id']).available_at
+            seen['reclaimed'] = dispatch_batch()
+        self.addCleanup(unregister_handler, 'test_slow')
+
+        outbox_event = enqueue('test_slow', {})
+        db.session.flush()
+        outbox_event.payload = {'id': outbox_event.id}
+        db.session.commit()
+
+        self.assertEqual(dispatch_batch(), 1)
+        self.assertGreater(seen['available_at'], datetime.utcnow() + timedelta(seconds=OUTBOX_LEASE - 60))
+        self.assertEqual(seen['reclaimed'], 0)
+        self.assertEqual(OutboxEvent.query.one().status, 'dispatched')
+
+    def test_lanes_dispatch_separately(self):
+        """Test event types in their own lane are left out of the default lane"""
+        register_handler('test_slow', lane='slow')(lambda payload: None)
+        self.addCleanup(unregister_handler, 'test_slow')
+        enqueue('test_slow', {})
+        queue_notification('user-1', 'Title', 'Message', 'appointment')
+        db.session.commit()
+
+        self.assertEqual(dispatch_batch(lane='default'), 1)
+        self.assertEqual(Notification.query.count(), 1)
+        self.assertEqual(dispatch_batch(lane='default'), 0)
+        self.assertEqual(dispatch_batch(lane='slow'), 1)
+
+    def test_lost_lease_is_not_recorded(self):
+        """Test an event taken over by another dispatcher keeps that dispatcher's state"""
+        @register_handler('test_takeover')
+        def take_over(payload):
+            # Another dispatcher re-claimed the event after the lease ran out
+            db.session.query(OutboxEvent).update({'available_at': datetime(2030, 1, 1)})
+            db.session.commit()
+        self.addCleanup(unregister_handler, 'test_takeover')
+
+        enqueue('test_takeover', {})
+        db.session.commit()
+
+        dispatch_batch()
+        outbox_event = OutboxEvent.query.one()
+        self.assertEqual(outbox_event.status, 'pending')
+        self.assertEqual(outbox_event.available_at, datetime(2030, 1, 1))
+
+    def test_purge_removes_only_old_finished_events(self):
+        """Test finished events past retention are purged in batches and pending ones kept"""
+        old = datetime.utcnow() - timedelta(days=30)
+        for status in ('dispatched', 'dispatched', 'failed', 'pending'):
+            db.session.add(OutboxEvent(event_type='notification', payload={}, status=status, created_at=old))
+        db.session.add(OutboxEvent(event_type='notification', payload={}, status='dispatched'))
+        db.session.commit()
+
+        self.assertEqual(purge_batch(retention_days=7, batch_size=2), 2)
+        self.assertEqual(purge_batch(retention_days=7, batch_size=2), 1)
+        self.assertEqual(purge_batch(retention_days=7, batch_size=2), 0)
+        self.assertEqual(sorted(e.status for e in OutboxEvent.query), ['dispatched', 'pending'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,108 @@
+import unittest
+from datetime import datetime, time
+from app import create_app, db
+from models import Appointment, Symptom
+from pagination import InvalidCursor, encode_cursor, decode_cursor, paginate_sorted, paginate_query
+
+
+class TestPagination(unittest.TestCase):
+
+    def test_cursor_round_trip(self):
+        """Test cursors decode back to the typed sort key"""
+        key = (datetime(2024, 12, 20, 9, 30), 'abc-123')
+        token = encode_cursor(key)
+        self.assertNotIn('=', token)
+        self.assertEqual(decode_cursor(token, [datetime, str]), key)
+
+    def test_invalid_cursor(self):
+        """Test malformed or mismatched cursors are rejected"""
+        with self.assertRaises(InvalidCursor):
+            decode_cursor('not-a-cursor', [datetime, str])
+        with self.assertRaises(InvalidCursor):
+            decode_cursor(encode_cursor(['only-one']), [datetime, str])
+
+    def test_paginate_sorted_walks_every_item_once(self):
+        """Test in-memory keyset pages cover the list without gaps or repeats"""
+        created = datetime(2024, 1, 1)
+        keys = [(created, f'id-{i:02d}') for i in range(7)]
+        items = [key[1] for key in keys]
+
+        seen = []
+        cursor = None
+        while True:
+            page, cursor = paginate_sorted(items, keys, cursor, limit=3)
+            seen.extend(page)
+            if not cursor:
+                break
+
+        self.assertEqual(seen, items)
+
+    def test_paginate_sorted_exact_multiple(self):
+        """Test no empty trailing page when the list size is a multiple of the limit"""
+        keys = [(datetime(2024, 1, 1), f'id-{i}') for i in range(4)]
+        page, cursor = paginate_sorted(keys, keys, None, limit=2)
+        page, cursor = paginate_sorted(keys, keys, cursor, limit=2)
+        self.assertEqual(len(page), 2)
+        self.assertIsNone(cursor)
+
+
+class TestPaginateQuery(unittest.TestCase):
+
+    def setUp(self):
+        """Set up app and database"""
+        self.app = create_app()
+        self.app.config['TESTING'] = True
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+
+    def tearDown(self):
+        """Clean up after tests"""
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def walk(self, query, columns, limit, descending=False):
+        pages = []
+        cursor = None
+        while True:
+            page, cursor = paginate_query(query, columns, cursor, limit, descending)
+            pages.append([row.id for row in page])
+            if not cursor:
+                return pages
+
+    def test_descending_appointments_across_pages(self):
+        """Test a newest-first listing with repeated dates visits every row once in key order"""
+        for i in range(8):
+            db.session.add(Appointment(
+                user_id='user-1',
+                doctor_id=f'doctor-{i}',
+                appointment_date=datetime(2024, 12, 20 + i // 3),
+                appointment_time=time(9, 0)
+            ))
+        db.session.commit()
+
+        query = Appointment.query.filter_by(user_id='user-1')
+        pages = self.walk(query, [Appointment.appointment_date, Appointment.id], limit=3, descending=True)
+
+        expected = [a.id for a in sorted(query.all(), key=lambda a: (a.appointment_date, a.id), reverse=True)]
+        self.assertEqual([len(page) for page in pages], [3, 3, 2])
+        self.assertEqual([row_id for page in pages for row_id in page], expected)
+
+    def test_ascending_symptoms_across_pages(self):
+        """Test an oldest-first listing where every row shares its timestamp pages without gaps or repeats"""
+        created = datetime(2024, 1, 1)
+        db.session.add_all([Symptom(name=f'Symptom {i}', created_at=created) for i in range(7)])
+        db.session.add(Symptom(name='Later', created_at=datetime(2024, 1, 2)))
+        db.session.commit()
+
+        pages = self.walk(Symptom.query, [Symptom.created_at, Symptom.id], limit=2)
+
+        expected = [s.id for s in sorted(Symptom.query.all(), key=lambda s: (s.created_at, s.id))]
+        self.assertEqual([len(page) for page in pages], [2, 2, 2, 2])
+        self.assertEqual([row_id for page in pages for row_id in page], expected)
+        self.assertEqual(db.session.get(Symptom, pages[-1][-1]).name, 'Later')
+
+
+if __name__ == '__main__':
+    unittest.main()
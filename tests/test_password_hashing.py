@@ -0,0 +1,64 @@
+import unittest
+import threading
+from unittest import mock
+from app import create_app, db
+from models import User
+import password_hashing
+from password_hashing import PasswordHashingOverloaded, hash_password, verify_password
+
+
+class TestPasswordHashing(unittest.TestCase):
+
+    def test_hash_and_verify_in_pool(self):
+        """Test hashes made in the process pool verify"""
+        password_hash = hash_password('secret')
+        self.assertTrue(verify_password(password_hash, 'secret'))
+        self.assertFalse(verify_password(password_hash, 'wrong'))
+        self.assertFalse(verify_password(None, 'secret'))
+
+    def test_full_queue_sheds_load(self):
+        """Test a call is rejected instead of queued once the pending limit is reached"""
+        password_hashing._get_pool()
+        with mock.patch.object(password_hashing, '_pending', threading.BoundedSemaphore(1)) as pending:
+            pending.acquire()
+            with self.assertRaises(PasswordHashingOverloaded):
+                hash_password('secret')
+
+
+class TestLoginShedding(unittest.TestCase):
+
+    def setUp(self):
+        """Set up app, database and a user with a password"""
+        self.app = create_app()
+        self.app.config['TESTING'] = True
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+        self.client = self.app.test_client()
+
+        user = User(name='Test User', mobile_number='9876543210', email='test@example.com')
+        user.set_password('secret')
+        db.session.add(user)
+        db.session.commit()
+
+    def tearDown(self):
+        """Clean up after tests"""
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def test_login(self):
+        """Test email login verifies through the pool"""
+        response = self.client.post('/api/auth/login-email', json={'email': 'test@example.com', 'password': 'secret'})
+        self.assertEqual(response.status_code, 200)
+
+    def test_overloaded_login_returns_503(self):
+        """Test a full hashing queue answers 503 with Retry-After"""
+        with mock.patch('password_hashing._run', side_effect=PasswordHashingOverloaded(retry_after=2)):
+            response = self.client.post('/api/auth/login-email', json={'email': 'test@example.com', 'password': 'secret'})
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.headers['Retry-After'], '2')
+
+
+if __name__ == '__main__':
+    unittest.main()
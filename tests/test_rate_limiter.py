@@ -0,0 +1,79 @@
+import unittest
+from unittest import mock
+from app import create_app, db
+from rate_limiter import MemoryRateLimitStore, parse_rate, auth_rate_limit
+
+
+class TestMemoryRateLimitStore(unittest.TestCase):
+
+    def test_parse_rate(self):
+        """Test rates parse into burst size and refill per second"""
+        self.assertEqual(parse_rate('5/minute'), (5, 5 / 60))
+        self.assertEqual(parse_rate('200/second'), (200, 200))
+
+    def test_bucket_refills(self):
+        """Test a drained bucket rejects until a token has refilled"""
+        store = MemoryRateLimitStore()
+        limits = [('k', 2, 1.0)]
+        with mock.patch('rate_limiter.time.monotonic', return_value=100.0):
+            self.assertEqual(store.acquire(limits), 0)
+            self.assertEqual(store.acquire(limits), 0)
+            self.assertAlmostEqual(store.acquire(limits), 1.0)
+        with mock.patch('rate_limiter.time.monotonic', return_value=101.0):
+            self.assertEqual(store.acquire(limits), 0)
+
+    def test_all_or_nothing(self):
+        """Test a rejected request takes no token from the buckets that had room"""
+        store = MemoryRateLimitStore()
+        with mock.patch('rate_limiter.time.monotonic', return_value=100.0):
+            store.acquire([('narrow', 1, 1.0)])
+            self.assertGreater(store.acquire([('wide', 1, 1.0), ('narrow', 1, 1.0)]), 0)
+            self.assertEqual(store.acquire([('wide', 1, 1.0)]), 0)
+
+
+class TestAuthRateLimit(unittest.TestCase):
+
+    def setUp(self):
+        """Set up app and database"""
+        self.app = create_app()
+        self.app.config['TESTING'] = True
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        """Clean up after tests"""
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def test_otp_requests_limited_per_mobile(self):
+        """Test the sixth OTP request for one mobile within a minute gets 429 without touching the database"""
+        for _ in range(5):
+            response = self.client.post('/api/auth/request-otp', json={'mobile_number': '9876543210'})
+            self.assertEqual(response.status_code, 200)
+
+        with mock.patch('auth.issue_otp') as issue_otp:
+            response = self.client.post('/api/auth/request-otp', json={'mobile_number': '9876543210'})
+            issue_otp.assert_not_called()
+        self.assertEqual(response.status_code, 429)
+        self.assertIn('Retry-After', response.headers)
+
+        response = self.client.post('/api/auth/request-otp', json={'mobile_number': '9876500000'})
+        self.assertEqual(response.status_code, 200)
+
+    def test_non_object_body_limited_by_ip(self):
+        """Test JSON bodies that are not objects are counted against the IP bucket instead of erroring"""
+        with mock.patch('rate_limiter.AUTH_RATELIMIT_IP', '3/minute'):
+            @self.app.route('/limited', methods=['POST'])
+            @auth_rate_limit('mobile_number')
+            def limited():
+                return 'ok'
+
+        statuses = [self.client.post('/limited', json=body).status_code for body in (['9876543210'], 42, 'x', [])]
+        self.assertEqual(statuses, [200, 200, 200, 429])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,106 @@
+import unittest
+from unittest import mock
+from datetime import date, time
+from app import create_app, db
+from models import Doctor
+from availability import get_availability
+from slot_holds import MemorySlotHoldStore, hold_slot, get_hold, release_hold, hold_matches, get_slot_holders
+
+
+class TestMemorySlotHoldStore(unittest.TestCase):
+
+    def setUp(self):
+        self.store = MemorySlotHoldStore()
+        self.slot = ('doctor-1', '2024-12-20', '09:00')
+
+    def test_acquire_conflict_and_release(self):
+        """Test only one user can hold a slot until it is released"""
+        hold = self.store.acquire(self.slot, 'user-1', 60)
+        self.assertIsNotNone(hold)
+        self.assertIsNone(self.store.acquire(self.slot, 'user-2', 60))
+        self.assertEqual(self.store.holders([self.slot]), {self.slot: 'user-1'})
+
+        self.assertTrue(self.store.release(hold['hold_id']))
+        self.assertFalse(self.store.release(hold['hold_id']))
+        self.assertIsNotNone(self.store.acquire(self.slot, 'user-2', 60))
+
+    def test_expired_hold_frees_slot(self):
+        """Test a hold lapses after its ttl"""
+        with mock.patch('slot_holds.time.time', return_value=1000.0):
+            hold = self.store.acquire(self.slot, 'user-1', 60)
+        with mock.patch('slot_holds.time.time', return_value=1061.0):
+            self.assertIsNone(self.store.get(hold['hold_id']))
+            self.assertEqual(self.store.holders([self.slot]), {})
+            self.assertIsNotNone(self.store.acquire(self.slot, 'user-2', 60))
+
+    def test_user_hold_limit_releases_oldest(self):
+        """Test a hold beyond the per-user limit frees that user's hold closest to lapsing"""
+        slots = [('doctor-1', '2024-12-20', f'{hour:02d}:00') for hour in (9, 10, 11)]
+        first = self.store.acquire(slots[0], 'user-1', 60, max_per_user=2)
+        second = self.store.acquire(slots[1], 'user-1', 120, max_per_user=2)
+        self.store.acquire(('doctor-1', '2024-12-20', '12:00'), 'user-2', 60, max_per_user=2)
+
+        third = self.store.acquire(slots[2], 'user-1', 60, max_per_user=2)
+
+        self.assertIsNotNone(third)
+        self.assertIsNone(self.store.get(first['hold_id']))
+        self.assertIsNotNone(self.store.get(second['hold_id']))
+        self.assertEqual(self.store.holders(slots), {slots[1]: 'user-1', slots[2]: 'user-1'})
+        self.assertIsNotNone(self.store.acquire(slots[0], 'user-2', 60, max_per_user=2))
+
+    def test_expired_holds_do_not_count_toward_limit(self):
+        """Test lapsed holds leave a user's live holds alone"""
+        with mock.patch('slot_holds.time.time', return_value=1000.0):
+            self.store.acquire(self.slot, 'user-1', 10, max_per_user=1)
+        with mock.patch('slot_holds.time.time', return_value=1020.0):
+            live = self.store.acquire(('doctor-1', '2024-12-20', '10:00'), 'user-1', 60, max_per_user=1)
+            self.assertIsNotNone(self.store.get(live['hold_id']))
+            self.assertEqual(len(self.store._by_user['user-1']), 1)
+
+
+class TestSlotHolds(unittest.TestCase):
+
+    def setUp(self):
+        """Set up app, database and a doctor with Friday slots"""
+        self.app = create_app()
+        self.app.config['TESTING'] = True
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+
+        doctor = Doctor(name='Dr. Test', specialty='Cardiology',
+                        availability={'friday': ['09:00', '10:00', '11:00']})
+        db.session.add(doctor)
+        db.session.commit()
+        self.doctor_id = doctor.id
+
+    def tearDown(self):
+        """Clean up after tests"""
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def test_hold_matches_slot(self):
+        """Test a hold is tied to its exact doctor, date and time"""
+        hold = hold_slot(self.doctor_id, date(2024, 12, 20), time(9, 0), 'user-1')
+        self.assertTrue(hold_matches(get_hold(hold['hold_id']), self.doctor_id, date(2024, 12, 20), time(9, 0)))
+        self.assertFalse(hold_matches(hold, self.doctor_id, date(2024, 12, 20), time(10, 0)))
+
+        slot = (self.doctor_id, date(2024, 12, 20), '09:00')
+        self.assertEqual(get_slot_holders([slot]), {slot: 'user-1'})
+        release_hold(hold['hold_id'])
+        self.assertEqual(get_slot_holders([slot]), {})
+
+    def test_held_slot_hidden_from_other_users(self):
+        """Test availability hides a held slot from everyone but its holder"""
+        hold_slot(self.doctor_id, date(2024, 12, 20), time(9, 0), 'user-1')
+
+        day = date(2024, 12, 20)
+        other = get_availability(self.doctor_id, day, day, viewer_id='user-2')
+        holder = get_availability(self.doctor_id, day, day, viewer_id='user-1')
+        self.assertEqual(other['days'][0]['available_slots'], ['10:00', '11:00'])
+        self.assertEqual(holder['days'][0]['available_slots'], ['09:00', '10:00', '11:00'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,84 @@
+import unittest
+import uuid
+from unittest import mock
+from datetime import datetime
+from app import create_app, db
+from models import RevokedToken, User
+from flask_jwt_extended import create_access_token
+from token_revocation import BloomFilter, get_revocation_list
+
+
+class TestBloomFilter(unittest.TestCase):
+
+    def test_no_false_negatives(self):
+        """Test every added item is reported and few others are"""
+        bloom = BloomFilter(1000, 0.01)
+        items = [str(uuid.uuid4()) for _ in range(1000)]
+        for item in items:
+            bloom.add(item)
+        count = bloom.count
+        bloom.add(items[0])
+
+        self.assertTrue(all(item in bloom for item in items))
+        self.assertEqual(bloom.count, count)
+        false_positives = sum(str(uuid.uuid4()) in bloom for _ in range(10000))
+        self.assertLess(false_positives, 300)
+
+
+class TestTokenRevocation(unittest.TestCase):
+
+    def setUp(self):
+        """Set up app, database and a logged in user"""
+        self.app = create_app()
+        self.app.config['TESTING'] = True
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+        self.client = self.app.test_client()
+
+        user = User(name='Test User', mobile_number='9876543210')
+        db.session.add(user)
+        db.session.commit()
+        self.user_id = user.id
+        self.headers = {'Authorization': f'Bearer {create_access_token(identity=user.id)}'}
+
+    def tearDown(self):
+        """Clean up after tests"""
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def test_logout_revokes_token(self):
+        """Test a token stops working once logged out, while other tokens keep working"""
+        self.assertEqual(self.client.get('/api/profile', headers=self.headers).status_code, 200)
+        self.assertEqual(self.client.post('/api/auth/logout', headers=self.headers).status_code, 200)
+        self.assertEqual(self.client.get('/api/profile', headers=self.headers).status_code, 401)
+
+        other = {'Authorization': f'Bearer {create_access_token(identity=self.user_id)}'}
+        self.assertEqual(self.client.get('/api/profile', headers=other).status_code, 200)
+
+    def test_refresh_picks_up_revocations_from_other_workers(self):
+        """Test rows written elsewhere are seen on the next refresh without a rebuild"""
+        revocations = get_revocation_list()
+        self.assertFalse(revocations.is_revoked('jti-1'))
+
+        db.session.add(RevokedToken(jti='jti-1', user_id=self.user_id, revoked_at=datetime.utcnow()))
+        db.session.commit()
+        with mock.patch('token_revocation.TOKEN_REVOCATION_REFRESH_INTERVAL', 0):
+            self.assertTrue(revocations.is_revoked('jti-1'))
+
+        stats = revocations.stats()
+        self.assertEqual(stats['rebuilds'], 1)
+        self.assertGreaterEqual(stats['refreshes'], 1)
+
+    def test_unrevoked_check_needs_no_query(self):
+        """Test a token missing from the filter is accepted without touching the table"""
+        revocations = get_revocation_list()
+        revocations.refresh()
+        with mock.patch.object(db.session, 'get') as get:
+            self.assertFalse(revocations.is_revoked(str(uuid.uuid4())))
+            get.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+import time
+import threading
+import unittest
+from ttl_cache import TTLCache
+
+
+class TestTTLCache(unittest.TestCase):
+
+    def test_hit_and_miss_counters(self):
+        """Test loads happen once per key while fresh"""
+        cache = TTLCache(maxsize=10, ttl=60)
+        calls = []
+
+        def loader():
+            calls.append(1)
+            return ['doctor']
+
+        self.assertEqual(cache.get_or_load('cardiology', loader), ['doctor'])
+        self.assertEqual(cache.get_or_load('cardiology', loader), ['doctor'])
+
+        stats = cache.stats()
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(stats['misses'], 1)
+        self.assertEqual(stats['hits'], 1)
+
+    def test_lru_eviction(self):
+        """Test the least recently used entry is evicted when full"""
+        cache = TTLCache(maxsize=2, ttl=60)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+
+        self.assertEqual(cache.get('a'), 1)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.stats()['evictions'], 1)
+
+    def test_failed_load_is_not_cached(self):
+        """Test exceptions propagate and leave no entry behind"""
+        cache = TTLCache(maxsize=10, ttl=60)
+
+        def failing_loader():
+            raise RuntimeError('HMIS down')
+
+        with self.assertRaises(RuntimeError):
+            cache.get_or_load('key', failing_loader)
+        self.assertEqual(cache.stats()['size'], 0)
+
+    def test_stale_while_revalidate(self):
+        """Test stale entries are served while exactly one refresh runs"""
+        cache = TTLCache(maxsize=10, ttl=0.05, stale_ttl=60)
+        cache.set('key', 'old')
+        time.sleep(0.06)
+
+        release = threading.Event()
+        calls = []
+
+        def slow_loader():
+            calls.append(1)
+            release.wait(1)
+            return 'new'
+
+        self.assertEqual(cache.get_or_load('key', slow_loader), 'old')
+        self.assertEqual(cache.get_or_load('key', slow_loader), 'old')
+        release.set()
+
+        deadline = time.time() + 1
+        while cache.stats()['refreshes'] == 0 and time.time() < deadline:
+            time.sleep(0.01)
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(cache.get('key'), 'new')
+        self.assertEqual(cache.stats()['stale_hits'], 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,157 @@
+import io
+import os
+import json
+import hashlib
+import tempfile
+import unittest
+from unittest import mock
+from app import create_app, db
+from models import Blob, Document, Prescription, SymptomAssessment
+from utils import shard_path, store_uploaded_file
+from blob_store import blob_folder
+from upload_layout import UploadLayoutMigration, sharded_target
+
+
+class FakeUpload:
+
+    def __init__(self, data):
+        self.stream = io.BytesIO(data)
+
+
+class TestShardedLayout(unittest.TestCase):
+
+    def test_shard_path_uses_hash_prefix(self):
+        """Test files fan out under two levels named by the hash of their name"""
+        digest = hashlib.sha256(b'scan.pdf').hexdigest()
+        self.assertEqual(shard_path('uploads', 'scan.pdf'), os.path.join('uploads', digest[:2], digest[2:4], 'scan.pdf'))
+        self.assertEqual(shard_path('blobs', 'abcdef', key='abcdef'), os.path.join('blobs', 'ab', 'cd', 'abcdef'))
+
+    def test_uploads_are_written_into_shards(self):
+        """Test new uploads never land in the top-level uploads directory"""
+        folder = tempfile.mkdtemp()
+        with mock.patch.dict(os.environ, {'UPLOAD_FOLDER': folder}):
+            stored = store_uploaded_file(FakeUpload(b'audio'), 'note.m4a')
+
+        self.assertEqual(stored.path, shard_path(folder, 'note.m4a'))
+        self.assertEqual(os.listdir(folder), [os.path.relpath(stored.path, folder).split(os.sep)[0]])
+
+
+class TestUploadLayoutMigration(unittest.TestCase):
+
+    def setUp(self):
+        """Set up app, database and a flat upload folder with rows pointing into it"""
+        self.folder = tempfile.mkdtemp()
+        self.env = mock.patch.dict(os.environ, {'UPLOAD_FOLDER': self.folder})
+        self.env.start()
+        self.app = create_app()
+        self.app.config['TESTING'] = True
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+
+        os.makedirs(blob_folder())
+        self.blob_sha = hashlib.sha256(b'shared report').hexdigest()
+        blob_file = self.write(os.path.join(blob_folder(), self.blob_sha), b'shared report')
+        db.session.add(Blob(sha256=self.blob_sha, file_path=blob_file, size=13, ref_count=2))
+
+        for i in range(3):
+            path = self.write(os.path.join(self.folder, f'hmis_{i}.pdf'), b'legacy %d' % i)
+            db.session.add(Document(user_id='u1', document_type='lab', title=f'Legacy {i}',
+                                    file_path=path, file_type='pdf'))
+        for i in range(2):
+            db.session.add(Document(user_id='u1', document_type='lab', title=f'Shared {i}',
+                                    file_path=blob_file, file_type='pdf'))
+        db.session.add(Prescription(user_id='u1', medicines=[],
+                                    prescription_image_path=self.write(os.path.join(self.folder, 'rx.jpg'), b'rx')))
+        db.session.add(SymptomAssessment(user_id='u1', symptoms=[],
+                                         audio_recording_path=self.write(os.path.join(self.folder, 'cough.m4a'), b'cough')))
+        db.session.commit()
+
+    def tearDown(self):
+        """Clean up after tests"""
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+        self.env.stop()
+
+    def write(self, path, data):
+        with open(path, 'wb') as f:
+            f.write(data)
+        return path
+
+    def all_paths(self):
+        return (
+            [path for (path,) in db.session.query(Blob.file_path)] +
+            [path for (path,) in db.session.query(Document.file_path)] +
+            [path for (path,) in db.session.query(Prescription.prescription_image_path)] +
+            [path for (path,) in db.session.query(SymptomAssessment.audio_recording_path)]
+        )
+
+    def test_migration_moves_files_and_rows(self):
+        """Test every row ends up on a sharded path with its content intact and flat files removed"""
+        migration = UploadLayoutMigration()
+        self.assertTrue(migration.run(batch_size=2, sleep=0))
+
+        db.session.expire_all()
+        for path in self.all_paths():
+            self.assertIsNone(sharded_target(path))
+            self.assertTrue(os.path.exists(path))
+        shared = {path for (path,) in db.session.query(Document.file_path).filter(Document.title.like('Shared%'))}
+        self.assertEqual(shared, {db.session.get(Blob, self.blob_sha).file_path})
+        with open(shared.pop(), 'rb') as f:
+            self.assertEqual(f.read(), b'shared report')
+
+        top_level = [name for name in os.listdir(self.folder) if os.path.isfile(os.path.join(self.folder, name))]
+        self.assertEqual(top_level, ['.layout-migration.json'])
+        self.assertEqual(migration.state['removed'], 6)
+
+    def test_migration_resumes_from_checkpoint(self):
+        """Test a stopped run picks up where it left off and flat files survive until the end"""
+        self.assertFalse(UploadLayoutMigration().run(batch_size=2, sleep=0, max_batches=2))
+
+        with open(os.path.join(self.folder, '.layout-migration.json')) as f:
+            state = json.load(f)
+        self.assertEqual(state['table'], 'documents')
+        self.assertIsNotNone(state['after'])
+        self.assertTrue(os.path.exists(os.path.join(self.folder, 'rx.jpg')))
+
+        self.assertTrue(UploadLayoutMigration().run(batch_size=2, sleep=0))
+        db.session.expire_all()
+        self.assertTrue(all(sharded_target(path) is None for path in self.all_paths()))
+
+    def test_rows_written_during_migration_are_caught(self):
+        """Test a flat path written after its table was scanned triggers another pass before cleanup"""
+        migration = UploadLayoutMigration()
+        migration.run(batch_size=100, sleep=0, max_batches=2)
+        late = self.write(os.path.join(self.folder, 'late.pdf'), b'late')
+        db.session.add(Document(user_id='u1', document_type='lab', title='Late', file_path=late, file_type='pdf'))
+        db.session.commit()
+
+        self.assertTrue(migration.run(batch_size=100, sleep=0))
+
+        # Pass 2 picks up the late row; pass 3 finds nothing left to rewrite
+        self.assertEqual(migration.state['pass'], 3)
+        document = Document.query.filter_by(title='Late').one()
+        self.assertEqual(document.file_path, shard_path(self.folder, 'late.pdf'))
+        self.assertFalse(os.path.exists(late))
+
+    def test_missing_files_are_left_alone(self):
+        """Test a row whose file is gone keeps its path and does not block completion"""
+        os.unlink(os.path.join(self.folder, 'rx.jpg'))
+
+        migration = UploadLayoutMigration()
+        self.assertTrue(migration.run(batch_size=100, sleep=0))
+
+        self.assertEqual(migration.state['missing'], 1)
+        self.assertEqual(Prescription.query.one().prescription_image_path, os.path.join(self.folder, 'rx.jpg'))
+
+    def test_cli_command(self):
+        """Test the flask migrate-uploads command runs the migration"""
+        result = self.app.test_cli_runner().invoke(args=['migrate-uploads', '--batch-size', '10', '--sleep', '0'])
+
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertIn('Migration complete', result.output)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,88 @@
+import io
+import os
+import hashlib
+import tempfile
+import unittest
+from unittest import mock
+from app import create_app, db
+from models import Document, User
+from flask_jwt_extended import create_access_token
+from utils import stream_to_file
+
+
+class FailingStream(io.BytesIO):
+
+    def read(self, size=-1):
+        chunk = super().read(size)
+        if self.tell() > 10:
+            raise IOError("connection reset")
+        return chunk
+
+
+class TestStreamToFile(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def test_size_and_hash_in_one_pass(self):
+        """Test a chunked copy writes the data and reports its size and SHA-256"""
+        data = os.urandom(35)
+        path = os.path.join(self.directory, 'doc.pdf')
+
+        stored = stream_to_file(io.BytesIO(data), path, chunk_size=10)
+
+        self.assertEqual(stored.size, 35)
+        self.assertEqual(stored.sha256, hashlib.sha256(data).hexdigest())
+        with open(path, 'rb') as f:
+            self.assertEqual(f.read(), data)
+        self.assertEqual(os.listdir(self.directory), ['doc.pdf'])
+
+    def test_failed_upload_leaves_nothing(self):
+        """Test an interrupted stream removes its temp file and never creates the target"""
+        path = os.path.join(self.directory, 'doc.pdf')
+        with self.assertRaises(IOError):
+            stream_to_file(FailingStream(os.urandom(35)), path, chunk_size=10)
+        self.assertEqual(os.listdir(self.directory), [])
+
+
+class TestDocumentUpload(unittest.TestCase):
+
+    def setUp(self):
+        """Set up app, database and a user"""
+        self.app = create_app()
+        self.app.config['TESTING'] = True
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+        self.client = self.app.test_client()
+
+        user = User(name='Test User', mobile_number='9876543210')
+        db.session.add(user)
+        db.session.commit()
+        self.headers = {'Authorization': f'Bearer {create_access_token(identity=user.id)}'}
+
+    def tearDown(self):
+        """Clean up after tests"""
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def test_upload_records_size(self):
+        """Test the stored document size matches the upload"""
+        data = os.urandom(3000)
+        with mock.patch.dict(os.environ, {'UPLOAD_FOLDER': tempfile.mkdtemp()}):
+            response = self.client.post(
+                '/api/documents',
+                headers=self.headers,
+                data={'file': (io.BytesIO(data), 'report.pdf'), 'document_type': 'test_result'},
+                content_type='multipart/form-data'
+            )
+
+        self.assertEqual(response.status_code, 200)
+        body = response.get_json()
+        self.assertEqual(body['sha256'], hashlib.sha256(data).hexdigest())
+        self.assertEqual(db.session.get(Document, body['document_id']).file_size, 3000)
+
+
+if __name__ == '__main__':
+    unittest.main()
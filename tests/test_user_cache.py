@@ -0,0 +1,58 @@
+import unittest
+from unittest import mock
+from app import create_app, db
+from models import User
+import auth
+from auth import load_user
+
+
+class TestUserCache(unittest.TestCase):
+
+    def setUp(self):
+        """Set up app, database and a user"""
+        self.app = create_app()
+        self.app.config['TESTING'] = True
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+        auth._user_cache.clear()
+
+        user = User(name='Test User', mobile_number='9876543210')
+        user.set_password('secret')
+        db.session.add(user)
+        db.session.commit()
+        self.user_id = user.id
+        db.session.remove()
+
+    def tearDown(self):
+        """Clean up after tests"""
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def test_cached_user_needs_no_query(self):
+        """Test a cache hit rebuilds the user without touching the database"""
+        load_user(self.user_id)
+        db.session.remove()
+
+        with mock.patch.object(User, 'query') as query:
+            user = load_user(self.user_id)
+            self.assertEqual(user.name, 'Test User')
+            query.get.assert_not_called()
+        self.assertIs(db.session.get(User, self.user_id), user)
+        self.assertNotIn('password_hash', auth._user_cache.get(self.user_id))
+        self.assertTrue(user.check_password('secret'))
+
+    def test_write_invalidates_cache(self):
+        """Test updating a cached user drops the entry on commit"""
+        user = load_user(self.user_id)
+        user.name = 'Renamed'
+        db.session.commit()
+        self.assertIsNone(auth._user_cache.get(self.user_id))
+
+        db.session.remove()
+        self.assertEqual(load_user(self.user_id).name, 'Renamed')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,191 @@
+import os
+import math
+import time
+import hashlib
+import logging
+import threading
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import select
+from app import db
+from models import RevokedToken
+
+logger = logging.getLogger(__name__)
+
+# In-memory Bloom filter over revoked_tokens; only possible hits cost a query
+TOKEN_REVOCATION_CAPACITY = int(os.environ.get("TOKEN_REVOCATION_CAPACITY", "100000"))
+TOKEN_REVOCATION_FALSE_POSITIVE_RATE = float(os.environ.get("TOKEN_REVOCATION_FALSE_POSITIVE_RATE", "0.001"))
+# Seconds between incremental refreshes; how long another worker may still accept a revoked token
+TOKEN_REVOCATION_REFRESH_INTERVAL = float(os.environ.get("TOKEN_REVOCATION_REFRESH_INTERVAL", "5"))
+# Refreshes re-read this far behind the newest row seen, for transactions that committed late
+TOKEN_REVOCATION_REFRESH_OVERLAP = int(os.environ.get("TOKEN_REVOCATION_REFRESH_OVERLAP", "60"))
+
+
+class BloomFilter:
+    """
+    Fixed-size Bloom filter sized for capacity items at the given false positive rate
+    No false negatives: anything added is always reported as possibly present
+    """
+
+    def __init__(self, capacity, false_positive_rate):
+        self.capacity = capacity
+        self.size = max(8, int(math.ceil(-capacity * math.log(false_positive_rate) / math.log(2) ** 2)))
+        self.hashes = max(1, int(round(self.size / capacity * math.log(2))))
+        self.count = 0
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item):
+        # Double hashing: k positions from two 64-bit halves of one digest
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def add(self, item):
+        """Set the item's bits; re-adding an item does not count it twice"""
+        added = False
+        for position in self._positions(item):
+            mask = 1 << (position & 7)
+            if not self._bits[position >> 3] & mask:
+                self._bits[position >> 3] |= mask
+                added = True
+        if added:
+            self.count += 1
+
+    def __contains__(self, item):
+        return all(self._bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+
+class RevocationList:
+    """
+    Per-worker view of revoked_tokens
+    Built once from the whole table, then topped up with rows newer than the
+    last one seen; rebuilt larger when it fills past its capacity
+    """
+
+    def __init__(self, capacity=TOKEN_REVOCATION_CAPACITY, false_positive_rate=TOKEN_REVOCATION_FALSE_POSITIVE_RATE):
+        self.capacity = capacity
+        self.false_positive_rate = false_positive_rate
+        self._filter = None
+        self._watermark = None
+        self._refreshed_at = 0.0
+        self._lock = threading.Lock()
+        self._stats = {
+            "checks": 0,
+            "possible_hits": 0,
+            "false_positives": 0,
+            "rebuilds": 0,
+            "refreshes": 0
+        }
+
+    def _load(self, since=None):
+        """(jti, revoked_at) rows, optionally only those revoked at or after since"""
+        query = select(RevokedToken.jti, RevokedToken.revoked_at)
+        if since is not None:
+            query = query.where(RevokedToken.revoked_at >= since)
+        return db.session.execute(query.execution_options(yield_per=10000))
+
+    def _add_rows(self, bloom, rows):
+        watermark = self._watermark
+        for jti, revoked_at in rows:
+            bloom.add(jti)
+            if watermark is None or revoked_at > watermark:
+                watermark = revoked_at
+        self._watermark = watermark
+
+    def rebuild(self):
+        """Build a new filter from the whole table and swap it in"""
+        total = db.session.query(RevokedToken).count()
+        bloom = BloomFilter(max(self.capacity, total * 2), self.false_positive_rate)
+        self._watermark = None
+        self._add_rows(bloom, self._load())
+        self._filter = bloom
+        self._stats["rebuilds"] += 1
+        logger.info(f"Token revocation filter built with {total} entries")
+
+    def refresh(self):
+        """Add rows revoked since the last refresh, rebuilding first time or when full"""
+        if self._filter is None or self._filter.count > self._filter.capacity:
+            self.rebuild()
+        elif self._watermark is not None:
+            self._add_rows(self._filter, self._load(self._watermark - timedelta(seconds=TOKEN_REVOCATION_REFRESH_OVERLAP)))
+            self._stats["refreshes"] += 1
+        else:
+            self._add_rows(self._filter, self._load())
+            self._stats["refreshes"] += 1
+        self._refreshed_at = time.monotonic()
+
+    def _maybe_refresh(self):
+        """Refresh when due; a concurrent caller keeps using the current filter meanwhile"""
+        due = self._filter is None or time.monotonic() - self._refreshed_at >= TOKEN_REVOCATION_REFRESH_INTERVAL
+        if not due:
+            return
+        if self._filter is None:
+            with self._lock:
+                if self._filter is None:
+                    self.refresh()
+        elif self._lock.acquire(blocking=False):
+            try:
+                self.refresh()
+            except Exception as e:
+                # Keep serving the current filter; the next check retries
+                logger.error(f"Token revocation refresh failed: {str(e)}")
+                self._refreshed_at = time.monotonic()
+            finally:
+                self._lock.release()
+
+    def is_revoked(self, jti):
+        self._maybe_refresh()
+        self._stats["checks"] += 1
+        if jti not in self._filter:
+            return False
+
+        self._stats["possible_hits"] += 1
+        revoked = db.session.get(RevokedToken, jti) is not None
+        if not revoked:
+            self._stats["false_positives"] += 1
+        return revoked
+
+    def add(self, jti):
+        """Reflect a revocation made by this worker without waiting for a refresh"""
+        if self._filter is not None:
+            self._filter.add(jti)
+
+    def stats(self):
+        stats = dict(self._stats)
+        stats["entries"] = self._filter.count if self._filter is not None else 0
+        stats["capacity"] = self._filter.capacity if self._filter is not None else self.capacity
+        return stats
+
+
+def init_token_revocation(app, jwt):
+    """Check every JWT against the revocation list"""
+    app.extensions['token_revocation'] = RevocationList()
+
+    @jwt.token_in_blocklist_loader
+    def _check_token_revoked(jwt_header, jwt_payload):
+        return is_token_revoked(jwt_payload['jti'])
+
+
+def get_revocation_list():
+    return current_app.extensions['token_revocation']
+
+
+def is_token_revoked(jti):
+    try:
+        return get_revocation_list().is_revoked(jti)
+    except Exception as e:
+        # Only reached without a filter or on a possible hit; refuse rather than guess
+        logger.error(f"Error checking token revocation: {str(e)}")
+        return True
+
+
+def revoke_token(jti, user_id):
+    """Add a token to the denylist; the caller commits"""
+    if db.session.get(RevokedToken, jti) is None:
+        db.session.add(RevokedToken(jti=jti, user_id=user_id, revoked_at=datetime.utcnow()))
+    get_revocation_list().add(jti)
+
+
+def get_token_revocation_stats():
+    return get_revocation_list().stats()
@@ -0,0 +1,133 @@
+import time
+import logging
+import threading
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+
+class TTLCache:
+    """
+    Bounded LRU cache with per-entry TTL and optional stale-while-revalidate
+    Entries older than ttl but younger than ttl + stale_ttl are served as-is
+    while a single background refresh per key reloads them
+    """
+
+    def __init__(self, maxsize=1024, ttl=60, stale_ttl=0, name="cache"):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.name = name
+        self._data = OrderedDict()
+        self._refreshing = set()
+        self._lock = threading.Lock()
+        self._stats = {
+            "hits": 0,
+            "stale_hits": 0,
+            "misses": 0,
+            "refreshes": 0,
+            "refresh_failures": 0,
+            "evictions": 0,
+            "invalidations": 0
+        }
+
+    def _lookup(self, key, now):
+        """Return (value, state) where state is 'fresh', 'stale' or None; caller holds the lock"""
+        entry = self._data.get(key)
+        if entry is None:
+            return None, None
+
+        value, stored_at = entry
+        age = now - stored_at
+        if age < self.ttl:
+            self._data.move_to_end(key)
+            return value, 'fresh'
+        if age < self.ttl + self.stale_ttl:
+            self._data.move_to_end(key)
+            return value, 'stale'
+
+        del self._data[key]
+        return None, None
+
+    def get(self, key):
+        """Return the cached value or None if missing or expired"""
+        with self._lock:
+            value, state = self._lookup(key, time.monotonic())
+            if state == 'fresh':
+                self._stats["hits"] += 1
+                return value
+            self._stats["misses"] += 1
+            return None
+
+    def set(self, key, value):
+        """Store a value, evicting the least recently used entry when full"""
+        with self._lock:
+            self._data[key] = (value, time.monotonic())
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self._stats["evictions"] += 1
+
+    def invalidate(self, key):
+        """Drop a single entry"""
+        with self._lock:
+            if self._data.pop(key, None) is not None:
+                self._stats["invalidations"] += 1
+
+    def clear(self):
+        """Drop every entry"""
+        with self._lock:
+            self._data.clear()
+
+    def get_or_load(self, key, loader):
+        """
+        Return the cached value, loading it with loader() on a miss
+        Stale entries are returned immediately and refreshed in the background
+        Exceptions from a synchronous load propagate and nothing is cached
+        """
+        with self._lock:
+            value, state = self._lookup(key, time.monotonic())
+            if state == 'fresh':
+                self._stats["hits"] += 1
+                return value
+            if state == 'stale':
+                self._stats["stale_hits"] += 1
+                if key not in self._refreshing:
+                    self._refreshing.add(key)
+                    threading.Thread(
+                        target=self._refresh,
+                        args=(key, loader),
+                        name=f"{self.name}-refresh",
+                        daemon=True
+                    ).start()
+                return value
+            self._stats["misses"] += 1
+
+        value = loader()
+        self.set(key, value)
+        return value
+
+    def _refresh(self, key, loader):
+        """Reload one stale entry; on failure the stale value keeps being served"""
+        try:
+            value = loader()
+            self.set(key, value)
+            with self._lock:
+                self._stats["refreshes"] += 1
+        except Exception as e:
+            logger.error(f"Background refresh failed for {self.name}: {str(e)}")
+            with self._lock:
+                self._stats["refresh_failures"] += 1
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def stats(self):
+        """Snapshot of the cache counters"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["size"] = len(self._data)
+            stats["maxsize"] = self.maxsize
+            stats["ttl"] = self.ttl
+            stats["stale_ttl"] = self.stale_ttl
+            return stats
@@ -0,0 +1,203 @@
+import os
+import json
+import time
+import logging
+import tempfile
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import select, update
+from app import db
+from models import Blob, Document, Prescription, SymptomAssessment
+from utils import shard_path, stream_to_file
+from blob_store import blob_folder, blob_path, blob_key
+
+logger = logging.getLogger(__name__)
+
+# Rows rewritten per transaction and the pause between batches, to keep the migration gentle on a live database
+UPLOAD_MIGRATION_BATCH_SIZE = int(os.environ.get("UPLOAD_MIGRATION_BATCH_SIZE", "500"))
+UPLOAD_MIGRATION_SLEEP = float(os.environ.get("UPLOAD_MIGRATION_SLEEP", "0.5"))
+
+# Every column holding an upload path, keyed by table name; blobs go first so
+# uploads that reuse a blob pick up its new path before documents are scanned
+_PATH_COLUMNS = {
+    'blobs': (Blob, Blob.sha256, Blob.file_path),
+    'documents': (Document, Document.id, Document.file_path),
+    'prescriptions': (Prescription, Prescription.id, Prescription.prescription_image_path),
+    'symptom_assessments': (SymptomAssessment, SymptomAssessment.id, SymptomAssessment.audio_recording_path)
+}
+
+
+def upload_folder():
+    return os.environ.get("UPLOAD_FOLDER", "uploads")
+
+
+def sharded_target(path):
+    """Where a file written under the old flat layout belongs, or None if path is not flat"""
+    if not path:
+        return None
+    directory = os.path.normpath(os.path.dirname(path))
+    name = os.path.basename(path)
+    if directory == os.path.normpath(blob_folder()) and blob_key(path):
+        return blob_path(name)
+    if directory == os.path.normpath(upload_folder()):
+        return shard_path(upload_folder(), name)
+    return None
+
+
+def _place(source, target):
+    """Give the file a second name at target; a copy where hard links are not supported"""
+    if os.path.exists(target):
+        return
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    try:
+        os.link(source, target)
+    except FileExistsError:
+        pass
+    except OSError:
+        with open(source, 'rb') as f:
+            stream_to_file(f, target)
+
+
+def migrate_batch(table, after, batch_size):
+    """
+    Point up to batch_size rows of one table, in primary key order after the
+    given key, at the sharded layout; commits
+    Files are linked into place before their rows change, so readers find the
+    file under either path. Rows are only rewritten if their path has not
+    changed since they were read.
+    Returns (last key, rows scanned, rows rewritten, rows whose file is missing)
+    """
+    model, key_column, path_column = _PATH_COLUMNS[table]
+    query = select(key_column, path_column).where(path_column.isnot(None))
+    if after is not None:
+        query = query.where(key_column > after)
+    rows = db.session.execute(query.order_by(key_column).limit(batch_size)).all()
+
+    rewritten = 0
+    missing = 0
+    for key, path in rows:
+        target = sharded_target(path)
+        if target is None:
+            continue
+        if not os.path.exists(target):
+            if not os.path.exists(path):
+                logger.warning(f"Upload missing for {table} {key}: {path}")
+                missing += 1
+                continue
+            _place(path, target)
+
+        result = db.session.execute(
+            update(model).where(key_column == key, path_column == path).values({path_column.key: target}),
+            execution_options={"synchronize_session": False}
+        )
+        rewritten += result.rowcount
+    db.session.commit()
+
+    return (rows[-1][0] if rows else after), len(rows), rewritten, missing
+
+
+def remove_flat_copies():
+    """
+    Delete files left in the flat upload and blob folders whose sharded copy
+    exists; only safe once no row points at the flat layout any more
+    """
+    removed = 0
+    for folder in (upload_folder(), blob_folder()):
+        if not os.path.isdir(folder):
+            continue
+        with os.scandir(folder) as entries:
+            for entry in entries:
+                if entry.name.startswith('.') or not entry.is_file(follow_symlinks=False):
+                    continue
+                target = sharded_target(entry.path)
+                if target is None or not os.path.exists(target):
+                    continue
+                if os.path.getsize(target) != entry.stat().st_size:
+                    logger.warning(f"Keeping {entry.path}: sharded copy differs in size")
+                    continue
+                os.unlink(entry.path)
+                removed += 1
+    return removed
+
+
+class UploadLayoutMigration:
+    """
+    Resumable move of every upload path column to the sharded layout
+    Progress is saved to a checkpoint file after each batch. Passes repeat until
+    one rewrites nothing, which also catches rows written with a flat path while
+    the migration ran; only then are the flat files removed.
+    """
+
+    def __init__(self, checkpoint_path=None):
+        self.checkpoint_path = checkpoint_path or os.path.join(upload_folder(), '.layout-migration.json')
+        self.state = self._load()
+
+    def _load(self):
+        try:
+            with open(self.checkpoint_path) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {"pass": 1, "table": next(iter(_PATH_COLUMNS)), "after": None, "rewritten": 0, "missing": 0, "removed": 0, "done": False}
+
+    def _save(self):
+        directory = os.path.dirname(self.checkpoint_path) or '.'
+        os.makedirs(directory, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.checkpoint-')
+        with os.fdopen(fd, 'w') as f:
+            json.dump(self.state, f)
+        os.replace(temp_path, self.checkpoint_path)
+
+    def _finish_table(self):
+        state = self.state
+        tables = list(_PATH_COLUMNS)
+        position = tables.index(state["table"]) + 1
+        state["after"] = None
+        if position < len(tables):
+            state["table"] = tables[position]
+        elif state["rewritten"]:
+            # Rows may have been written with flat paths meanwhile; verify with another pass
+            state.update({"pass": state["pass"] + 1, "table": tables[0], "rewritten": 0, "missing": 0})
+        else:
+            state["removed"] = remove_flat_copies()
+            state["done"] = True
+
+    def run(self, batch_size=UPLOAD_MIGRATION_BATCH_SIZE, sleep=UPLOAD_MIGRATION_SLEEP, max_batches=None, progress=None):
+        """Run batches until done or max_batches; returns True once the migration is complete"""
+        batches = 0
+        while not self.state["done"]:
+            if max_batches is not None and batches >= max_batches:
+                break
+            state = self.state
+            last, scanned, rewritten, missing = migrate_batch(state["table"], state["after"], batch_size)
+            state["rewritten"] += rewritten
+            state["missing"] += missing
+            if scanned < batch_size:
+                self._finish_table()
+            else:
+                state["after"] = last
+            self._save()
+            batches += 1
+            if progress is not None:
+                progress(state)
+            if not state["done"] and sleep:
+                time.sleep(sleep)
+        return self.state["done"]
+
+
+@click.command('migrate-uploads')
+@click.option('--batch-size', default=UPLOAD_MIGRATION_BATCH_SIZE, show_default=True, help="Rows rewritten per transaction")
+@click.option('--sleep', default=UPLOAD_MIGRATION_SLEEP, show_default=True, help="Seconds to pause between batches")
+@click.option('--max-batches', type=int, default=None, help="Stop after this many batches; run again to resume")
+@click.option('--checkpoint', default=None, help="Progress file [default: UPLOAD_FOLDER/.layout-migration.json]")
+@with_appcontext
+def migrate_uploads_command(batch_size, sleep, max_batches, checkpoint):
+    """Move uploads from the flat layout into hash-prefix shards while the API keeps serving"""
+    migration = UploadLayoutMigration(checkpoint)
+
+    def progress(state):
+        click.echo(f"pass {state['pass']} {state['table']}: {state['rewritten']} rewritten, {state['missing']} missing")
+
+    if migration.run(batch_size, sleep, max_batches, progress):
+        click.echo(f"Migration complete; removed {migration.state['removed']} flat files")
+    else:
+        click.echo(f"Stopped after {max_batches} batches; run again to resume")
@@ -1,8 +1,11 @@
 import os
 import uuid
 import json
+import hashlib
+import tempfile
 import qrcode
 from io import BytesIO
+from collections import namedtuple
 import base64
 from werkzeug.utils import secure_filename
 from PIL import Image
@@ -12,27 +15,81 @@ logger = logging.getLogger(__name__)
 
 ALLOWED_EXTENSIONS = {'pdf', 'png', 'jpg', 'jpeg', 'gif', 'mp3', 'wav', 'ogg', 'm4a'}
 
+# Uploads are copied to disk in chunks of this many bytes
+UPLOAD_CHUNK_SIZE = int(os.environ.get("UPLOAD_CHUNK_SIZE", str(1024 * 1024)))
+
+StoredFile = namedtuple('StoredFile', ['path', 'size', 'sha256'])
+
+# Uploads fan out over two levels of 256 directories named by hash prefix
+UPLOAD_SHARD_LEVELS = 2
+UPLOAD_SHARD_WIDTH = 2
+
 def allowed_file(filename):
     """Check if file extension is allowed"""
     return '.' in filename and \
            filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
-def save_uploaded_file(file, filename):
-    """Save uploaded file to the uploads directory"""
+def shard_path(folder, name, key=None):
+    """
+    folder/ab/cd/name, where ab and cd are the leading hex digits of key
+    (the SHA-256 of name unless given), so no directory grows past a few hundred entries
+    """
+    if key is None:
+        key = hashlib.sha256(name.encode()).hexdigest()
+    shards = [key[i * UPLOAD_SHARD_WIDTH:(i + 1) * UPLOAD_SHARD_WIDTH] for i in range(UPLOAD_SHARD_LEVELS)]
+    return os.path.join(folder, *shards, name)
+
+def stream_to_file(stream, file_path, chunk_size=UPLOAD_CHUNK_SIZE):
+    """
+    Copy a stream to file_path one chunk at a time, measuring size and SHA-256 in the same pass
+    Data goes to a temp file in the same directory that is renamed into place once
+    complete, so readers never see a partial file
+    """
+    directory = os.path.dirname(file_path) or '.'
+    digest = hashlib.sha256()
+    size = 0
+    
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.upload-')
     try:
-        upload_folder = os.environ.get("UPLOAD_FOLDER", "uploads")
-        os.makedirs(upload_folder, exist_ok=True)
+        with os.fdopen(fd, 'wb') as out:
+            while True:
+                chunk = stream.read(chunk_size)
+                if not chunk:
+                    break
+                digest.update(chunk)
+                out.write(chunk)
+                size += len(chunk)
+            out.flush()
+            os.fsync(out.fileno())
+        os.replace(temp_path, file_path)
+    except BaseException:
+        try:
+            os.unlink(temp_path)
+        except OSError:
+            pass
+        raise
+    
+    return StoredFile(file_path, size, digest.hexdigest())
+
+def store_uploaded_file(file, filename):
+    """Stream an uploaded file into its shard of the uploads directory; returns StoredFile(path, size, sha256)"""
+    try:
+        file_path = shard_path(os.environ.get("UPLOAD_FOLDER", "uploads"), filename)
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
         
-        file_path = os.path.join(upload_folder, filename)
-        file.save(file_path)
+        stored = stream_to_file(file.stream, file_path)
         
-        logger.info(f"File saved: {file_path}")
-        return file_path
+        logger.info(f"File saved: {stored.path} ({stored.size} bytes)")
+        return stored
         
     except Exception as e:
         logger.error(f"Error saving file: {str(e)}")
         raise
 
+def save_uploaded_file(file, filename):
+    """Save uploaded file to the uploads directory"""
+    return store_uploaded_file(file, filename).path
+
 def generate_qr_code(data):
     """Generate QR code for the given data"""
     try: